@@ -0,0 +1,109 @@
+"""
+Compare the size and read latency of the HTTP cache at several compression levels.
+
+Fetches a typical mix of large responses once (PyPI and npm package documents, the JetBrains
+products list and a directory listing), stores them in a temporary
+:py:class:`livecheck.utils.http_cache.HttpCache` per compression level and prints the stored size
+and the median time to read every response back.
+
+Usage: ``python benchmarks/cache_compression.py [-u URL ...] [-l LEVEL ...] [-r ROUNDS]``
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter, time
+from typing import TYPE_CHECKING
+import asyncio
+
+from livecheck.utils.http_cache import HttpCache
+from livecheck.utils.requests import close_sessions, get_content, init_sessions
+import click
+
+if TYPE_CHECKING:
+    from niquests_cache.typing import CacheEntry
+
+URLS = ('https://pypi.org/pypi/boto3/json', 'https://pypi.org/pypi/numpy/json',
+        'https://pypi.org/pypi/django/json', 'https://registry.npmjs.org/typescript',
+        'https://registry.npmjs.org/react',
+        'https://data.services.jetbrains.com/products?fields=code,releases.version',
+        'https://ftp.gnu.org/gnu/coreutils/')
+
+
+async def _fetch(urls: tuple[str, ...]) -> dict[str, bytes]:
+    init_sessions(asyncio.Semaphore(8))
+    try:
+        responses = await asyncio.gather(*(get_content(url) for url in urls))
+    finally:
+        await close_sessions()
+    bodies = {}
+    for url, r in zip(urls, responses, strict=True):
+        if r.ok and r.content:
+            bodies[url] = r.content
+        else:
+            click.echo(f'Skipping {url} (status {r.status_code}).', err=True)
+    return bodies
+
+
+async def _measure(bodies: dict[str, bytes], level: int | None, rounds: int) -> tuple[int, float]:
+    with TemporaryDirectory() as tmp:
+        cache = HttpCache(Path(tmp) / 'http.sqlite', compression_level=level)
+        try:
+            for url, body in bodies.items():
+                entry: CacheEntry = {
+                    'content': body,
+                    'encoding': 'utf-8',
+                    'headers': {},
+                    'status_code': 200,
+                    'ts': time(),
+                    'url': url
+                }
+                await cache.aset(url, entry)
+            size = sum(stats.size for stats in cache.stats().values())
+            times = []
+            for _ in range(rounds):
+                start = perf_counter()
+                for url in bodies:
+                    await cache.aget(url)
+                times.append((perf_counter() - start) / len(bodies))
+        finally:
+            cache.close()
+    return size, median(times)
+
+
+@click.command()
+@click.option('-u', '--url', multiple=True, default=URLS, help='URLs of the payloads.')
+@click.option('-l',
+              '--level',
+              type=click.IntRange(0, 9),
+              multiple=True,
+              default=(1, 6, 9),
+              show_default=True,
+              help='zlib compression levels to compare with uncompressed storage.')
+@click.option('-r', '--rounds', type=click.IntRange(min=1), default=20, show_default=True)
+def main(url: tuple[str, ...], level: tuple[int, ...], rounds: int) -> None:
+    """
+    Print the stored size and median read time of the payloads for each compression level.
+
+    Raises
+    ------
+    click.ClickException
+        If none of the payloads could be fetched.
+    """
+    bodies = asyncio.run(_fetch(url))
+    if not bodies:
+        msg = 'No payloads could be fetched.'
+        raise click.ClickException(msg)
+    total = sum(len(body) for body in bodies.values())
+    click.echo(f'{len(bodies)} payloads, {total / 1024**2:.2f} MiB, median of {rounds} rounds')
+    click.echo(f'{"level":>5} {"size":>10} {"ratio":>6} {"read":>9}')
+    for level_ in (None, *level):
+        size, read = asyncio.run(_measure(bodies, level_, rounds))
+        name = 'off' if level_ is None else str(level_)
+        click.echo(f'{name:>5} {size / 1024**2:>6.2f} MiB {size / total:>6.1%} '
+                   f'{read * 1000:>6.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Compare plain and multiplexed HTTP sessions at several concurrency limits.
+
+Fetches the metadata of a fixed set of PyPI and npm packages through
+:py:func:`livecheck.utils.requests.get_content` once per ``-M`` value and mode, and prints the
+wall time of each run. Nothing is cached between runs.
+
+Usage: ``python benchmarks/http_multiplexing.py [-H HOST ...] [-r ROUNDS] [-M N ...]``
+"""
+from __future__ import annotations
+
+from statistics import median
+from time import perf_counter
+from urllib.parse import urlparse
+import asyncio
+
+from livecheck.utils.requests import close_sessions, get_content, init_sessions
+import click
+
+PYPI_PACKAGES = ('aiohttp', 'anyio', 'attrs', 'black', 'boto3', 'certifi', 'click', 'cryptography',
+                 'django', 'flask', 'httpx', 'idna', 'jinja2', 'lxml', 'mypy', 'niquests', 'numpy',
+                 'packaging', 'pandas', 'pillow', 'platformdirs', 'pydantic', 'pytest', 'pyyaml',
+                 'requests', 'rich', 'ruff', 'setuptools', 'six', 'sqlalchemy', 'urllib3', 'yapf')
+NPM_PACKAGES = ('axios', 'chalk', 'commander', 'debug', 'esbuild', 'eslint', 'express', 'glob',
+                'lodash', 'minimist', 'prettier', 'react', 'rollup', 'semver', 'typescript', 'vite')
+URLS = (*(f'https://pypi.org/pypi/{name}/json' for name in PYPI_PACKAGES),
+        *(f'https://registry.npmjs.org/{name}/latest' for name in NPM_PACKAGES))
+
+
+async def _run(urls: tuple[str, ...], max_concurrent_http: int, *, multiplexed: bool) -> float:
+    init_sessions(asyncio.Semaphore(max_concurrent_http), multiplexed=multiplexed)
+    try:
+        start = perf_counter()
+        responses = await asyncio.gather(*(get_content(url) for url in urls))
+        elapsed = perf_counter() - start
+    finally:
+        await close_sessions()
+    if failed := [r.url for r in responses if not r.ok]:
+        msg = f'Requests failed: {failed}'
+        raise click.ClickException(msg)
+    return elapsed
+
+
+@click.command()
+@click.option('-H',
+              '--host',
+              multiple=True,
+              default=('pypi.org', 'registry.npmjs.org'),
+              show_default=True,
+              help='Only request URLs of these hosts.')
+@click.option('-r', '--rounds', type=click.IntRange(min=1), default=3, show_default=True)
+@click.option('-M',
+              '--max-concurrent-http',
+              type=click.IntRange(min=1),
+              multiple=True,
+              default=(3, 8, 16, 32, 64),
+              show_default=True)
+def main(host: tuple[str, ...], rounds: int, max_concurrent_http: tuple[int, ...]) -> None:
+    """Print the median time to fetch all URLs for each concurrency limit and mode."""
+    urls = tuple(url for url in URLS if urlparse(url).hostname in host)
+    click.echo(f'{len(urls)} requests, median of {rounds} rounds')
+    click.echo(f'{"-M":>4} {"plain":>8} {"multiplexed":>12} {"speed-up":>9}')
+    for limit in max_concurrent_http:
+        times: dict[bool, list[float]] = {False: [], True: []}
+        for _ in range(rounds):
+            for multiplexed in (False, True):
+                times[multiplexed].append(asyncio.run(_run(urls, limit, multiplexed=multiplexed)))
+        plain, multiplexed_ = median(times[False]), median(times[True])
+        click.echo(
+            f'{limit:>4} {plain:>7.2f}s {multiplexed_:>11.2f}s {plain / multiplexed_:>8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Measure the startup cost of ``livecheck`` with ``python -X importtime``.
+
+Imports the module in a fresh interpreter ``--rounds`` times, then prints the median cumulative
+import time of the module and of its slowest imports, and the median wall time of
+``livecheck --help``. With ``--limit``, exits with an error if the median import time is higher, so
+startup regressions can be caught in CI.
+
+Usage: ``python benchmarks/import_time.py [-m MODULE] [-r ROUNDS] [-n TOP] [-l MS]``
+"""
+from __future__ import annotations
+
+from statistics import median
+from time import perf_counter
+import re
+import subprocess as sp
+import sys
+
+import click
+
+IMPORT_TIME_RE = re.compile(r'^import time:\s+\d+ \|\s+(\d+) \| *(\S+)$')
+
+
+def _import_times(module: str) -> dict[str, int]:
+    # Cumulative import time in microseconds of the module and of every module it imports.
+    proc = sp.run((sys.executable, '-X', 'importtime', '-c', f'import {module}'),
+                  capture_output=True,
+                  text=True,
+                  check=True)
+    return {
+        m.group(2): int(m.group(1))
+        for m in map(IMPORT_TIME_RE.match, proc.stderr.splitlines()) if m
+    }
+
+
+def _help_time() -> float:
+    start = perf_counter()
+    sp.run((sys.executable, '-m', 'livecheck', '--help'), capture_output=True, check=True)
+    return perf_counter() - start
+
+
+@click.command()
+@click.option('-m', '--module', default='livecheck.main', show_default=True)
+@click.option('-r', '--rounds', type=click.IntRange(min=1), default=5, show_default=True)
+@click.option('-n',
+              '--top',
+              type=click.IntRange(min=0),
+              default=15,
+              show_default=True,
+              help='Number of slowest imports to show.')
+@click.option('-l',
+              '--limit',
+              type=click.FloatRange(min=0),
+              help='Fail if the median import time in milliseconds is higher.')
+def main(module: str, rounds: int, top: int, limit: float | None) -> None:
+    """
+    Print the median import times and the median time of ``livecheck --help``.
+
+    Raises
+    ------
+    click.ClickException
+        If the median import time is above ``--limit``.
+    """
+    runs = [_import_times(module) for _ in range(rounds)]
+    times = {name: median(run.get(name, 0) for run in runs) / 1000 for name in runs[0]}
+    total = times.get(module, 0.0)
+    click.echo(f'{module}: {total:.1f} ms, median of {rounds} rounds')
+    slowest = sorted((name for name in times if name != module),
+                     key=times.__getitem__,
+                     reverse=True)
+    for name in slowest[:top]:
+        elapsed = times[name]
+        click.echo(f'{elapsed:>8.1f} ms  {name}')
+    click.echo(f'livecheck --help: {median(_help_time() for _ in range(rounds)) * 1000:.1f} ms')
+    if limit is not None and total > limit:
+        msg = f'Import time of {module} is {total:.1f} ms, above the limit of {limit:.1f} ms.'
+        raise click.ClickException(msg)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Compare the recursive glob formerly used by ``get_props`` with :py:func:`find_packages`.
+
+Builds a synthetic repository of about ``--ebuilds`` ebuilds (1 to 3 per package, a ``files``
+directory in every other package, an md5-cache entry per ebuild and a few eclasses), or uses an
+existing one given with ``--tree``, and prints the median time each approach takes to list the
+packages to check.
+
+Usage: ``python benchmarks/package_discovery.py [-e EBUILDS] [-t TREE] [-r ROUNDS]``
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import TYPE_CHECKING, Any
+import asyncio
+
+from anyio import Path as AnyioPath
+from livecheck.utils.portage import find_packages
+import click
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+PACKAGES_PER_CATEGORY = 120
+
+
+def _make_tree(repo_root: Path, ebuilds: int) -> None:
+    categories = set()
+    package = count = 0
+    while count < ebuilds:
+        category = f'cat-{package // PACKAGES_PER_CATEGORY}'
+        name = f'pkg{package}'
+        package_dir = repo_root / category / name
+        (package_dir / 'files' if package % 2 else package_dir).mkdir(parents=True)
+        cache_dir = repo_root / 'metadata' / 'md5-cache' / category
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        for version in range(package % 3 + 1):
+            (package_dir / f'{name}-1.{version}.ebuild').write_text('EAPI=8\n', encoding='utf-8')
+            (cache_dir / f'{name}-1.{version}').write_text('EAPI=8\n', encoding='utf-8')
+            count += 1
+        (package_dir / 'metadata.xml').write_text('<pkgmetadata/>\n', encoding='utf-8')
+        categories.add(category)
+        package += 1
+    (repo_root / 'eclass').mkdir()
+    for eclass in ('cmake', 'git-r3', 'python-r1', 'toolchain-funcs'):
+        (repo_root / 'eclass' / f'{eclass}.eclass').write_text('\n', encoding='utf-8')
+    (repo_root / 'profiles').mkdir()
+    lines = ''.join(f'{category}\n' for category in sorted(categories))
+    (repo_root / 'profiles' / 'categories').write_text(lines, encoding='utf-8')
+
+
+async def _glob(repo_root: Path) -> list[str]:
+    return [
+        f'{path.parent.parent.name}/{path.parent.name}'
+        async for path in AnyioPath(repo_root).glob('**/*.ebuild')
+    ]
+
+
+async def _scan(repo_root: Path) -> list[str]:
+    return await asyncio.to_thread(find_packages, repo_root, repo_root)
+
+
+def _measure(func: Callable[[Path], Any], repo_root: Path, rounds: int) -> tuple[int, float]:
+    times = []
+    names: list[str] = []
+    for _ in range(rounds):
+        start = perf_counter()
+        names = asyncio.run(func(repo_root))
+        times.append(perf_counter() - start)
+    return len(names), median(times)
+
+
+def _report(repo_root: Path, rounds: int) -> None:
+    click.echo(f'{"method":>6} {"names":>7} {"time":>10}')
+    for name, func in (('glob', _glob), ('scan', _scan)):
+        count, elapsed = _measure(func, repo_root, rounds)
+        click.echo(f'{name:>6} {count:>7} {elapsed * 1000:>7.1f} ms')
+
+
+@click.command()
+@click.option('-e',
+              '--ebuilds',
+              type=click.IntRange(min=1),
+              default=20000,
+              show_default=True,
+              help='Number of ebuilds in the synthetic tree.')
+@click.option('-t',
+              '--tree',
+              type=click.Path(exists=True, file_okay=False, path_type=Path),
+              help='Use this repository instead of a synthetic tree.')
+@click.option('-r', '--rounds', type=click.IntRange(min=1), default=5, show_default=True)
+def main(ebuilds: int, tree: Path | None, rounds: int) -> None:
+    """Print the number of names found and the median time of each discovery method."""
+    if tree is not None:
+        _report(tree, rounds)
+        return
+    with TemporaryDirectory() as tmp:
+        repo_root = Path(tmp) / 'repo'
+        _make_tree(repo_root, ebuilds)
+        click.echo(f'{ebuilds} ebuilds, median of {rounds} rounds')
+        _report(repo_root, rounds)
+
+
+if __name__ == '__main__':
+    main()
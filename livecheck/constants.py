@@ -8,9 +8,28 @@ from .utils import prefix_v
 if TYPE_CHECKING:
     from collections.abc import Callable, Mapping
 
-__all__ = ('PACKAGE_MANAGERS', 'RSS_NS', 'SUBMODULES', 'TAG_NAME_FUNCTIONS')
+__all__ = ('DEFAULT_RESULT_TTL', 'PACKAGE_MANAGERS', 'RESULT_TTLS', 'RSS_NS', 'SUBMODULES',
+           'TAG_NAME_FUNCTIONS')
 
+DEFAULT_RESULT_TTL = 86400
+"""Time in seconds a stored upstream result is valid when its handler has no specific TTL."""
 PACKAGE_MANAGERS = frozenset({'npm', 'pnpm', 'yarn'})
+RESULT_TTLS: Mapping[str, int] = {
+    'checksum': 21600,
+    'directory': 43200,
+    'gist': 21600,
+    'location+hash-check': 21600,
+    'metadata': 172800,
+    'regex': 43200,
+    'repology': 259200,
+}
+"""
+Time in seconds a stored upstream result is valid, by handler name.
+
+Handlers that follow fast-moving or unversioned sources expire sooner.
+
+:meta hide-value:
+"""
 
 RSS_NS = {'': 'http://www.w3.org/2005/Atom'}
 """
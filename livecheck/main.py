@@ -1,25 +1,34 @@
 """Main command."""
 from __future__ import annotations
 
+from contextlib import closing, contextmanager
 from copy import copy
 from itertools import starmap
 from os import chdir
 from pathlib import Path
 from re import Match
 from shutil import which
+from time import time
 from typing import TYPE_CHECKING
 from urllib.parse import urlparse
 import asyncio
 import logging
 import os
 import re
+import sqlite3
 
 from anyio import Path as AnyioPath
 from bascom import setup_logging
 from defusedxml import ElementTree as ET  # noqa: N817
 import click
 
-from .constants import PACKAGE_MANAGERS, SUBMODULES, TAG_NAME_FUNCTIONS
+from .constants import (
+    DEFAULT_RESULT_TTL,
+    PACKAGE_MANAGERS,
+    RESULT_TTLS,
+    SUBMODULES,
+    TAG_NAME_FUNCTIONS,
+)
 from .settings import (
     TYPE_CHECKSUM,
     TYPE_COMMIT,
@@ -106,28 +115,49 @@ from .special.sourcehut import (
     is_sourcehut,
 )
 from .special.yarn import check_yarn_requirements, update_yarn_ebuild
-from .utils import check_program, close_sessions, extract_sha, get_content, init_sessions, is_sha
+from .utils import (
+    adaptive_limits,
+    check_program,
+    close_sessions,
+    extract_sha,
+    get_content,
+    init_sessions,
+    is_sha,
+    offline_misses,
+    preferred_mirrors,
+    response_json,
+    tripped_hosts,
+)
+from .utils.archive import ArchiveRecorder, ArchiveReplayer
+from .utils.http_cache import DEFAULT_MAX_AGE, DEFAULT_MAX_SIZE, HostStats, open_http_cache
 from .utils.portage import (
     catpkg_catpkgsplit,
     catpkgsplit2,
     compare_versions,
     digest_ebuild,
+    find_packages,
     get_aux,
     get_fetch_map,
     get_first_src_uri,
     get_highest_matches,
+    get_package_versions,
     get_repository_root_if_inside,
+    get_thirdpartymirrors,
+    load_metadata,
     remove_leading_zeros,
 )
+from .utils.store import StoredResult, close_store, get_store, open_store
 
 if TYPE_CHECKING:
-    from collections.abc import Sequence
+    from collections.abc import Iterator, Mapping, Sequence
 
     from .typing import PropTuple
+    from .utils.http_cache import HttpCache
+    from .utils.store import ResultStore
 
 log = logging.getLogger(__name__)
 
-__all__ = ('main',)
+__all__ = ('cache', 'main')
 
 
 def _resolved_executable(name: str) -> str:
@@ -191,7 +221,7 @@ async def process_submodules(pkg_name: str, ref: str, contents: str, repo_uri: s
                                          f'{parent_path}?ref={ref}')
             if not parent_r.ok:
                 return None
-            parent_data = parent_r.json()
+            parent_data = response_json(parent_r)
             parent_sha = parent_data['sha']
             parent_git_url = parent_data.get('submodule_git_url', '')
             if not parent_git_url:
@@ -212,7 +242,7 @@ async def process_submodules(pkg_name: str, ref: str, contents: str, repo_uri: s
                                   f'?ref={ref}')
         if not r.ok:
             return None
-        remote_sha = r.json()['sha']
+        remote_sha = response_json(r)['sha']
         for line in ebuild_lines:
             if (line.startswith(grep_for)
                     and (local_sha := line.split('=')[1].replace('"', '').strip()) != remote_sha):
@@ -232,6 +262,30 @@ def log_unhandled_pkg(ebuild: str, src_uri: str) -> None:  # pragma: no cover
     log.debug('Unhandled: %s, SRC_URI: %s', ebuild, src_uri)
 
 
+def get_url_handler(src_uri: str) -> str:
+    """
+    Get the name of the handler :py:func:`parse_url` uses for a URL.
+
+    Parameters
+    ----------
+    src_uri : str
+        Source URI.
+
+    Returns
+    -------
+    str
+        Handler name, or an empty string if the URL is not handled.
+    """
+    for name, is_handled in (('gist', is_gist), ('github', is_github), ('sourcehut', is_sourcehut),
+                             ('pypi', is_pypi), ('jetbrains', is_jetbrains), ('gitlab', is_gitlab),
+                             ('package', is_package), ('pecl', is_pecl), ('metacpan', is_metacpan),
+                             ('rubygems', is_rubygems), ('sourceforge', is_sourceforge),
+                             ('bitbucket', is_bitbucket)):
+        if is_handled(src_uri):
+            return name
+    return ''
+
+
 async def parse_url(src_uri: str, ebuild: str, settings: LivecheckSettings, *,
                     force_sha: bool) -> tuple[str, str, str, str]:
     """
@@ -261,56 +315,47 @@ async def parse_url(src_uri: str, ebuild: str, settings: LivecheckSettings, *,
         return last_version, top_hash, hash_date, url
 
     log.debug('Parsed URI: %s', parsed_uri)
-    if is_gist(src_uri):
-        log.debug('Matched handler: gist for %s.', ebuild)
-        top_hash, hash_date = await get_latest_gist_package(src_uri)
-    elif is_github(src_uri):
-        log.debug('Matched handler: github for %s.', ebuild)
-        last_version, top_hash, hash_date = await get_latest_github(src_uri,
-                                                                    ebuild,
-                                                                    settings,
-                                                                    force_sha=force_sha)
-    elif is_sourcehut(src_uri):
-        log.debug('Matched handler: sourcehut for %s.', ebuild)
-        last_version, top_hash, hash_date = await get_latest_sourcehut(src_uri,
-                                                                       ebuild,
-                                                                       settings,
-                                                                       force_sha=force_sha)
-    elif is_pypi(src_uri):
-        log.debug('Matched handler: pypi for %s.', ebuild)
-        last_version, url = await get_latest_pypi_package(src_uri, ebuild, settings)
-    elif is_jetbrains(src_uri):
-        log.debug('Matched handler: jetbrains for %s.', ebuild)
-        last_version = await get_latest_jetbrains_package(ebuild, settings)
-    elif is_gitlab(src_uri):
-        log.debug('Matched handler: gitlab for %s.', ebuild)
-        last_version, top_hash, hash_date = await get_latest_gitlab(src_uri,
-                                                                    ebuild,
-                                                                    settings,
-                                                                    force_sha=force_sha)
-    elif is_package(src_uri):
-        log.debug('Matched handler: package for %s.', ebuild)
-        last_version = await get_latest_package(src_uri, ebuild, settings)
-    elif is_pecl(src_uri):
-        log.debug('Matched handler: pecl for %s.', ebuild)
-        last_version = await get_latest_pecl_package(ebuild, settings)
-    elif is_metacpan(src_uri):
-        log.debug('Matched handler: metacpan for %s.', ebuild)
-        last_version = await get_latest_metacpan_package(src_uri, ebuild, settings)
-    elif is_rubygems(src_uri):
-        log.debug('Matched handler: rubygems for %s.', ebuild)
-        last_version = await get_latest_rubygems_package(ebuild, settings)
-    elif is_sourceforge(src_uri):
-        log.debug('Matched handler: sourceforge for %s.', ebuild)
-        last_version = await get_latest_sourceforge_package(src_uri, ebuild, settings)
-    elif is_bitbucket(src_uri):
-        log.debug('Matched handler: bitbucket for %s.', ebuild)
-        last_version, top_hash, hash_date = await get_latest_bitbucket(src_uri,
-                                                                       ebuild,
-                                                                       settings,
-                                                                       force_sha=force_sha)
-    else:
+    if not (handler := get_url_handler(src_uri)):
         log_unhandled_pkg(ebuild, src_uri)
+        return last_version, top_hash, hash_date, url
+    log.debug('Matched handler: %s for %s.', handler, ebuild)
+    match handler:
+        case 'gist':
+            top_hash, hash_date = await get_latest_gist_package(src_uri)
+        case 'github':
+            last_version, top_hash, hash_date = await get_latest_github(src_uri,
+                                                                        ebuild,
+                                                                        settings,
+                                                                        force_sha=force_sha)
+        case 'sourcehut':
+            last_version, top_hash, hash_date = await get_latest_sourcehut(src_uri,
+                                                                           ebuild,
+                                                                           settings,
+                                                                           force_sha=force_sha)
+        case 'pypi':
+            last_version, url = await get_latest_pypi_package(src_uri, ebuild, settings)
+        case 'jetbrains':
+            last_version = await get_latest_jetbrains_package(ebuild, settings)
+        case 'gitlab':
+            last_version, top_hash, hash_date = await get_latest_gitlab(src_uri,
+                                                                        ebuild,
+                                                                        settings,
+                                                                        force_sha=force_sha)
+        case 'package':
+            last_version = await get_latest_package(src_uri, ebuild, settings)
+        case 'pecl':
+            last_version = await get_latest_pecl_package(ebuild, settings)
+        case 'metacpan':
+            last_version = await get_latest_metacpan_package(src_uri, ebuild, settings)
+        case 'rubygems':
+            last_version = await get_latest_rubygems_package(ebuild, settings)
+        case 'sourceforge':
+            last_version = await get_latest_sourceforge_package(src_uri, ebuild, settings)
+        case 'bitbucket':
+            last_version, top_hash, hash_date = await get_latest_bitbucket(src_uri,
+                                                                           ebuild,
+                                                                           settings,
+                                                                           force_sha=force_sha)
 
     return last_version, top_hash, hash_date, url
 
@@ -399,47 +444,90 @@ def extract_restrict_version(cp: str) -> tuple[str, str]:
     return cp, ''
 
 
-async def _check_one_package(  # noqa: C901, PLR0912, PLR0914
-        match_: str, settings: LivecheckSettings, repo_root: Path,
-        exclude: Sequence[str]) -> PropTuple | None:
+_STRATEGY_NAMES = {
+    'egit': 'EGIT_REPO_URI',
+    'src_uri': 'SRC_URI',
+    'metadata': 'metadata.xml',
+    'homepage': 'HOMEPAGE',
+    'repology': 'repology',
+    'directory': 'directory listing'
+}
+
+
+async def _try_strategy(strategy: str, url: str, match: str, settings: LivecheckSettings,
+                        repo_root: Path) -> tuple[str, str, str, str, str]:
     """
-    Check a single package for an upstream update.
+    Run a single step of the upstream discovery chain.
 
     Parameters
     ----------
-    match_ : str
-        Package atom in ``cat/pkg-version`` form, optionally suffixed with a
-        ``:slot:`` restriction.
+    strategy : str
+        One of ``egit``, ``src_uri``, ``metadata``, ``homepage``, ``repology`` or ``directory``.
+    url : str
+        URL the strategy is applied to. Ignored by ``metadata`` and ``repology``.
+    match : str
+        Package atom in ``cat/pkg-version`` form.
     settings : LivecheckSettings
-        Shared livecheck configuration. **Mutated**: when the ebuild defines
-        ``EGIT_REPO_URI`` with a branch, ``settings.branches[catpkg]`` is set
-        to that branch so downstream lookups (for example commit/tag fetches)
-        target the same ref. The mutation persists across packages.
+        Livecheck configuration.
     repo_root : :py:class:`~pathlib.Path`
         Repository root containing the package.
-    exclude : Sequence[str]
-        ``catpkg`` names or bare package names to skip.
 
     Returns
     -------
-    PropTuple | None
-        Tuple describing the discovered update, or ``None`` if the package
-        should be ignored or no update is available.
+    tuple[str, str, str, str, str]
+        Handler name, last version, top hash, hash date and URL.
+    """
+    match strategy:
+        case 'egit' | 'src_uri' | 'homepage':
+            return get_url_handler(url), *await parse_url(
+                url, match, settings, force_sha=strategy == 'egit')
+        case 'metadata':
+            return TYPE_METADATA, *await parse_metadata(str(repo_root), match, settings)
+        case 'repology':
+            return TYPE_REPOLOGY, await get_latest_repology(match, settings), '', '', ''
+    last_version, url = await get_latest_directory_package(url, match, settings)
+    return TYPE_DIRECTORY, last_version, '', '', url
+
+
+async def _find_latest(  # noqa: C901, PLR0912
+        match: str,
+        catpkg: str,
+        pkg: str,
+        ebuild_version: str,
+        src_uri: str,
+        settings: LivecheckSettings,
+        repo_root: Path,
+        store: ResultStore | None = None) -> tuple[str, str, str, str, str] | None:
+    """
+    Query upstream for the latest version of a package.
+
+    Parameters
+    ----------
+    match : str
+        Package atom in ``cat/pkg-version`` form.
+    catpkg : str
+        Category and package name.
+    pkg : str
+        Package name.
+    ebuild_version : str
+        Version of the ebuild.
+    src_uri : str
+        First ``SRC_URI`` of the ebuild.
+    settings : LivecheckSettings
+        Livecheck configuration. **Mutated** as described in :py:func:`_check_one_package`.
+    repo_root : :py:class:`~pathlib.Path`
+        Repository root containing the package.
+    store : ResultStore | None
+        Store used to remember which step of the discovery chain succeeded. That step is tried
+        first on the next run and the full chain is only used if it no longer yields a result.
+
+    Returns
+    -------
+    tuple[str, str, str, str, str] | None
+        Handler name, last version, top hash, hash date and URL, or ``None`` on error.
     """
-    match, restrict_version_process = extract_restrict_version(match_)
-    if restrict_version_process:
-        settings = copy(settings)
-        settings.restrict_version_process = restrict_version_process
-    catpkg, cat, pkg, ebuild_version = catpkg_catpkgsplit(match)
-    if catpkg in exclude or pkg in exclude:
-        log.debug('Ignoring %s.', catpkg)
-        return None
-    src_uri = await get_first_src_uri(match, repo_root)
-    if cat.startswith(('acct-', 'virtual')) or settings.type_packages.get(catpkg) == TYPE_NONE:
-        log.debug('Ignoring %s.', catpkg)
-        return None
-    log.info('Processing: %s | Version: %s', catpkg, ebuild_version)
     last_version = hash_date = top_hash = url = ''
+    handler = settings.type_packages.get(catpkg, '')
     ebuild = Path(repo_root) / catpkg / f'{pkg}-{ebuild_version}.ebuild'
     egit, branch = get_egit_repo(ebuild)
     if egit:
@@ -494,42 +582,101 @@ async def _check_one_package(  # noqa: C901, PLR0912, PLR0914
                                                                  settings,
                                                                  force_sha=True)
     else:
-        if egit:
-            log.debug('Trying EGIT_REPO_URI for %s: %s', catpkg, egit)
-            last_version, top_hash, hash_date, url = await parse_url(egit,
-                                                                     match,
-                                                                     settings,
-                                                                     force_sha=True)
-        if not last_version and not top_hash:
-            log.debug('Trying SRC_URI for %s: %s', catpkg, src_uri)
-            last_version, top_hash, hash_date, url = await parse_url(src_uri,
-                                                                     match,
-                                                                     settings,
-                                                                     force_sha=False)
-        if not last_version and not top_hash:
-            log.debug('Trying metadata.xml for %s.', catpkg)
-            last_version, top_hash, hash_date, url = await parse_metadata(
-                str(repo_root), match, settings)
         homepage = ' '.join(await get_aux(match, ['HOMEPAGE'], mytree=str(repo_root)))
         homes = [x for x in homepage.split(' ') if x]
-        for home in homes:
+        failed: tuple[str, str] | None = None
+        if remembered := store.get_strategy(catpkg) if store else None:
+            strategy, strategy_url = remembered
+            strategy_url = {'egit': egit, 'src_uri': src_uri}.get(strategy, strategy_url)
+            log.debug('Trying remembered strategy %s for %s: %s', strategy, catpkg, strategy_url)
+            handler, last_version, top_hash, hash_date, url = await _try_strategy(
+                strategy, strategy_url, match, settings, repo_root)
             if not last_version and not top_hash:
-                log.debug('Trying HOMEPAGE for %s: %s', catpkg, home)
-                last_version, top_hash, hash_date, url = await parse_url(home,
-                                                                         match,
-                                                                         settings,
-                                                                         force_sha=False)
+                log.debug('Remembered strategy %s for %s no longer yields a result.', strategy,
+                          catpkg)
+                failed = (strategy, strategy_url)
         if not last_version and not top_hash:
-            log.debug('Trying repology for %s.', catpkg)
-            last_version = await get_latest_repology(match, settings)
-        if not last_version and not top_hash:
-            log.debug('Trying directory listing for %s.', catpkg)
-            last_version, url = await get_latest_directory_package(src_uri, match, settings)
-            for home in homes:
-                last_version, url = await get_latest_directory_package(home, match, settings)
-                if last_version:
+            steps = [('egit', egit)] if egit else []
+            steps += [('src_uri', src_uri), ('metadata', '')]
+            steps += [('homepage', home) for home in homes]
+            steps += [('repology', ''), ('directory', src_uri)]
+            steps += [('directory', home) for home in homes]
+            for strategy, strategy_url in steps:
+                # The remembered strategy has just been tried.
+                if (strategy, strategy_url) == failed:
+                    continue
+                log.debug('Trying %s for %s: %s', _STRATEGY_NAMES[strategy], catpkg, strategy_url)
+                handler, last_version, top_hash, hash_date, url = await _try_strategy(
+                    strategy, strategy_url, match, settings, repo_root)
+                if last_version or top_hash:
                     break
+            if store and (last_version or top_hash):
+                store.put_strategy(catpkg, strategy, strategy_url)
+            elif store and failed:
+                store.delete_strategy(catpkg)
+
+    return handler, last_version, top_hash, hash_date, url
+
+
+async def _check_one_package(match_: str, settings: LivecheckSettings, repo_root: Path,
+                             exclude: Sequence[str]) -> PropTuple | None:
+    """
+    Check a single package for an upstream update.
 
+    When ``settings.max_age`` is set and ``settings.refresh_flag`` is not, a fresh result recorded
+    by a previous run is used instead of querying upstream. Every new result is recorded.
+
+    Parameters
+    ----------
+    match_ : str
+        Package atom in ``cat/pkg-version`` form, optionally suffixed with a
+        ``:slot:`` restriction.
+    settings : LivecheckSettings
+        Shared livecheck configuration. **Mutated**: when the ebuild defines
+        ``EGIT_REPO_URI`` with a branch, ``settings.branches[catpkg]`` is set
+        to that branch so downstream lookups (for example commit/tag fetches)
+        target the same ref. The mutation persists across packages.
+    repo_root : :py:class:`~pathlib.Path`
+        Repository root containing the package.
+    exclude : Sequence[str]
+        ``catpkg`` names or bare package names to skip.
+
+    Returns
+    -------
+    PropTuple | None
+        Tuple describing the discovered update, or ``None`` if the package
+        should be ignored or no update is available.
+    """
+    match, restrict_version_process = extract_restrict_version(match_)
+    if restrict_version_process:
+        settings = copy(settings)
+        settings.restrict_version_process = restrict_version_process
+    catpkg, cat, pkg, ebuild_version = catpkg_catpkgsplit(match)
+    if catpkg in exclude or pkg in exclude:
+        log.debug('Ignoring %s.', catpkg)
+        return None
+    src_uri = await get_first_src_uri(match, repo_root)
+    if cat.startswith(('acct-', 'virtual')) or settings.type_packages.get(catpkg) == TYPE_NONE:
+        log.debug('Ignoring %s.', catpkg)
+        return None
+    # Synchronised versions come from the local tree so they are never stored.
+    store = get_store() if catpkg not in settings.sync_version else None
+    if (store and settings.max_age and not settings.refresh_flag and
+        (stored := store.get(catpkg, ebuild_version, settings.max_age, restrict_version_process))):
+        log.info('Using stored result for %s from the %s handler.', catpkg, stored.handler)
+        last_version, top_hash, hash_date, url = (stored.last_version, stored.top_hash,
+                                                  stored.hash_date, stored.url)
+    else:
+        log.info('Processing: %s | Version: %s', catpkg, ebuild_version)
+        if (found := await _find_latest(match, catpkg, pkg, ebuild_version, src_uri, settings,
+                                        repo_root, store)) is None:
+            return None
+        handler, last_version, top_hash, hash_date, url = found
+        # Empty results may come from a transient failure so they are checked again next time.
+        if store and (last_version or top_hash):
+            store.put(catpkg, ebuild_version,
+                      StoredResult(handler, url, last_version, top_hash, hash_date, time()),
+                      RESULT_TTLS.get(handler, DEFAULT_RESULT_TTL), restrict_version_process)
     if last_version or top_hash:
         log.debug('Inserting %s: %s -> %s : %s', catpkg, ebuild_version, last_version, top_hash)
         return (cat, pkg, ebuild_version, last_version, top_hash, hash_date, url)
@@ -542,7 +689,8 @@ async def get_props(search_dir: Path,
                     settings: LivecheckSettings,
                     names: Sequence[str] | None = None,
                     exclude: Sequence[str] | None = None,
-                    parallel: int = 20) -> list[PropTuple]:
+                    parallel: int = 20,
+                    queue: asyncio.Queue[PropTuple | None] | None = None) -> list[PropTuple]:
     """
     Get properties for packages in the search directory.
 
@@ -560,6 +708,9 @@ async def get_props(search_dir: Path,
         Package names to exclude.
     parallel : int
         Maximum number of packages to check concurrently.
+    queue : asyncio.Queue[PropTuple | None] | None
+        If given, each result is put on this queue as soon as its check completes so consumers
+        can start updating before every package has been checked.
 
     Returns
     -------
@@ -571,15 +722,13 @@ async def get_props(search_dir: Path,
     """
     exclude = exclude or []
     if not names:
-        names = [
-            f'{path.parent.parent.name}/{path.parent.name}'
-            async for path in AnyioPath(search_dir).glob('**/*.ebuild')
-        ]
+        names = await asyncio.to_thread(find_packages, search_dir, repo_root)
     matches_list = sorted(await get_highest_matches(names, repo_root, settings))
     log.info('Found %d ebuild%s.', len(matches_list), 's' if len(matches_list) != 1 else '')
     if not matches_list:
         log.error('No matches!')
         raise click.Abort
+    await load_metadata([extract_restrict_version(m)[0] for m in matches_list], repo_root)
     sem = asyncio.Semaphore(parallel)
     total = len(matches_list)
     completed = 0
@@ -591,7 +740,9 @@ async def get_props(search_dir: Path,
             completed += 1
             if settings.progress_flag:
                 log.info('Progress: %d/%d packages checked.', completed, total)
-            return result
+        if queue is not None and result is not None:
+            await queue.put(result)
+        return result
 
     results = await asyncio.gather(*(_bounded(m) for m in matches_list))
     return [r for r in results if r is not None]
@@ -713,6 +864,7 @@ async def _recover_ebuild(new_filename: str, ebuild: Path, cp: str, search_dir:
             await proc.wait()
     except OSError:
         log.exception('Error recovering `%s`.', new_filename)
+    get_package_versions.cache_clear()
 
 
 async def do_main(  # noqa: C901, PLR0912, PLR0914, PLR0915
@@ -814,6 +966,8 @@ async def do_main(  # noqa: C901, PLR0912, PLR0914, PLR0915
             except OSError:
                 log.exception('Error writing `%s`.', new_filename)
                 return
+            # Streamed checks of sync_version packages must see the new ebuild.
+            get_package_versions.cache_clear()
             await execute_hooks(hook_dir, 'pre', search_dir, cp, ebuild_version, last_version,
                                 old_sha, top_hash, hash_date)
             await asyncio.to_thread(digest_ebuild, new_filename)
@@ -883,6 +1037,48 @@ async def do_main(  # noqa: C901, PLR0912, PLR0914, PLR0915
                                 old_sha, top_hash, hash_date)
 
 
+async def _update_worker(queue: asyncio.Queue[PropTuple | None], search_dir: Path,
+                         settings: LivecheckSettings, hook_dir: Path | None) -> None:
+    """
+    Run :py:func:`do_main` for every result taken from the queue until a ``None`` sentinel.
+
+    Parameters
+    ----------
+    queue : asyncio.Queue[PropTuple | None]
+        Queue fed by :py:func:`get_props`.
+    search_dir : Path
+        Repository root containing the ebuilds.
+    settings : LivecheckSettings
+        Livecheck configuration.
+    hook_dir : Path | None
+        Hook directory passed to :py:func:`do_main`.
+    """
+    while (props := await queue.get()) is not None:
+        cat, pkg, ebuild_version, last_version, top_hash, hash_date, url = props
+        await do_main(cat=cat,
+                      ebuild_version=ebuild_version,
+                      hash_date=hash_date,
+                      hook_dir=hook_dir,
+                      last_version=last_version,
+                      pkg=pkg,
+                      search_dir=search_dir,
+                      settings=settings,
+                      top_hash=top_hash,
+                      url=url)
+
+
+def _parse_host_limits(ctx: click.Context, param: click.Parameter,
+                       value: tuple[str, ...]) -> dict[str, int]:
+    limits: dict[str, int] = {}
+    for item in value:
+        host, sep, limit = item.partition('=')
+        if not sep or not host or not limit.isdigit() or int(limit) < 1:
+            msg = f'Expected HOST=N with N >= 1, got "{item}".'
+            raise click.BadParameter(msg, ctx, param)
+        limits[host.lower()] = int(limit)
+    return limits
+
+
 async def _async_main(*,
                       search_dir: Path,
                       repo_root: str,
@@ -891,16 +1087,60 @@ async def _async_main(*,
                       exclude: tuple[str, ...] | None,
                       hook_dir: Path | None,
                       max_concurrent_http: int = 3,
-                      parallel: int = 1) -> None:
-    init_sessions(asyncio.Semaphore(max_concurrent_http))
+                      parallel: int = 1,
+                      update_parallel: int | None = None,
+                      stream: bool = False,
+                      multiplexed: bool = False,
+                      offline: bool = False,
+                      prepare_offline: bool = False,
+                      recorder: ArchiveRecorder | None = None,
+                      replayer: ArchiveReplayer | None = None) -> None:
+    store = open_store()
+    init_sessions(asyncio.Semaphore(max_concurrent_http),
+                  settings.host_limits,
+                  multiplexed=multiplexed,
+                  adaptive_limits=store.get_concurrency_limits(),
+                  mirrors=get_thirdpartymirrors(repo_root),
+                  preferred_mirrors=store.get_preferred_mirrors(),
+                  offline=offline,
+                  prepare_offline=prepare_offline,
+                  recorder=recorder,
+                  replayer=replayer)
+    if settings.refresh_flag:
+        store.delete_missing()
+    update_parallel = max(1, update_parallel or parallel)
     try:
+        if stream:
+            queue: asyncio.Queue[PropTuple | None] = asyncio.Queue(maxsize=update_parallel)
+            workers = [
+                asyncio.create_task(_update_worker(queue, Path(repo_root), settings, hook_dir))
+                for _ in range(update_parallel)
+            ]
+
+            async def _produce() -> None:
+                await get_props(search_dir,
+                                Path(repo_root),
+                                settings,
+                                package_names,
+                                exclude,
+                                parallel=parallel,
+                                queue=queue)
+                for _ in workers:
+                    await queue.put(None)
+
+            try:
+                await asyncio.gather(_produce(), *workers)
+            finally:
+                for worker in workers:
+                    worker.cancel()
+            return
         props = await get_props(search_dir,
                                 Path(repo_root),
                                 settings,
                                 package_names,
                                 exclude,
                                 parallel=parallel)
-        sem = asyncio.Semaphore(parallel)
+        sem = asyncio.Semaphore(update_parallel)
 
         async def _bounded_do_main(cat: str, pkg: str, ebuild_version: str, last_version: str,
                                    top_hash: str, hash_date: str, url: str) -> None:
@@ -921,10 +1161,124 @@ async def _async_main(*,
         log.exception('Exception during processing.')
         raise
     finally:
+        if hosts := tripped_hosts():
+            log.warning('Some packages could not be checked because these hosts kept failing: %s.',
+                        ', '.join(hosts))
+        if misses := offline_misses():
+            log.warning('%d requests could not be answered offline: %s.', len(misses),
+                        ', '.join(misses))
+        store.put_concurrency_limits(adaptive_limits())
+        store.put_preferred_mirrors(preferred_mirrors())
         await close_sessions()
+        close_store()
+        # Offline runs keep every response they may need again.
+        if not offline and replayer is None:
+            _prune_http_cache()
+
 
+def _prune_http_cache() -> None:
+    try:
+        with closing(open_http_cache()) as http_cache:
+            if removed := http_cache.prune_if_due():
+                log.debug('Removed %d responses from the HTTP cache.', removed)
+    except (ValueError, sqlite3.Error):
+        log.exception('Could not prune the HTTP cache.')
+
+
+def _format_size(size: float) -> str:
+    for unit in ('B', 'KiB', 'MiB'):
+        if size < 1024:  # noqa: PLR2004
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024
+    return f'{size:.1f} GiB'
+
+
+def _echo_cache_stats(host: str, stats: HostStats) -> None:
+    ratio = '-' if stats.hit_ratio is None else f'{stats.hit_ratio:.0%}'
+    click.echo(f'{host:<40} {stats.entries:>8} {_format_size(stats.size):>10} {stats.hits:>8} '
+               f'{stats.misses:>8} {ratio:>9}')
+
+
+@contextmanager
+def _open_http_cache() -> Iterator[HttpCache]:
+    with closing(open_http_cache()) as http_cache:
+        try:
+            yield http_cache
+        except ValueError as e:
+            raise click.ClickException(str(e)) from e
+
+
+@click.group(context_settings={'help_option_names': ['-h', '--help']})
+def cache() -> None:
+    """Inspect and maintain the HTTP cache."""
+
+
+@cache.command('stats')
+def cache_stats() -> None:
+    """Show the size and hit ratio of the HTTP cache by host."""
+    with _open_http_cache() as http_cache:
+        stats = http_cache.stats()
+        file_size = http_cache.file_size
+    click.echo(f'{"HOST":<40} {"ENTRIES":>8} {"SIZE":>10} {"HITS":>8} {"MISSES":>8} '
+               f'{"HIT RATIO":>9}')
+    for host, host_stats in sorted(stats.items(), key=lambda item: (-item[1].size, item[0])):
+        _echo_cache_stats(host, host_stats)
+    _echo_cache_stats(
+        'Total',
+        HostStats(sum(x.entries for x in stats.values()), sum(x.size for x in stats.values()),
+                  sum(x.hits for x in stats.values()), sum(x.misses for x in stats.values())))
+    click.echo(f'Database size: {_format_size(file_size)}')
+
+
+@cache.command('maintain')
+def cache_maintain() -> None:
+    """
+    Prune the HTTP cache to its default limits and compact it once a week.
 
-@click.command(context_settings={'help_option_names': ['-h', '--help']})
+    Meant to be run regularly, for example daily from cron.
+    """
+    with _open_http_cache() as http_cache:
+        http_cache.maintain()
+
+
+@cache.command('prune')
+@click.option('--max-age',
+              type=click.IntRange(min=0),
+              default=DEFAULT_MAX_AGE,
+              show_default=True,
+              help='Remove responses older than this many seconds.')
+@click.option('--max-size',
+              type=click.IntRange(min=0),
+              default=DEFAULT_MAX_SIZE // 1024 ** 2,
+              show_default=True,
+              help='Remove the least recently used responses beyond this many MiB.')
+def cache_prune(max_age: int, max_size: int) -> None:
+    """Remove old and least recently used responses from the HTTP cache."""
+    with _open_http_cache() as http_cache:
+        removed = http_cache.prune(max_size * 1024 ** 2, max_age)
+    click.echo(f'Removed {removed} responses.')
+
+
+@cache.command('clear')
+def cache_clear() -> None:
+    """Remove every response and statistic from the HTTP cache."""
+    with _open_http_cache() as http_cache:
+        removed = http_cache.clear()
+    click.echo(f'Removed {removed} responses.')
+
+
+@cache.command('vacuum')
+def cache_vacuum() -> None:
+    """Compact the HTTP cache database."""
+    with _open_http_cache() as http_cache:
+        before = http_cache.file_size
+        http_cache.vacuum()
+        after = http_cache.file_size
+    click.echo(f'Database size: {_format_size(before)} -> {_format_size(after)}')
+
+
+@click.command(context_settings={'help_option_names': ['-h', '--help']},
+               epilog='Run "livecheck-cache --help" to inspect and maintain the HTTP cache.')
 @click.option('-a', '--auto-update', is_flag=True, help='Rename and modify ebuilds.')
 @click.option('-d', '--debug', is_flag=True, help='Enable debug logging.')
 @click.option('-D', '--development', is_flag=True, help='Include development packages.')
@@ -935,6 +1289,11 @@ async def _async_main(*,
               default=None,
               help='Run a hook directory scripts with various parameters.',
               type=click.Path(file_okay=False, exists=True, resolve_path=True, path_type=Path))
+@click.option('--host-limit',
+              multiple=True,
+              metavar='HOST=N',
+              callback=_parse_host_limits,
+              help='Maximum concurrent HTTP requests to a host and its subdomains.')
 @click.option('-k', '--keep-old', is_flag=True, help='Keep old ebuild versions.')
 @click.option('-M',
               '--max-concurrent-http',
@@ -942,6 +1301,16 @@ async def _async_main(*,
               default=3,
               show_default=True,
               help='Maximum concurrent HTTP requests.')
+@click.option('--max-age',
+              type=click.IntRange(min=0),
+              default=0,
+              help='Use results of previous runs that are newer than this many seconds.')
+@click.option('--multiplexed',
+              is_flag=True,
+              help='Send concurrent HTTP requests to a host over one HTTP/2 or HTTP/3 connection.')
+@click.option('--offline',
+              is_flag=True,
+              help='Answer HTTP requests only from the HTTP cache and never use the network.')
 @click.option('-p',
               '--parallel',
               type=int,
@@ -949,6 +1318,32 @@ async def _async_main(*,
               show_default=True,
               help='Maximum parallel ebuilds to process.')
 @click.option('-P', '--progress', is_flag=True, help='Enable progress logging.')
+@click.option('--prepare-offline',
+              is_flag=True,
+              help='Store HTTP responses in the HTTP cache for later --offline runs.')
+@click.option('--record',
+              metavar='FILE',
+              help='Record every HTTP request and response to an archive.',
+              type=click.Path(dir_okay=False, writable=True, path_type=Path))
+@click.option('-r', '--refresh', is_flag=True, help='Ignore results of previous runs.')
+@click.option('--replay',
+              metavar='FILE',
+              help='Answer HTTP requests only from an archive made with --record.',
+              type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option('--replay-latency',
+              type=click.FloatRange(min=0),
+              metavar='SECONDS',
+              default=None,
+              help='Seconds each replayed request takes. Defaults to the recorded time.')
+@click.option('-S',
+              '--stream',
+              is_flag=True,
+              help='Start updating ebuilds while other packages are still being checked.')
+@click.option('-U',
+              '--update-parallel',
+              type=int,
+              default=None,
+              help='Maximum parallel ebuild updates. Defaults to the value of --parallel.')
 @click.option('--package-manager',
               type=click.Choice(sorted(PACKAGE_MANAGERS)),
               default='npm',
@@ -967,16 +1362,27 @@ async def _async_main(*,
 def main(working_dir: Path,
          exclude: tuple[str, ...] | None = None,
          hook_dir: Path | None = None,
+         host_limit: Mapping[str, int] | None = None,
+         max_age: int = 0,
          max_concurrent_http: int = 3,
          package_names: tuple[str, ...] | list[str] | None = None,
          parallel: int = 1,
+         update_parallel: int | None = None,
+         record: Path | None = None,
+         replay: Path | None = None,
+         replay_latency: float | None = None,
          *,
          auto_update: bool = False,
          debug: bool = False,
          development: bool = False,
          git: bool = False,
          keep_old: bool = False,
+         multiplexed: bool = False,
+         offline: bool = False,
+         prepare_offline: bool = False,
          progress: bool = False,
+         refresh: bool = False,
+         stream: bool = False,
          package_manager: str = 'npm') -> None:
     """Update ebuilds to their latest versions."""  # noqa: DOC501
     setup_logging(debug=debug,
@@ -999,6 +1405,12 @@ def main(working_dir: Path,
     if not repo_root:
         log.error('Not inside a repository configured in repos.conf.')
         raise click.Abort
+    if record and (offline or replay):
+        log.error('--record cannot be used with --offline or --replay.')
+        raise click.Abort
+    if prepare_offline and (offline or replay):
+        log.error('--prepare-offline cannot be used with --offline or --replay.')
+        raise click.Abort
     if git:
         if not auto_update:
             log.error('Git option requires --auto-update.')
@@ -1024,15 +1436,37 @@ def main(working_dir: Path,
     settings.git_flag = git
     settings.keep_old_flag = keep_old
     settings.progress_flag = progress
+    settings.refresh_flag = refresh
+    settings.max_age = max_age
+    settings.host_limits.update(host_limit or {})
     settings.default_package_manager = package_manager
 
+    replayer = None
+    if replay:
+        try:
+            replayer = ArchiveReplayer(replay, replay_latency)
+        except ValueError as e:
+            raise click.ClickException(str(e)) from e
+    recorder = ArchiveRecorder(record) if record else None
     package_names_list = sorted(package_names or [])
-    asyncio.run(
-        _async_main(exclude=exclude,
-                    hook_dir=hook_dir,
-                    max_concurrent_http=max_concurrent_http,
-                    package_names=package_names_list,
-                    parallel=parallel,
-                    repo_root=repo_root,
-                    search_dir=search_dir,
-                    settings=settings))
+    try:
+        asyncio.run(
+            _async_main(exclude=exclude,
+                        hook_dir=hook_dir,
+                        max_concurrent_http=max_concurrent_http,
+                        multiplexed=multiplexed,
+                        offline=offline,
+                        package_names=package_names_list,
+                        prepare_offline=prepare_offline,
+                        parallel=parallel,
+                        recorder=recorder,
+                        replayer=replayer,
+                        repo_root=repo_root,
+                        search_dir=search_dir,
+                        settings=settings,
+                        stream=stream,
+                        update_parallel=update_parallel))
+    finally:
+        if recorder:
+            recorder.close()
+            log.info('Recorded %d requests to %s.', recorder.count, record)
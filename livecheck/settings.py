@@ -95,6 +95,7 @@ def gather_settings(search_dir: Path) -> LivecheckSettings:  # noqa: C901, PLR09
     request_method: dict[str, str] = {}
     request_data: dict[str, dict[str, str]] = {}
     regex_multiline: dict[str, bool] = {}
+    host_limits: dict[str, int] = {}
 
     for path in search_dir.glob('**/livecheck.json'):
         log.debug('Opening %s.', path)
@@ -266,6 +267,9 @@ def gather_settings(search_dir: Path) -> LivecheckSettings:  # noqa: C901, PLR09
             if 'multiline' in settings_parsed:
                 check_instance(settings_parsed['multiline'], 'multiline', 'bool', path)
                 regex_multiline[catpkg] = settings_parsed['multiline']
+            if 'host_limits' in settings_parsed:
+                check_instance(settings_parsed['host_limits'], 'host_limits', 'dict', path)
+                _merge_host_limits(host_limits, settings_parsed['host_limits'], path)
 
     return LivecheckSettings(
         branches, custom_livechecks, dotnet_projects, golang_packages, type_packages,
@@ -273,7 +277,18 @@ def gather_settings(search_dir: Path) -> LivecheckSettings:  # noqa: C901, PLR09
         jetbrains_packages, keep_old, gomodule_packages, gomodule_path, nodejs_packages,
         nodejs_path, nodejs_package_managers, development, composer_packages, composer_path,
         maven_packages, maven_path, regex_version, restrict_version, sync_version, stable_version,
-        request_headers, request_params, request_method, request_data, regex_multiline)
+        request_headers, request_params, request_method, request_data, regex_multiline, host_limits)
+
+
+def _merge_host_limits(host_limits: dict[str, int], value: object, path: Path) -> None:
+    if not isinstance(value, dict):
+        return
+    for host, limit in value.items():
+        if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+            log.error('Invalid limit for "%s" in "host_limits" in %s.', host, path)
+            continue
+        # The most conservative limit wins when several packages limit the same host.
+        host_limits[host.lower()] = min(limit, host_limits.get(host.lower(), limit))
 
 
 def check_instance(
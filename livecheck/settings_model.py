@@ -55,6 +55,8 @@ class LivecheckSettings:
     """Dictionary of catpkg to form data for POST requests."""
     regex_multiline: dict[str, bool] = field(default_factory=dict)
     """Dictionary of catpkg to multiline flag for regex."""
+    host_limits: dict[str, int] = field(default_factory=dict)
+    """Dictionary of host name to maximum concurrent HTTP requests."""
     # Settings from command line flag.
     auto_update_flag: bool = False
     debug_flag: bool = False
@@ -62,7 +64,9 @@ class LivecheckSettings:
     git_flag: bool = False
     keep_old_flag: bool = False
     progress_flag: bool = False
+    refresh_flag: bool = False
     default_package_manager: str = 'npm'
+    max_age: int = 0
     # Internal settings.
     restrict_version_process: str = ''
 
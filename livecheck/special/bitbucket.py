@@ -5,7 +5,7 @@ from pathlib import Path
 from typing import TYPE_CHECKING
 from urllib.parse import urlparse
 
-from livecheck.utils import get_content, is_sha
+from livecheck.utils import get_content, is_sha, response_json
 from livecheck.utils.portage import get_last_version
 
 from .utils import get_archive_extension, log_unhandled_commit
@@ -77,7 +77,7 @@ async def get_latest_bitbucket_package(url: str, cpv: str,
     results: list[dict[str, str]] = [{
         'tag': tag.get('name', ''),
         'id': tag.get('target', {}).get('hash', '')
-    } for tag in tags_response.json().get('values', [])]
+    } for tag in response_json(tags_response).get('values', [])]
 
     # The tag may not be created and you need to know the downloads
     # for the latest versions
@@ -87,7 +87,7 @@ async def get_latest_bitbucket_package(url: str, cpv: str,
     while url and iteration_count < MAX_ITERATIONS:
         if not (r := await get_content(url)).ok:
             break
-        data = r.json()
+        data = response_json(r)
 
         results.extend({
             'tag': item.get('name', ''),
@@ -1,7 +1,7 @@
 """DaVinci functions."""
 from __future__ import annotations
 
-from livecheck.utils import get_content
+from livecheck.utils import get_content, response_json
 
 __all__ = ('get_latest_davinci_package',)
 
@@ -27,7 +27,7 @@ async def get_latest_davinci_package(pkg: str) -> str:
     if not (r := await get_content(url)):
         return ''
 
-    data = r.json()
+    data = response_json(r)
     if data['linux']['releaseNum'] == 0:
         return f"{data['linux']['major']}.{data['linux']['minor']}"
     return f"{data['linux']['major']}.{data['linux']['minor']}.{data['linux']['releaseNum']}"
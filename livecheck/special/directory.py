@@ -6,7 +6,6 @@ from typing import TYPE_CHECKING
 from urllib.parse import urljoin, urlparse
 import re
 
-from bs4 import BeautifulSoup
 from livecheck.utils import get_content
 from livecheck.utils.portage import get_last_version
 
@@ -42,6 +41,9 @@ async def get_latest_directory_package(url: str, ebuild: str,
         if not (r := await get_content(directory)):
             return '', ''
 
+        # Parsing HTML brings in bs4 and html5lib, which take long to import.
+        from bs4 import BeautifulSoup  # noqa: PLC0415
+
         archive = m.group(1).strip()
 
         results: list[dict[str, str]] = []
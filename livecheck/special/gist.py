@@ -4,7 +4,7 @@ from __future__ import annotations
 from datetime import datetime
 import re
 
-from livecheck.utils import get_content
+from livecheck.utils import get_content, response_json
 
 __all__ = ('get_latest_gist_package', 'is_gist')
 
@@ -39,7 +39,7 @@ async def get_latest_gist_package(url: str) -> tuple[str, str]:
     if not (r := await get_content(url)):
         return '', ''
 
-    history = r.json().get('history', [])
+    history = response_json(r).get('history', [])
     if not history:
         return '', ''
     latest = max(history, key=lambda x: x.get('committed_at', ''))
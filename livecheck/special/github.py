@@ -2,13 +2,23 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 from urllib.parse import urlparse
+import asyncio
+import json
 import re
 
 from defusedxml import ElementTree as ET  # noqa: N817
 from livecheck.constants import RSS_NS
-from livecheck.utils import get_content, is_sha
+from livecheck.utils import (
+    get_content,
+    is_sha,
+    post_json,
+    response_json,
+    response_xml,
+    stores_responses,
+)
+from livecheck.utils.credentials import get_api_credentials
 from livecheck.utils.portage import catpkg_catpkgsplit, get_last_version
 
 from .utils import get_archive_extension
@@ -23,7 +33,127 @@ __all__ = ('GITHUB_METADATA', 'get_latest_github', 'get_latest_github_commit',
 GITHUB_DOWNLOAD_URL = '%s/tags.atom'
 GITHUB_COMMIT_URL = 'https://api.github.com/repos/%s/%s/branches/%s'
 GITHUB_DATE_URL = 'https://api.github.com/repos/%s/%s/git/refs/tags/%s'
+GITHUB_GRAPHQL_URL = 'https://api.github.com/graphql'
 GITHUB_METADATA = 'github'
+GRAPHQL_BATCH_SIZE = 50
+"""Maximum number of repository lookups in a single GraphQL query."""
+GRAPHQL_BATCH_DELAY = 0.05
+"""Seconds to wait for other lookups to join a GraphQL query before sending it."""
+GRAPHQL_TAGS_COUNT = 100
+"""Number of most recent tags fetched per repository."""
+
+
+class _GraphQLBatcher:
+    """Collect GitHub lookups from concurrent checks and resolve them in batched GraphQL queries."""
+    def __init__(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._pending: dict[str, asyncio.Future[Any]] = {}
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def query(self, fragment: str) -> Any:
+        """
+        Queue a ``repository`` selection and wait for the batch containing it.
+
+        Identical selections share a single result.
+
+        Parameters
+        ----------
+        fragment : str
+            GraphQL ``repository(...) { ... }`` selection.
+
+        Returns
+        -------
+        Any
+            The ``repository`` object of the response, or ``None`` on failure.
+        """
+        if (future := self._pending.get(fragment)) is None:
+            future = self._pending[fragment] = self._loop.create_future()
+            if len(self._pending) >= GRAPHQL_BATCH_SIZE:
+                self._flush()
+            elif self._timer is None:
+                self._timer = self._loop.call_later(GRAPHQL_BATCH_DELAY, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        task = self._loop.create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    async def _send(batch: dict[str, asyncio.Future[Any]]) -> None:
+        data: dict[str, Any] = {}
+        try:
+            query = ' '.join(f'r{i}: {fragment}' for i, fragment in enumerate(batch))
+            response = await post_json(GITHUB_GRAPHQL_URL, {'query': f'query {{ {query} }}'})
+            if isinstance(response, dict):
+                data = response.get('data') or {}
+        finally:
+            for i, future in enumerate(batch.values()):
+                if not future.done():
+                    future.set_result(data.get(f'r{i}'))
+
+
+_batcher: _GraphQLBatcher | None = None
+
+
+async def _graphql_repository(fragment: str) -> Any:
+    global _batcher  # noqa: PLW0603
+    if _batcher is None or _batcher._loop is not asyncio.get_running_loop():  # noqa: SLF001
+        _batcher = _GraphQLBatcher()
+    return await _batcher.query(fragment)
+
+
+def _use_graphql() -> bool:
+    # The GraphQL API is not available to anonymous clients. Batched queries depend on which
+    # checks run concurrently so they cannot be replayed.
+    return not stores_responses() and bool(get_api_credentials('github.com'))
+
+
+async def _graphql_tags(owner: str, repo: str) -> list[tuple[str, str]] | None:
+    """
+    Get the most recent tags of a repository and the commit SHAs they point to.
+
+    Returns
+    -------
+    list[tuple[str, str]] | None
+        Tag names and peeled commit SHAs, or ``None`` if the query failed.
+    """
+    repository = await _graphql_repository(
+        f'repository(owner: {json.dumps(owner)}, name: {json.dumps(repo)}) {{ '
+        f'refs(refPrefix: "refs/tags/", first: {GRAPHQL_TAGS_COUNT}, '
+        'orderBy: {field: TAG_COMMIT_DATE, direction: DESC}) { '
+        'nodes { name target { oid ... on Tag { target { oid } } } } } }')
+    if not repository or not repository.get('refs'):
+        return None
+    tags = []
+    for node in repository['refs']['nodes']:
+        target = node.get('target') or {}
+        tags.append((node['name'], (target.get('target') or target).get('oid', '')))
+    return tags
+
+
+async def _graphql_branch_head(owner: str, repo: str, branch: str) -> tuple[str, str] | None:
+    """
+    Get the commit SHA and date at the head of a branch.
+
+    Returns
+    -------
+    tuple[str, str] | None
+        Commit SHA and ISO 8601 commit date, or ``None`` if the query failed.
+    """
+    repository = await _graphql_repository(
+        f'repository(owner: {json.dumps(owner)}, name: {json.dumps(repo)}) {{ '
+        f'ref(qualifiedName: {json.dumps(f"refs/heads/{branch}")}) {{ '
+        'target { oid ... on Commit { committedDate } } } }')
+    if not repository or not repository.get('ref'):
+        return None
+    target = repository['ref']['target']
+    return target['oid'], target.get('committedDate', '')
 
 
 def _github_tag_reference(url: str) -> str:
@@ -83,12 +213,19 @@ async def get_latest_github_package(url: str, ebuild: str,
     """
     version_reference = _github_tag_reference(url)
     domain, owner, repo = extract_owner_repo(url)
+    if owner and repo and _use_graphql() and (tags := await _graphql_tags(owner, repo)) is not None:
+        shas = dict(tags)
+        candidates = [{'tag': tag, 'id': tag} for tag in shas]
+        if not (last_version := get_last_version(
+                candidates, repo, ebuild, settings, version_reference=version_reference)):
+            return '', ''
+        return last_version['version'], shas[last_version['id']]
     url = GITHUB_DOWNLOAD_URL % (domain)
     if not owner or not repo or not (r := await get_content(url)):
         return '', ''
 
     try:
-        root = ET.fromstring(r.text or '')
+        root = response_xml(r)
     except ET.ParseError:
         return '', ''
 
@@ -108,7 +245,7 @@ async def get_latest_github_package(url: str, ebuild: str,
     if not (r := await get_content(url)):
         return last_version['version'], ''
 
-    ref_object = r.json().get('object', {})
+    ref_object = response_json(r).get('object', {})
     object_url = ref_object.get('url')
 
     if object_url and ref_object.get('type') == 'tag':
@@ -116,7 +253,7 @@ async def get_latest_github_package(url: str, ebuild: str,
         if not r2:
             return last_version['version'], ''
 
-        tag_data = r2.json()
+        tag_data = response_json(r2)
         sha = tag_data.get('object', {}).get('sha')
     else:
         sha = ref_object.get('sha')
@@ -165,16 +302,21 @@ async def get_latest_github_commit2(owner: str, repo: str, branch: str) -> tuple
     tuple[str, str]
         Commit SHA and formatted date string, or empty strings if the API call fails.
     """
-    url = GITHUB_COMMIT_URL % (owner, repo, branch)
-    if not (r := await get_content(url)):
-        return '', ''
-    d = r.json()['commit']['commit']['committer']['date'][:10]
+    if _use_graphql() and (head := await _graphql_branch_head(owner, repo, branch)):
+        sha, d = head
+    else:
+        url = GITHUB_COMMIT_URL % (owner, repo, branch)
+        if not (r := await get_content(url)):
+            return '', ''
+        commit = response_json(r)['commit']
+        sha, d = commit['sha'], commit['commit']['committer']['date']
+    d = d[:10]
     try:
         dt = datetime.fromisoformat(d.replace('Z', '+00:00'))
         formatted_date = dt.strftime('%Y%m%d')
     except ValueError:
         formatted_date = d[:10]
-    return r.json()['commit']['sha'], formatted_date
+    return sha, formatted_date
 
 
 def is_github(url: str) -> bool:
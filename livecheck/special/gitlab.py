@@ -5,7 +5,7 @@ from typing import TYPE_CHECKING
 from urllib.parse import quote, urlparse
 import re
 
-from livecheck.utils import get_content, is_sha
+from livecheck.utils import get_content, is_sha, response_json
 from livecheck.utils.portage import get_last_version
 
 from .utils import log_unhandled_commit
@@ -85,7 +85,7 @@ async def get_latest_gitlab_package(url: str, ebuild: str,
     results: list[dict[str, str]] = [{
         'tag': tag.get('name', ''),
         'id': tag.get('commit', {}).get('id', '')
-    } for tag in r.json()]
+    } for tag in response_json(r)]
 
     if last_version := get_last_version(results,
                                         repo,
@@ -6,7 +6,7 @@ from urllib.parse import urlparse
 import logging
 
 from anyio import Path as AnyioPath
-from livecheck.utils import get_content
+from livecheck.utils import get_content, response_json
 from livecheck.utils.portage import catpkg_catpkgsplit, get_last_version
 
 from .utils import EbuildTempFile, search_ebuild
@@ -53,7 +53,7 @@ async def get_latest_jetbrains_package(ebuild: str, settings: LivecheckSettings)
     product_code = product_name.get(product_code, product_code)
 
     results: list[dict[str, str]] = []
-    for product in r.json():
+    for product in response_json(r):
         if product['name'] == product_code:
             for release in product['releases']:
                 if (release['type'] == 'eap'
@@ -5,7 +5,7 @@ from typing import TYPE_CHECKING
 from urllib.parse import urlparse
 import re
 
-from livecheck.utils import get_content
+from livecheck.utils import get_content, response_json
 from livecheck.utils.portage import get_last_version
 
 if TYPE_CHECKING:
@@ -46,14 +46,14 @@ async def get_latest_metacpan_package2(package_name: str, ebuild: str,
     results: list[dict[str, str]] = []
     url = METACPAN_DOWNLOAD_URL1 % (package_name)
     if r := await get_content(url):
-        for hit in r.json().get('hits', {}).get('hits', []):
+        for hit in response_json(r).get('hits', {}).get('hits', []):
             results.extend([{'tag': hit['_source']['version']}])
 
     # Many times it does not exist as in the previous list,
     # that is why the latest version is checked again.
     url = METACPAN_DOWNLOAD_URL2 % (package_name)
     if r := await get_content(url):
-        results.append({'tag': r.json().get('version')})
+        results.append({'tag': response_json(r).get('version')})
 
     last_version = get_last_version(results, package_name, ebuild, settings)
     if last_version:
@@ -4,7 +4,7 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 from urllib.parse import urlparse
 
-from livecheck.utils import get_content
+from livecheck.utils import get_content, response_json
 from livecheck.utils.portage import get_last_version
 
 if TYPE_CHECKING:
@@ -41,7 +41,7 @@ async def get_latest_package(src_uri: str, ebuild: str, settings: LivecheckSetti
 
     results: list[dict[str, str]] = []
     if r := await get_content(url):
-        for release in r.json().get('versions', {}):
+        for release in response_json(r).get('versions', {}):
             results.extend([{'tag': release}])
 
         if last_version := get_last_version(results, '', ebuild, settings):
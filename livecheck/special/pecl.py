@@ -4,8 +4,7 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 from urllib.parse import urlparse
 
-from defusedxml import ElementTree as ET  # noqa: N817
-from livecheck.utils import assert_not_none, get_content
+from livecheck.utils import assert_not_none, get_content, response_xml
 from livecheck.utils.portage import catpkg_catpkgsplit, get_last_version
 
 if TYPE_CHECKING:
@@ -47,7 +46,7 @@ async def get_latest_pecl_package2(program_name: str, ebuild: str,
         return ''
 
     results: list[dict[str, str]] = []
-    for release in ET.fromstring(r.text or '').findall(f'{NAMESPACE}r'):
+    for release in response_xml(r).findall(f'{NAMESPACE}r'):
         stability = release.find(f'{NAMESPACE}s')
         stability = assert_not_none(stability)
         if settings.is_devel(catpkg) or assert_not_none(stability.text) == 'stable':
@@ -6,7 +6,7 @@ from typing import TYPE_CHECKING
 from urllib.parse import urlparse
 import re
 
-from livecheck.utils import get_content
+from livecheck.utils import get_content, response_json
 from livecheck.utils.portage import get_last_version
 
 from .utils import get_archive_extension
@@ -67,7 +67,7 @@ async def get_latest_pypi_package2(project_name: str, src_uri: str, ebuild: str,
 
     results: list[dict[str, str]] = []
     if r := await get_content(url):
-        for release, item in r.json().get('releases', {}).items():
+        for release, item in response_json(r).get('releases', {}).items():
             results.extend([{'tag': release, 'url': get_url(ext, item)}])
 
         version_reference = Path(urlparse(src_uri).path).name
@@ -7,7 +7,7 @@ import re
 
 from defusedxml import ElementTree as ET  # noqa: N817
 from livecheck.constants import RSS_NS
-from livecheck.utils import get_content, is_sha
+from livecheck.utils import get_content, is_sha, response_xml
 from livecheck.utils.portage import catpkg_catpkgsplit, get_last_version
 
 if TYPE_CHECKING:
@@ -61,7 +61,7 @@ async def get_latest_regex_package(ebuild: str, url: str, regex: str,
             logger.info('Found commit hash %s in %s.', result, url)
             hash_date = ''
             try:
-                updated_el = ET.fromstring(text).find('entry/updated', RSS_NS)
+                updated_el = response_xml(r).find('entry/updated', RSS_NS)
             except ET.ParseError:
                 logger.debug('Ignoring XML parse error (URL: %s).', url)
                 continue
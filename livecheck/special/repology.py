@@ -3,7 +3,7 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
-from livecheck.utils import get_content
+from livecheck.utils import get_content, response_json
 from livecheck.utils.portage import catpkg_catpkgsplit, get_last_version
 
 if TYPE_CHECKING:
@@ -35,7 +35,7 @@ async def get_latest_repology(ebuild: str, settings: LivecheckSettings, package:
         if not (r := await get_content(url)):
             return ''
 
-    for release in r.json():
+    for release in response_json(r):
         if release.get('srcname') == pkg and (release.get('status') != 'devel'
                                               or settings.is_devel(catpkg)):
             results.extend([{'tag': release.get('version')}])
@@ -4,7 +4,7 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 from urllib.parse import urlparse
 
-from livecheck.utils import get_content
+from livecheck.utils import get_content, response_json
 from livecheck.utils.portage import catpkg_catpkgsplit, get_last_version
 
 if TYPE_CHECKING:
@@ -41,7 +41,7 @@ async def get_latest_rubygems_package2(gem_name: str, ebuild: str,
     results: list[dict[str, str]] = [
         {
             'tag': release.get('number', '')
-        } for release in response.json()
+        } for release in response_json(response)
         if settings.is_devel(catpkg) or not release.get('prerelease', False)
     ]
 
@@ -6,8 +6,7 @@ from typing import TYPE_CHECKING
 from urllib.parse import urlparse
 import re
 
-from defusedxml import ElementTree as ET  # noqa: N817
-from livecheck.utils import get_content
+from livecheck.utils import get_content, response_xml
 from livecheck.utils.portage import get_last_version
 
 from .utils import get_archive_extension
@@ -69,7 +68,7 @@ async def get_latest_sourceforge_package2(repository: str,
         return ''
 
     results: list[dict[str, str]] = []
-    for item in ET.fromstring(r.text or '').findall('.//item'):
+    for item in response_xml(r).findall('.//item'):
         title = item.find('title')
         version = Path(title.text).name if title is not None and title.text else ''
         if version and get_archive_extension(version):
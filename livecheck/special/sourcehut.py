@@ -6,8 +6,7 @@ from typing import TYPE_CHECKING
 from urllib.parse import urlparse
 import re
 
-from defusedxml import ElementTree as ET  # noqa: N817
-from livecheck.utils import get_content, is_sha
+from livecheck.utils import get_content, is_sha, response_xml
 from livecheck.utils.portage import catpkg_catpkgsplit, get_last_version
 
 from .utils import get_archive_extension
@@ -70,7 +69,7 @@ async def get_latest_sourcehut_package(url: str, ebuild: str, settings: Livechec
         return ''
 
     results: list[dict[str, str]] = []
-    for item in ET.fromstring(r.text or '').findall('channel/item'):
+    for item in response_xml(r).findall('channel/item'):
         guid = item.find('guid')
         if version := guid.text.split('/')[-1] if guid is not None and guid.text else '':
             results.append({'tag': version})
@@ -109,9 +108,9 @@ async def get_latest_sourcehut_commit(url: str, branch: str = 'master') -> tuple
     if not (r := await get_content(url)):
         return '', ''
 
-    text = r.text or ''
-    guid = ET.fromstring(text).find('channel/item/guid')
-    pubdate = ET.fromstring(text).find('channel/item/pubDate')
+    root = response_xml(r)
+    guid = root.find('channel/item/guid')
+    pubdate = root.find('channel/item/pubDate')
     commit = guid.text.split('/')[-1] if guid is not None and guid.text else ''
     date = pubdate.text if pubdate is not None and pubdate.text else ''
 
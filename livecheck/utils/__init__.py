@@ -5,15 +5,25 @@ from .assertions import assert_not_none
 from .misc import check_program
 from .requests import (
     TextDataResponse,
+    adaptive_limits,
     close_sessions,
     get_content,
     get_last_modified,
     hash_url,
     init_sessions,
+    offline_misses,
+    post_json,
+    preferred_mirrors,
+    response_json,
+    response_xml,
     session_init,
+    stores_responses,
+    tripped_hosts,
 )
 from .string import dash_to_underscore, dotize, extract_sha, is_sha, prefix_v
 
-__all__ = ('TextDataResponse', 'assert_not_none', 'check_program', 'close_sessions',
-           'dash_to_underscore', 'dotize', 'extract_sha', 'get_content', 'get_last_modified',
-           'hash_url', 'init_sessions', 'is_sha', 'prefix_v', 'session_init')
+__all__ = ('TextDataResponse', 'adaptive_limits', 'assert_not_none', 'check_program',
+           'close_sessions', 'dash_to_underscore', 'dotize', 'extract_sha', 'get_content',
+           'get_last_modified', 'hash_url', 'init_sessions', 'is_sha', 'offline_misses',
+           'post_json', 'preferred_mirrors', 'prefix_v', 'response_json', 'response_xml',
+           'session_init', 'stores_responses', 'tripped_hosts')
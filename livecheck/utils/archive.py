@@ -0,0 +1,179 @@
+"""Archives of recorded HTTP exchanges for network-free replays."""
+from __future__ import annotations
+
+from typing import IO, TYPE_CHECKING, Any
+import base64
+import gzip
+import json
+import logging
+import zlib
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+    from pathlib import Path
+
+    from niquests_cache.typing import CacheEntry
+
+__all__ = ('ArchiveRecorder', 'ArchiveReplayer')
+
+log = logging.getLogger(__name__)
+
+ARCHIVE_VERSION = 1
+"""Version of the archive format written by :py:class:`ArchiveRecorder`."""
+
+_Key = tuple[str, str, tuple[tuple[str, str], ...], str | None]
+
+
+def _key(method: str, url: str, headers: Mapping[str, str] | None, body: str | None) -> _Key:
+    return (method.upper(), url, tuple(sorted(
+        (k.lower(), v) for k, v in (headers or {}).items())), body)
+
+
+class ArchiveRecorder:
+    """
+    Writes exchanges to a gzip-compressed archive as they happen.
+
+    Every line of the archive is a JSON object. The first one holds the format version and each
+    other one an exchange: the request, the response as a cache entry and the seconds it took.
+    Bodies that are valid UTF-8 are stored as text and others in Base64.
+    """
+    def __init__(self, path: Path) -> None:
+        """
+        Create (or replace) the archive.
+
+        Parameters
+        ----------
+        path : Path
+            Path of the archive.
+        """
+        self.path = path
+        self.count = 0
+        """Number of exchanges recorded."""
+        self._file: IO[str] = gzip.open(path, 'wt', encoding='utf-8')  # noqa: SIM115
+        self._write({'livecheck_archive': ARCHIVE_VERSION})
+
+    def _write(self, obj: Mapping[str, Any]) -> None:
+        self._file.write(json.dumps(obj, separators=(',', ':')))
+        self._file.write('\n')
+
+    def record(self,
+               method: str,
+               url: str,
+               entry: CacheEntry,
+               latency: float,
+               headers: Mapping[str, str] | None = None,
+               body: str | None = None) -> None:
+        """
+        Record an exchange.
+
+        Parameters
+        ----------
+        method : str
+            HTTP method, or another name for results that are not responses.
+        url : str
+            Request URL including the query string.
+        entry : CacheEntry
+            The response.
+        latency : float
+            Seconds from sending the request to receiving the response.
+        headers : Mapping[str, str] | None
+            Headers given to the request.
+        body : str | None
+            Body of the request.
+        """
+        response: dict[str, Any] = {k: v for k, v in entry.items() if k != 'content'}
+        try:
+            response['text'] = entry['content'].decode()
+        except UnicodeDecodeError:
+            response['content'] = base64.b64encode(entry['content']).decode()
+        self._write({
+            'method': method.upper(),
+            'url': url,
+            'headers': dict(headers or {}),
+            'body': body,
+            'latency': round(latency, 6),
+            'response': response
+        })
+        self.count += 1
+
+    def close(self) -> None:
+        """Finish writing the archive."""
+        self._file.close()
+
+
+class ArchiveReplayer:
+    """Answers requests with the exchanges of an archive written by :py:class:`ArchiveRecorder`."""
+    def __init__(self, path: Path, latency: float | None = None) -> None:
+        """
+        Load an archive.
+
+        Parameters
+        ----------
+        path : Path
+            Path of the archive.
+        latency : float | None
+            Seconds every replayed exchange takes, or ``None`` to take as long as when it was
+            recorded.
+
+        Raises
+        ------
+        ValueError
+            If the file is not an archive of a supported version.
+        """
+        self._latency = latency
+        self._exchanges: dict[_Key, list[tuple[CacheEntry, float]]] = {}
+        count = 0
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                header = json.loads(f.readline() or 'null')
+                version = header.get('livecheck_archive') if isinstance(header, dict) else None
+                if version != ARCHIVE_VERSION:
+                    msg = f'{path} is not a livecheck archive of version {ARCHIVE_VERSION}.'
+                    raise ValueError(msg)
+                for line in f:
+                    exchange = json.loads(line)
+                    response = exchange['response']
+                    response['content'] = (response.pop('text').encode() if 'text' in response else
+                                           base64.b64decode(response['content']))
+                    self._exchanges.setdefault(
+                        _key(exchange['method'], exchange['url'], exchange['headers'],
+                             exchange['body']), []).append((response, exchange['latency']))
+                    count += 1
+        except (OSError, EOFError, zlib.error, json.JSONDecodeError, KeyError, TypeError,
+                AttributeError) as e:
+            msg = f'{path} is not a valid livecheck archive.'
+            raise ValueError(msg) from e
+        log.debug('Loaded %d exchanges from %s.', count, path)
+
+    def lookup(self,
+               method: str,
+               url: str,
+               headers: Mapping[str, str] | None = None,
+               body: str | None = None) -> tuple[CacheEntry, float] | None:
+        """
+        Get the next recorded response to a request.
+
+        Responses to a request made more than once are returned in the order they were recorded,
+        then the last one is repeated.
+
+        Parameters
+        ----------
+        method : str
+            HTTP method, or another name for results that are not responses.
+        url : str
+            Request URL including the query string.
+        headers : Mapping[str, str] | None
+            Headers given to the request.
+        body : str | None
+            Body of the request.
+
+        Returns
+        -------
+        tuple[CacheEntry, float] | None
+            The response and the seconds to wait before returning it, or ``None`` if the request
+            was not recorded.
+        """
+        if not (exchanges := self._exchanges.get(_key(method, url, headers, body))):
+            return None
+        entry, latency = exchanges.pop(0) if len(exchanges) > 1 else exchanges[0]
+        return {**entry}, latency if self._latency is None else self._latency
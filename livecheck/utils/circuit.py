@@ -0,0 +1,111 @@
+"""Circuit breaker for hosts that keep failing."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from time import time
+import logging
+
+import niquests
+
+__all__ = ('CircuitBreaker', 'CircuitOpenError')
+
+log = logging.getLogger(__name__)
+
+DEFAULT_FAILURE_THRESHOLD = 5
+"""Consecutive failed requests after which a host's circuit opens."""
+DEFAULT_COOLDOWN = 300.0
+"""Seconds a circuit stays open before a request is let through again."""
+
+
+class CircuitOpenError(niquests.ConnectionError):
+    """Raised instead of sending a request to a host whose circuit is open."""
+    def __init__(self, host: str) -> None:
+        super().__init__(f'Not sending requests to {host} after repeated failures.')
+        self.host = host
+        """The host."""
+
+
+@dataclass
+class _Circuit:
+    failures: int = 0
+    open_until: float = 0.0
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker.
+
+    After ``threshold`` consecutive failed requests to a host, its circuit opens and requests to it
+    fail immediately with :py:class:`CircuitOpenError` for ``cooldown`` seconds. Afterwards
+    requests are let through again, but a single further failure opens the circuit again. A
+    successful request closes it.
+    """
+    def __init__(self,
+                 threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 cooldown: float = DEFAULT_COOLDOWN) -> None:
+        """
+        Initialise the circuit breaker.
+
+        Parameters
+        ----------
+        threshold : int
+            Consecutive failures after which a circuit opens.
+        cooldown : float
+            Seconds a circuit stays open.
+        """
+        self._threshold = threshold
+        self._cooldown = cooldown
+        self._circuits: dict[str, _Circuit] = {}
+        self._tripped: set[str] = set()
+
+    def check(self, host: str) -> None:
+        """
+        Check that requests may be sent to a host.
+
+        Parameters
+        ----------
+        host : str
+            Host name.
+
+        Raises
+        ------
+        CircuitOpenError
+            If the circuit of the host is open.
+        """
+        if (circuit := self._circuits.get(host)) is not None and time() < circuit.open_until:
+            raise CircuitOpenError(host)
+
+    def record_success(self, host: str) -> None:
+        """
+        Record a successful request to a host.
+
+        Parameters
+        ----------
+        host : str
+            Host name.
+        """
+        self._circuits.pop(host, None)
+
+    def record_failure(self, host: str) -> None:
+        """
+        Record a failed request to a host.
+
+        Parameters
+        ----------
+        host : str
+            Host name.
+        """
+        circuit = self._circuits.setdefault(host, _Circuit())
+        circuit.failures += 1
+        if circuit.failures >= self._threshold:
+            log.warning('Requests to %s failed %d times in a row. Skipping it for %.0f seconds.',
+                        host, circuit.failures, self._cooldown)
+            circuit.open_until = time() + self._cooldown
+            # Let one request through once the cool-down ends; another failure opens it again.
+            circuit.failures = self._threshold - 1
+            self._tripped.add(host)
+
+    @property
+    def tripped_hosts(self) -> list[str]:
+        """Hosts whose circuit opened at least once, sorted by name."""
+        return sorted(self._tripped)
@@ -4,8 +4,6 @@ from __future__ import annotations
 from functools import cache
 import logging
 
-import keyring
-
 log = logging.getLogger(__name__)
 
 
@@ -24,6 +22,9 @@ def get_api_credentials(repo: str) -> str | None:
     str | None
         The stored token, or ``None`` if not found.
     """
+    # Importing keyring loads its backends, which is only worth it when a token is needed.
+    import keyring  # noqa: PLC0415
+
     if not (token := keyring.get_password(repo, 'livecheck')):
         log.warning('No %s API token found in your secret store.', repo)
     return token
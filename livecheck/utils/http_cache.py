@@ -0,0 +1,486 @@
+"""SQLite cache of HTTP responses with compression and size and age limits."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from time import time
+from typing import TYPE_CHECKING, cast
+from urllib.parse import urlparse
+import hashlib
+import json
+import logging
+import zlib
+
+from niquests_cache.backends import SQLiteBackend
+import niquests
+import platformdirs
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+    from pathlib import Path
+
+    from niquests_cache.typing import CacheEntry
+
+__all__ = ('HostStats', 'HttpCache', 'entry_from_response', 'open_http_cache',
+           'response_from_entry')
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+"""Size in bytes beyond which the least recently used responses are removed."""
+DEFAULT_MAX_AGE = 30 * 24 * 60 * 60
+"""Age in seconds after which responses are removed."""
+PRUNE_INTERVAL = 24 * 60 * 60
+"""Seconds between automatic prunes at the end of online runs."""
+VACUUM_INTERVAL = 7 * 24 * 60 * 60
+"""Seconds between compactions of the database file by :py:meth:`HttpCache.maintain`."""
+DEFAULT_COMPRESSION_LEVEL = 6
+"""zlib compression level of cached bodies."""
+MIN_COMPRESSED_SIZE = 1024
+"""Bodies smaller than this many bytes are stored uncompressed."""
+
+_COMPRESSED_PREFIX = b'\x00zlib\x00'
+_RESPONSES_TABLE = 'niquests_cache'
+_RESPONSE_COLUMNS = frozenset({'key', 'content', 'headers', 'ts', 'url'})
+"""Columns of the niquests-cache response table read by :py:class:`HttpCache` maintenance."""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS livecheck_usage (
+    key TEXT PRIMARY KEY,
+    used_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS livecheck_lookups (
+    host TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL,
+    misses INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS livecheck_meta (
+    name TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+
+def _cache_path() -> Path:
+    return platformdirs.user_cache_path('livecheck', appauthor=False,
+                                        ensure_exists=True) / 'http.sqlite'
+
+
+def _compress(content: bytes, level: int | None) -> bytes:
+    # Bodies that happen to start with the prefix are always compressed so they are read back
+    # unchanged.
+    framed = content.startswith(_COMPRESSED_PREFIX)
+    if not framed and (level is None or len(content) < MIN_COMPRESSED_SIZE):
+        return content
+    compressed = _COMPRESSED_PREFIX + zlib.compress(content, 0 if level is None else level)
+    return compressed if framed or len(compressed) < len(content) else content
+
+
+def _decompress(content: bytes) -> bytes:
+    if content.startswith(_COMPRESSED_PREFIX):
+        return zlib.decompress(content[len(_COMPRESSED_PREFIX):])
+    return content
+
+
+def _exchange_key(method: str, url: str, headers: Mapping[str, str] | None) -> str:
+    request = [method.upper(), url, sorted((k.lower(), v) for k, v in (headers or {}).items())]
+    return f'livecheck:{hashlib.sha256(json.dumps(request).encode()).hexdigest()}'
+
+
+def entry_from_response(response: niquests.Response) -> CacheEntry:
+    """
+    Convert a response to a cache entry.
+
+    Parameters
+    ----------
+    response : niquests.Response
+        The response. Its body must have been read.
+
+    Returns
+    -------
+    CacheEntry
+        The entry.
+    """
+    headers = cast('dict[str, str | bytes]', dict(response.headers))
+    return {
+        'content': response.content or b'',
+        'encoding': response.encoding or 'utf-8',
+        'headers': {
+            k: v if isinstance(v, str) else v.decode()
+            for k, v in headers.items()
+        },
+        'status_code': response.status_code or 0,
+        'ts': time(),
+        'url': str(response.url)
+    }
+
+
+def response_from_entry(entry: CacheEntry) -> niquests.Response:
+    """
+    Convert a cache entry back to a response.
+
+    Parameters
+    ----------
+    entry : CacheEntry
+        The entry.
+
+    Returns
+    -------
+    niquests.Response
+        The response.
+    """
+    response = niquests.Response()
+    response.status_code = entry['status_code']
+    response._content = entry['content']  # noqa: SLF001
+    response._content_consumed = True  # noqa: SLF001
+    response.headers.update(entry['headers'])
+    response.url = entry['url']
+    response.encoding = entry['encoding']
+    return response
+
+
+@dataclass
+class HostStats:
+    """Cache statistics of a host."""
+    entries: int = 0
+    """Number of cached responses."""
+    size: int = 0
+    """Bytes used by the cached responses."""
+    hits: int = 0
+    """Requests answered from the cache."""
+    misses: int = 0
+    """Cacheable requests that were sent to the host."""
+    @property
+    def hit_ratio(self) -> float | None:
+        """Fraction of cacheable requests answered from the cache, if there were any."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else None
+
+
+class HttpCache(SQLiteBackend):
+    """
+    SQLite cache backend that compresses bodies and records when its responses are used.
+
+    Bodies of at least ``MIN_COMPRESSED_SIZE`` bytes are stored compressed with zlib if that makes
+    them smaller. Uses of responses and hits and misses of hosts are kept in memory and written to
+    the database when the cache is closed. :py:meth:`prune` removes old and least recently used
+    responses. Online runs call :py:meth:`prune_if_due` when they end.
+
+    :py:meth:`stats`, :py:meth:`prune` and :py:meth:`clear` read the response table of
+    niquests-cache directly, as its backends have no API to list or delete entries. They raise
+    :py:exc:`ValueError` if the table does not have the columns they use.
+
+    Besides the responses cached by the sessions, livecheck stores the result of every exchange it
+    may have to answer offline with :py:meth:`arecord`. These are only read back with
+    :py:meth:`alookup`.
+    """
+    def __init__(self,
+                 database: Path | str,
+                 *,
+                 compression_level: int | None = DEFAULT_COMPRESSION_LEVEL) -> None:
+        """
+        Open (and create if necessary) the cache.
+
+        Parameters
+        ----------
+        database : Path | str
+            Path to the SQLite database.
+        compression_level : int | None
+            zlib compression level of stored bodies, or ``None`` to store them uncompressed.
+            Compressed bodies are read back regardless.
+        """
+        super().__init__(database, table_name=_RESPONSES_TABLE)
+        self._compression_level = compression_level
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+        self._used: dict[str, float] = {}
+        self._lookups: dict[str, HostStats] = {}
+
+    def _decompressed(self, key: str, entry: CacheEntry | None) -> CacheEntry | None:
+        if entry is None:
+            return None
+        try:
+            entry['content'] = _decompress(entry['content'])
+        except zlib.error:
+            log.debug('Ignoring corrupt cached body of %s.', entry['url'])
+            return None
+        self._used[key] = time()
+        return entry
+
+    def _compressed(self, key: str, entry: CacheEntry) -> CacheEntry:
+        self._used[key] = time()
+        return {**entry, 'content': _compress(entry['content'], self._compression_level)}
+
+    def get(self, key: str) -> CacheEntry | None:
+        """
+        Look up a cached response and record its use.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+
+        Returns
+        -------
+        CacheEntry | None
+            The stored entry with its body decompressed, or ``None`` if not present.
+        """
+        return self._decompressed(key, super().get(key))
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        """
+        Store a response and record its use.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+        entry : CacheEntry
+            The entry to store.
+        """
+        super().set(key, self._compressed(key, entry))
+
+    async def aget(self, key: str) -> CacheEntry | None:
+        """
+        Look up a cached response and record its use.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+
+        Returns
+        -------
+        CacheEntry | None
+            The stored entry with its body decompressed, or ``None`` if not present.
+        """
+        return self._decompressed(key, await super().aget(key))
+
+    async def aset(self, key: str, entry: CacheEntry) -> None:
+        """
+        Store a response and record its use.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+        entry : CacheEntry
+            The entry to store.
+        """
+        await super().aset(key, self._compressed(key, entry))
+
+    async def alookup(self,
+                      method: str,
+                      url: str,
+                      headers: Mapping[str, str] | None = None) -> CacheEntry | None:
+        """
+        Look up the result of an exchange stored with :py:meth:`arecord`.
+
+        Parameters
+        ----------
+        method : str
+            HTTP method, or another name for results that are not responses.
+        url : str
+            Request URL including the query string.
+        headers : Mapping[str, str] | None
+            Headers given to the request.
+
+        Returns
+        -------
+        CacheEntry | None
+            The stored entry, or ``None`` if not present.
+        """
+        return await self.aget(_exchange_key(method, url, headers))
+
+    async def arecord(self,
+                      method: str,
+                      url: str,
+                      entry: CacheEntry,
+                      headers: Mapping[str, str] | None = None) -> None:
+        """
+        Store the result of an exchange, replacing an earlier one.
+
+        Parameters
+        ----------
+        method : str
+            HTTP method, or another name for results that are not responses.
+        url : str
+            Request URL including the query string.
+        entry : CacheEntry
+            The result.
+        headers : Mapping[str, str] | None
+            Headers given to the request.
+        """
+        await self.aset(_exchange_key(method, url, headers), entry)
+
+    def count(self, host: str, *, hit: bool) -> None:
+        """
+        Count a lookup of a cacheable request.
+
+        Parameters
+        ----------
+        host : str
+            Host name of the request.
+        hit : bool
+            Whether the request was answered from the cache.
+        """
+        stats = self._lookups.setdefault(host, HostStats())
+        if hit:
+            stats.hits += 1
+        else:
+            stats.misses += 1
+
+    def flush(self) -> None:
+        """Write uses of responses and counted lookups to the database."""
+        self._conn.executemany('INSERT OR REPLACE INTO livecheck_usage VALUES (?, ?)',
+                               self._used.items())
+        self._conn.executemany(
+            'INSERT INTO livecheck_lookups VALUES (?, ?, ?) ON CONFLICT (host) DO UPDATE SET '
+            'hits = hits + excluded.hits, misses = misses + excluded.misses',
+            ((host, stats.hits, stats.misses) for host, stats in self._lookups.items()))
+        self._conn.commit()
+        self._used.clear()
+        self._lookups.clear()
+
+    def close(self) -> None:
+        """Write pending statistics and close the database."""
+        if self._finalizer.alive:
+            self.flush()
+        super().close()
+
+    @property
+    def file_size(self) -> int:
+        """Size of the database in bytes."""
+        page_count = self._conn.execute('PRAGMA page_count').fetchone()[0]
+        page_size = self._conn.execute('PRAGMA page_size').fetchone()[0]
+        return int(page_count * page_size)
+
+    def _check_schema(self) -> None:
+        columns = {row[1] for row in self._conn.execute(f'PRAGMA table_info({_RESPONSES_TABLE})')}
+        if missing := _RESPONSE_COLUMNS - columns:
+            msg = (f'The HTTP cache table {_RESPONSES_TABLE} has no column '
+                   f'{", ".join(sorted(missing))}. Unsupported niquests-cache version?')
+            raise ValueError(msg)
+
+    def stats(self) -> dict[str, HostStats]:
+        """
+        Get the statistics of every host with cached responses or counted lookups.
+
+        Returns
+        -------
+        dict[str, HostStats]
+            Statistics keyed by host name.
+        """
+        self._check_schema()
+        self.flush()
+        stats: dict[str, HostStats] = {}
+        for url, size in self._conn.execute(
+                'SELECT url, length(content) + length(headers) + length(url) FROM niquests_cache'):
+            host_stats = stats.setdefault(urlparse(url).hostname or '', HostStats())
+            host_stats.entries += 1
+            host_stats.size += size
+        for host, hits, misses in self._conn.execute('SELECT * FROM livecheck_lookups'):
+            host_stats = stats.setdefault(host, HostStats())
+            host_stats.hits = hits
+            host_stats.misses = misses
+        return stats
+
+    def prune(self, max_size: int = DEFAULT_MAX_SIZE, max_age: float = DEFAULT_MAX_AGE) -> int:
+        """
+        Remove old responses, then the least recently used ones until the cache fits its size.
+
+        Parameters
+        ----------
+        max_size : int
+            Maximum total size of the responses in bytes.
+        max_age : float
+            Maximum age of a response in seconds.
+
+        Returns
+        -------
+        int
+            Number of responses removed.
+        """
+        self._check_schema()
+        self.flush()
+        removed = self._conn.execute('DELETE FROM niquests_cache WHERE ts < ?',
+                                     (time() - max_age,)).rowcount
+        removed += self._conn.execute(
+            'DELETE FROM niquests_cache WHERE key IN (SELECT key FROM (SELECT key, '
+            'sum(length(content) + length(headers) + length(url)) '
+            'OVER (ORDER BY coalesce(used_at, ts) DESC, key) AS total '
+            'FROM niquests_cache LEFT JOIN livecheck_usage USING (key)) WHERE total > ?)',
+            (max_size,)).rowcount
+        self._conn.execute(
+            'DELETE FROM livecheck_usage WHERE key NOT IN (SELECT key FROM niquests_cache)')
+        self._conn.execute("INSERT OR REPLACE INTO livecheck_meta VALUES ('pruned_at', ?)",
+                           (time(),))
+        self._conn.commit()
+        return removed
+
+    def prune_if_due(self, interval: float = PRUNE_INTERVAL) -> int | None:
+        """
+        Prune the cache to its default limits unless it was pruned less than ``interval`` ago.
+
+        Parameters
+        ----------
+        interval : float
+            Minimum time in seconds between prunes.
+
+        Returns
+        -------
+        int | None
+            Number of responses removed, or ``None`` if the cache was pruned recently.
+        """
+        if (pruned_at := self._meta('pruned_at')) is not None and time() - pruned_at < interval:
+            return None
+        return self.prune()
+
+    def clear(self) -> int:
+        """
+        Remove every response and statistic.
+
+        Returns
+        -------
+        int
+            Number of responses removed.
+        """
+        self._check_schema()
+        self._used.clear()
+        self._lookups.clear()
+        removed = self._conn.execute('DELETE FROM niquests_cache').rowcount
+        self._conn.execute('DELETE FROM livecheck_usage')
+        self._conn.execute('DELETE FROM livecheck_lookups')
+        self._conn.commit()
+        return removed
+
+    def vacuum(self) -> None:
+        """Compact the database file."""
+        self.flush()
+        self._conn.execute('VACUUM')
+        self._conn.execute("INSERT OR REPLACE INTO livecheck_meta VALUES ('vacuumed_at', ?)",
+                           (time(),))
+        self._conn.commit()
+
+    def maintain(self) -> None:
+        """Prune the cache to its default limits and compact it every ``VACUUM_INTERVAL``."""
+        self.prune()
+        vacuumed_at = self._meta('vacuumed_at')
+        if vacuumed_at is None or time() - vacuumed_at >= VACUUM_INTERVAL:
+            self.vacuum()
+
+    def _meta(self, name: str) -> float | None:
+        row = self._conn.execute('SELECT value FROM livecheck_meta WHERE name = ?',
+                                 (name,)).fetchone()
+        return None if row is None else float(row[0])
+
+
+def open_http_cache() -> HttpCache:
+    """
+    Open the HTTP cache in the user cache directory.
+
+    Returns
+    -------
+    HttpCache
+        The cache. It must be closed by the caller.
+    """
+    return HttpCache(_cache_path())
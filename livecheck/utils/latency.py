@@ -0,0 +1,67 @@
+"""Latency tracking of hosts."""
+from __future__ import annotations
+
+from collections import deque
+
+__all__ = ('LatencyTracker',)
+
+DEFAULT_WINDOW = 100
+"""Number of recent latencies kept per host."""
+DEFAULT_MIN_SAMPLES = 10
+"""Latencies needed before a host's percentiles are reported."""
+
+
+class LatencyTracker:
+    """Latencies of the most recent requests to each host."""
+    def __init__(self,
+                 window: int = DEFAULT_WINDOW,
+                 min_samples: int = DEFAULT_MIN_SAMPLES) -> None:
+        """
+        Initialise the tracker.
+
+        Parameters
+        ----------
+        window : int
+            Number of recent latencies kept per host.
+        min_samples : int
+            Latencies needed before percentiles of a host are reported.
+        """
+        self._window = window
+        self._min_samples = min_samples
+        self._samples: dict[str, deque[float]] = {}
+
+    def record(self, host: str, latency: float) -> None:
+        """
+        Record the latency of a request.
+
+        Parameters
+        ----------
+        host : str
+            Host name.
+        latency : float
+            Seconds from sending the request to receiving the response.
+        """
+        if (samples := self._samples.get(host)) is None:
+            samples = self._samples[host] = deque(maxlen=self._window)
+        samples.append(latency)
+
+    def percentile(self, host: str, fraction: float) -> float | None:
+        """
+        Get a percentile of the recent latencies of a host.
+
+        Parameters
+        ----------
+        host : str
+            Host name.
+        fraction : float
+            Percentile as a fraction, for example ``0.95``.
+
+        Returns
+        -------
+        float | None
+            Latency in seconds, or ``None`` if too few requests to the host have been recorded.
+        """
+        samples = self._samples.get(host)
+        if samples is None or len(samples) < self._min_samples:
+            return None
+        return sorted(samples)[round(fraction * (len(samples) - 1))]
@@ -2,34 +2,58 @@
 from __future__ import annotations
 
 from functools import cache
-from itertools import chain
+from itertools import chain, starmap
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, cast
 from urllib.parse import urlparse
+import asyncio
+import hashlib
 import logging
+import os
 import re
 
 from portage.versions import catpkgsplit, vercmp
 import portage
 
 if TYPE_CHECKING:
-    from collections.abc import Collection, Iterable, Mapping
+    from collections.abc import Collection, Iterable, Mapping, Sequence
 
     from livecheck.settings_model import LivecheckSettings
     from portage.dbapi import _AuxKey
+    from portage.dbapi.porttree import portdbapi
 
-__all__ = ('P', 'catpkg_catpkgsplit', 'catpkgsplit2', 'compare_versions', 'fetch_ebuild', 'get_aux',
-           'get_distdir', 'get_fetch_map', 'get_first_src_uri', 'get_highest_matches',
-           'get_last_version', 'get_repository_root_if_inside', 'remove_leading_zeros',
-           'sanitize_version', 'unpack_ebuild')
+__all__ = ('P', 'catpkg_catpkgsplit', 'catpkgsplit2', 'compare_versions', 'fetch_ebuild',
+           'find_packages', 'get_aux', 'get_distdir', 'get_fetch_map', 'get_first_src_uri',
+           'get_highest_matches', 'get_last_version', 'get_package_versions',
+           'get_repository_root_if_inside', 'get_thirdpartymirrors', 'load_metadata',
+           'remove_leading_zeros', 'sanitize_version', 'unpack_ebuild')
 
-P = portage.db[portage.root]['porttree'].dbapi
+
+@cache
+def _portdbapi() -> portdbapi:
+    return portage.db[portage.root]['porttree'].dbapi
+
+
+class _LazyPortdbapi:
+    """Creates the portage tree database on first use, as reading the configuration is slow."""
+    def __getattr__(self, name: str) -> Any:
+        return getattr(_portdbapi(), name)
+
+
+P = cast('portdbapi', _LazyPortdbapi())
 """Portage tree database API instance.
 
 :meta hide-value:
 """
 log = logging.getLogger(__name__)
 
+_CP_RE = re.compile(r'[\w+][\w+.-]*/[\w+][\w+-]*')
+_MD5_CACHE_KEYS = frozenset(
+    ('BDEPEND', 'DEFINED_PHASES', 'DEPEND', 'DESCRIPTION', 'EAPI', 'HOMEPAGE', 'IDEPEND', 'INHERIT',
+     'IUSE', 'KEYWORDS', 'LICENSE', 'PDEPEND', 'PROPERTIES', 'RDEPEND', 'REQUIRED_USE', 'RESTRICT',
+     'SLOT', 'SRC_URI'))
+_metadata: dict[tuple[str, str], dict[str, str]] = {}
+
 
 def mask_version(cp: str, version: str, restrict_version: str | None = 'full') -> str:
     if restrict_version == 'major':
@@ -39,11 +63,126 @@ def mask_version(cp: str, version: str, restrict_version: str | None = 'full') -
     return cp
 
 
+def _read_categories(repo_root: Path) -> frozenset[str] | None:
+    try:
+        with (repo_root / 'profiles' / 'categories').open(encoding='utf-8') as f:
+            return frozenset(
+                line for line in map(str.strip, f) if line and not line.startswith('#'))
+    except OSError:
+        log.debug('No profiles/categories in `%s`. Every directory is considered a category.',
+                  repo_root)
+        return None
+
+
+def _has_ebuild(path: str) -> bool:
+    try:
+        with os.scandir(path) as it:
+            return any(entry.name.endswith('.ebuild') and entry.is_file() for entry in it)
+    except OSError:
+        return False
+
+
+def _scan_packages(category_dir: str, category: str) -> list[str]:
+    try:
+        with os.scandir(category_dir) as it:
+            return [
+                f'{category}/{entry.name}' for entry in it
+                if entry.is_dir() and not entry.name.startswith('.') and _has_ebuild(entry.path)
+            ]
+    except OSError:
+        return []
+
+
+def find_packages(search_dir: Path, repo_root: Path) -> list[str]:
+    """
+    Find the packages with at least one ebuild in a directory of a repository.
+
+    Only the category and package levels of the tree are read. When the repository has a
+    ``profiles/categories`` file, directories not listed in it (``eclass``, ``metadata``,
+    ``profiles``, etc.) are skipped.
+
+    Parameters
+    ----------
+    search_dir : Path
+        The repository root, a category directory or a package directory.
+    repo_root : Path
+        Repository root path.
+
+    Returns
+    -------
+    list[str]
+        Sorted unique ``category/package`` names.
+    """
+    try:
+        parts = search_dir.resolve().relative_to(repo_root.resolve()).parts
+    except ValueError:
+        log.debug('`%s` is not inside `%s`.', search_dir, repo_root)
+        return []
+    categories = _read_categories(repo_root)
+    if parts and categories is not None and parts[0] not in categories:
+        return []
+    if len(parts) >= 2:  # noqa: PLR2004
+        cp = f'{parts[0]}/{parts[1]}'
+        return [cp] if _has_ebuild(str(repo_root / cp)) else []
+    if parts:
+        return sorted(_scan_packages(str(search_dir), parts[0]))
+    with os.scandir(search_dir) as it:
+        category_dirs = [(entry.path, entry.name) for entry in it
+                         if entry.is_dir() and not entry.name.startswith('.') and (
+                             categories is None or entry.name in categories)]
+    return sorted(chain.from_iterable(starmap(_scan_packages, category_dirs)))
+
+
+@cache
+def get_package_versions(cp: str, repo_root: str | None = None) -> tuple[str, ...]:
+    """
+    Get every version of a package.
+
+    The versions of each package are read from the tree once and kept in memory, so later lookups
+    during the same run (for example of ``sync_version`` packages) do not walk the tree again. Call
+    ``get_package_versions.cache_clear()`` after writing an ebuild.
+
+    Parameters
+    ----------
+    cp : str
+        Category and package name.
+    repo_root : str | None
+        Location of the repository to look in, or ``None`` to look in every repository.
+
+    Returns
+    -------
+    tuple[str, ...]
+        CPV strings, or an empty tuple if ``repo_root`` is not a configured repository.
+    """
+    try:
+        return tuple(P.cp_list(cp, mytree=repo_root))  # type: ignore[attr-defined]
+    except KeyError:
+        log.debug('`%s` is not a configured repository.', repo_root)
+        return ()
+
+
+async def _match_all(name: str, repo_root: Path | None) -> Sequence[str]:
+    if _CP_RE.fullmatch(name) and catpkgsplit(name) is None:
+        return get_package_versions(name, str(repo_root) if repo_root else None)
+    # Names without a category, and atoms with operators, slots or repositories, are left to
+    # portage.
+    matches = []
+    for m in await P.async_xmatch('match-all', name):
+        if repo_root and (actual_root := P.findname2(m)[1]) != str(repo_root):
+            log.debug('Ignoring invalid repository root. Expected `%s` and received `%s`.',
+                      repo_root, actual_root)
+            continue
+        matches.append(m)
+    return matches
+
+
 async def get_highest_matches(names: Iterable[str], repo_root: Path | None,
                               settings: LivecheckSettings) -> list[str]:
     """
     Get the highest matching versions for an iterable of package names.
 
+    Names in ``category/package`` form are looked up with :py:func:`get_package_versions`.
+
     Parameters
     ----------
     names : Iterable[str]
@@ -61,8 +200,8 @@ async def get_highest_matches(names: Iterable[str], repo_root: Path | None,
     log.debug('Searching for %s.', ', '.join(names))
     result: dict[str, str] = {}
     for name in names:
-        if not (matches := await P.async_xmatch('match-all', name)):
-            log.debug('Found no matches with xmatch("match-all").')
+        if not (matches := await _match_all(name, repo_root)):
+            log.debug('Found no matches for `%s`.', name)
             continue
         for m in matches:
             # Check if the package structure is valid.
@@ -72,11 +211,6 @@ async def get_highest_matches(names: Iterable[str], repo_root: Path | None,
                 log.debug('Ignoring invalid package structure.')
                 continue
 
-            if repo_root and (actual_root := P.findname2(m)[1]) != str(repo_root):
-                log.debug('Ignoring invalid repository root. Expected `%s` and received `%s`.',
-                          repo_root, actual_root)
-                continue
-
             if '9999' in version or not cp_a or not version:
                 log.debug('Ignoring 9999 version.')
                 continue
@@ -152,10 +286,76 @@ def catpkg_catpkgsplit(atom: str) -> tuple[str, str, str, str]:
     return f'{cat}/{pkg}', cat, pkg, ebuild_version
 
 
+def _md5(path: Path) -> str | None:
+    try:
+        return hashlib.md5(path.read_bytes(), usedforsecurity=False).hexdigest()
+    except OSError:
+        return None
+
+
+def _eclass_locations(repo_root: Path) -> tuple[Path, ...]:
+    try:
+        repo = P.repositories.get_repo_for_location(str(repo_root))  # type: ignore[attr-defined]
+    except KeyError:
+        return (repo_root,)
+    return tuple(map(Path, repo.eclass_locations or (repo_root,)))
+
+
+def _read_md5_cache(cpvs: Iterable[str], repo_root: Path) -> dict[str, dict[str, str]]:
+    # Later locations override earlier ones, as the repository itself comes after its masters.
+    eclass_dirs = [location / 'eclass' for location in reversed(_eclass_locations(repo_root))]
+
+    @cache
+    def eclass_md5(name: str) -> str | None:
+        return next((md5 for eclass_dir in eclass_dirs
+                     if (md5 := _md5(eclass_dir / f'{name}.eclass')) is not None), None)
+
+    entries = {}
+    for cpv in cpvs:
+        try:
+            catpkg = catpkg_catpkgsplit(cpv)[0]
+            with (repo_root / 'metadata' / 'md5-cache' / cpv).open(encoding='utf-8') as f:
+                entry = dict(line.rstrip('\n').split('=', 1) for line in f if '=' in line)
+        except (OSError, ValueError):
+            continue
+        ebuild = repo_root / catpkg / f'{cpv.rsplit("/", 1)[-1]}.ebuild'
+        # Names and checksums of the inherited eclasses, separated by tabs.
+        eclasses = entry.get('_eclasses_', '').split()
+        if (entry.get('_md5_') != _md5(ebuild) or len(eclasses) % 2 or any(
+                eclass_md5(name) != md5
+                for name, md5 in zip(eclasses[::2], eclasses[1::2], strict=True))):
+            log.debug('Cached metadata of `%s` is stale.', cpv)
+            continue
+        entries[cpv] = entry
+    return entries
+
+
+async def load_metadata(cpvs: Collection[str], repo_root: Path) -> None:
+    """
+    Read the metadata of ebuilds from the ``metadata/md5-cache`` directory of a repository.
+
+    Entries are read in one pass and kept in memory if the checksums of the ebuild and of every
+    eclass it inherits still match. :py:func:`get_aux` answers from these entries and uses
+    :py:func:`P.async_aux_get` for ebuilds without a valid entry.
+
+    Parameters
+    ----------
+    cpvs : Collection[str]
+        CPV strings of the ebuilds.
+    repo_root : Path
+        Repository root path.
+    """
+    entries = await asyncio.to_thread(_read_md5_cache, cpvs, repo_root)
+    _metadata.update(((str(repo_root), cpv), entry) for cpv, entry in entries.items())
+    log.debug('Loaded metadata of %d of %d ebuilds from md5-cache.', len(entries), len(cpvs))
+
+
 async def get_aux(match: str, keys: Iterable[_AuxKey], mytree: str | None = None) -> list[str]:
     """
     Get ebuild metadata values via :py:func:`P.async_aux_get`.
 
+    Values of ebuilds loaded with :py:func:`load_metadata` are returned from memory.
+
     Parameters
     ----------
     match : str
@@ -171,7 +371,10 @@ async def get_aux(match: str, keys: Iterable[_AuxKey], mytree: str | None = None
     list[str]
         Values for the requested keys, in order.
     """
-    return await P.async_aux_get(match, list(keys), mytree=mytree)
+    keys = list(keys)
+    if (entry := _metadata.get((str(mytree), match))) and _MD5_CACHE_KEYS.issuperset(keys):
+        return [entry.get(key, '') for key in keys]
+    return await P.async_aux_get(match, keys, mytree=mytree)
 
 
 async def get_fetch_map(cpv: str) -> dict[str, tuple[str, ...]]:
@@ -208,7 +411,7 @@ async def get_first_src_uri(match: str, search_dir: Path | None = None) -> str:
         The first source URI, or an empty string if none is found.
     """
     try:
-        values = await P.async_aux_get(match, ['SRC_URI'], mytree=str(search_dir))
+        values = await get_aux(match, ['SRC_URI'], mytree=str(search_dir))
         if (found_uri := next((uri for uri in chain(*(x.split() for x in map(str, values)))
                                if uri.startswith(('http://', 'https://', 'mirror://', 'ftp://'))),
                               None)):
@@ -261,6 +464,35 @@ def get_repository_root_if_inside(directory: Path) -> tuple[str, str]:
     return selected_repo_root, selected_repo_name
 
 
+def get_thirdpartymirrors(repo_root: Path | str | None = None) -> dict[str, tuple[str, ...]]:
+    """
+    Get the mirrors of each ``mirror://`` group.
+
+    Groups listed in ``profiles/thirdpartymirrors`` of the repository take precedence over those of
+    the other configured repositories.
+
+    Parameters
+    ----------
+    repo_root : Path | str | None
+        Repository root.
+
+    Returns
+    -------
+    dict[str, tuple[str, ...]]
+        Mirror base URLs keyed by group name.
+    """
+    mirrors = {
+        group: tuple(uris)
+        for group, uris in
+        portage.settings.thirdpartymirrors().items()  # type: ignore[attr-defined]
+    }
+    if repo_root and (path := Path(repo_root) / 'profiles' / 'thirdpartymirrors').is_file():
+        for line in path.read_text(encoding='utf-8').splitlines():
+            if len(fields := line.split('#', 1)[0].split()) > 1:
+                mirrors[fields[0]] = tuple(fields[1:])
+    return mirrors
+
+
 def is_version_development(version: str) -> bool:
     return bool(re.search(r'(alpha|beta|pre|dev|rc)', version, re.IGNORECASE))
 
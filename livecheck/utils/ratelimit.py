@@ -0,0 +1,385 @@
+"""Pacing and per-host concurrency limits of requests."""
+from __future__ import annotations
+
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from math import inf
+from time import monotonic, time
+from typing import TYPE_CHECKING
+import asyncio
+import logging
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Mapping
+
+__all__ = ('AdaptiveLimiter', 'HostLimiter', 'RateLimitPacer')
+
+log = logging.getLogger(__name__)
+
+_HEADER_PREFIXES = ('x-ratelimit-', 'ratelimit-')
+_MIN_EPOCH = 1_000_000_000
+"""Reset values below this are relative (seconds until reset) rather than a UNIX timestamp."""
+
+
+def _segment(path: str) -> str:
+    return path.lstrip('/').split('/', 1)[0]
+
+
+@dataclass
+class _Budget:
+    limit: int
+    remaining: int
+    reset_at: float
+    next_at: float = 0.0
+
+
+class RateLimitPacer:
+    """
+    Token bucket per host, refilled from rate-limit response headers.
+
+    Every response carrying ``x-ratelimit-*`` (GitHub) or ``ratelimit-*`` (GitLab and the IETF
+    draft) headers updates the budget of its host. Hosts such as GitHub that name the budget a
+    response counts against in ``x-ratelimit-resource`` (``core``, ``search``, ``graphql``) get a
+    budget per resource, and requests whose first path segment was answered from a resource are
+    paced by its budget. While more than ``reserve`` of the budget is left, requests are not
+    delayed. Below that, requests are spaced evenly so the remaining
+    budget lasts until the window resets, and once the budget is spent requests wait for the
+    reset. Waiting happens before a concurrency slot is taken so requests to other hosts carry on.
+    """
+    def __init__(self, reserve: float = 0.2) -> None:
+        """
+        Initialise the pacer.
+
+        Parameters
+        ----------
+        reserve : float
+            Fraction of a host's budget below which requests are paced.
+        """
+        self._reserve = reserve
+        self._budgets: dict[tuple[str, str], _Budget] = {}
+        self._resources: dict[tuple[str, str], str] = {}
+
+    def _key(self, host: str, path: str) -> tuple[str, str]:
+        return host, self._resources.get((host, _segment(path)), '')
+
+    def observe(self, host: str, headers: Mapping[str, str], path: str = '') -> None:
+        """
+        Update the budget of a host from response headers.
+
+        Parameters
+        ----------
+        host : str
+            Host name the response came from.
+        headers : Mapping[str, str]
+            Response headers.
+        path : str
+            Path of the request.
+        """
+        for prefix in _HEADER_PREFIXES:
+            remaining = headers.get(f'{prefix}remaining')
+            reset = headers.get(f'{prefix}reset')
+            if remaining is None or reset is None:
+                continue
+            try:
+                remaining_ = int(remaining)
+                reset_at = float(reset)
+                limit = int(headers.get(f'{prefix}limit') or remaining_)
+            except ValueError:
+                log.debug('Ignoring invalid rate-limit headers from %s.', host)
+                return
+            if reset_at < _MIN_EPOCH:
+                reset_at += time()
+            if resource := headers.get(f'{prefix}resource', ''):
+                self._resources[host, _segment(path)] = resource
+            key = (host, resource)
+            previous = self._budgets.get(key)
+            self._budgets[key] = _Budget(max(limit, remaining_), remaining_, reset_at,
+                                         previous.next_at if previous else 0.0)
+            return
+
+    def delay(self, host: str, path: str = '') -> float:
+        """
+        Take a token for a request to a host.
+
+        Parameters
+        ----------
+        host : str
+            Host name the request is for.
+        path : str
+            Path of the request.
+
+        Returns
+        -------
+        float
+            Seconds to wait before sending the request.
+        """
+        key = self._key(host, path)
+        if (budget := self._budgets.get(key)) is None:
+            return 0.0
+        now = time()
+        if now >= budget.reset_at:
+            del self._budgets[key]
+            return 0.0
+        if budget.remaining <= 0:
+            return budget.reset_at - now
+        budget.remaining -= 1
+        if budget.remaining >= budget.limit * self._reserve:
+            return 0.0
+        start = max(now, budget.next_at)
+        budget.next_at = start + (budget.reset_at - now) / (budget.remaining + 1)
+        return start - now
+
+    def is_low(self, host: str, path: str = '') -> bool:
+        """
+        Check if the budget of a host is below its reserve.
+
+        Parameters
+        ----------
+        host : str
+            Host name.
+        path : str
+            Path of a request, to check the budget of its resource.
+
+        Returns
+        -------
+        bool
+            ``True`` if requests to the host are being paced.
+        """
+        budget = self._budgets.get(self._key(host, path))
+        return (budget is not None and time() < budget.reset_at
+                and budget.remaining < budget.limit * self._reserve)
+
+    async def wait(self, host: str, path: str = '') -> None:
+        """
+        Wait until a request to a host fits the budget.
+
+        Parameters
+        ----------
+        host : str
+            Host name the request is for.
+        path : str
+            Path of the request.
+        """
+        if (delay := self.delay(host, path)) > 0:
+            log.debug('Pacing request to %s by %.1fs to stay within its rate limit.', host, delay)
+            await asyncio.sleep(delay)
+
+
+class HostLimiter:
+    """
+    Concurrency limits for individual hosts.
+
+    A limit configured for a domain also applies to its subdomains, so a limit for
+    ``sourceforge.net`` covers ``downloads.sourceforge.net``. All hosts sharing a configured
+    domain share its limit. Hosts without a limit are not restricted here.
+    """
+    def __init__(self, limits: Mapping[str, int] | None = None) -> None:
+        """
+        Initialise the limiter.
+
+        Parameters
+        ----------
+        limits : Mapping[str, int] | None
+            Maximum number of concurrent requests keyed by host name.
+        """
+        self._semaphores = {
+            host.lower(): asyncio.Semaphore(limit)
+            for host, limit in (limits or {}).items()
+        }
+
+    def get(self, host: str) -> asyncio.Semaphore | None:
+        """
+        Get the semaphore limiting requests to a host.
+
+        Parameters
+        ----------
+        host : str
+            Host name.
+
+        Returns
+        -------
+        asyncio.Semaphore | None
+            The semaphore of the most specific configured domain, or ``None`` if there is none.
+        """
+        labels = host.lower().split('.')
+        for i in range(len(labels)):
+            if (semaphore := self._semaphores.get('.'.join(labels[i:]))) is not None:
+                return semaphore
+        return None
+
+    @asynccontextmanager
+    async def slot(self, host: str) -> AsyncIterator[None]:
+        """
+        Hold a slot for a request to a host.
+
+        Parameters
+        ----------
+        host : str
+            Host name.
+
+        Yields
+        ------
+        None
+            Once the host has a free slot.
+        """
+        if (semaphore := self.get(host)) is None:
+            yield
+            return
+        async with semaphore:
+            yield
+
+
+@dataclass
+class _Window:
+    limit: float
+    in_flight: int = 0
+    latency: float = 0.0
+    min_latency: float = inf
+    decreased_at: float = -inf
+    waiters: deque[asyncio.Future[None]] = field(default_factory=deque)
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limits for individual hosts learnt with additive increase, multiplicative decrease.
+
+    Each host starts with the limit learnt for it in a previous run. Other hosts are not limited
+    here until they first signal overload, so they are only bound by the configured host and
+    global limits. A request that comes back while the host's window is full raises the limit by
+    about one request per window of round trips, as long as the average latency stays within
+    ``latency_factor`` times the lowest latency seen and the host's rate-limit budget is not low.
+    Throttling responses (429, 503 and 504), connection errors and timeouts halve the limit, at
+    most once per round trip. The first time, the number of requests in flight is halved.
+    """
+    def __init__(self,
+                 limits: Mapping[str, float] | None = None,
+                 *,
+                 start: float | None = None,
+                 ceiling: float = 64.0,
+                 decrease: float = 0.5,
+                 latency_factor: float = 2.0) -> None:
+        """
+        Initialise the limiter.
+
+        Parameters
+        ----------
+        limits : Mapping[str, float] | None
+            Limits learnt in a previous run keyed by host name.
+        start : float | None
+            Limit of hosts without a learnt limit, or ``None`` to leave them unlimited until they
+            signal overload.
+        ceiling : float
+            Highest limit of any host.
+        decrease : float
+            Factor applied to the limit of a host on throttling.
+        latency_factor : float
+            The limit of a host is not raised while its average latency exceeds its lowest
+            latency by this factor.
+        """
+        self._start = start
+        self._ceiling = ceiling
+        self._decrease = decrease
+        self._latency_factor = latency_factor
+        self._windows = {
+            host: _Window(min(max(limit, 1.0), ceiling))
+            for host, limit in (limits or {}).items()
+        }
+
+    @property
+    def limits(self) -> dict[str, float]:
+        """Current limit of every limited host, for use as ``limits`` in a later run."""
+        return {host: window.limit for host, window in self._windows.items() if window.limit != inf}
+
+    def _window(self, host: str) -> _Window:
+        if (window := self._windows.get(host)) is None:
+            window = self._windows[host] = _Window(inf if self._start is None else self._start)
+        return window
+
+    @staticmethod
+    def _capacity(window: _Window) -> float:
+        return inf if window.limit == inf else int(window.limit)
+
+    @classmethod
+    def _wake(cls, window: _Window) -> None:
+        free = cls._capacity(window) - window.in_flight
+        while free > 0 and window.waiters:
+            if not (waiter := window.waiters.popleft()).done():
+                waiter.set_result(None)
+                free -= 1
+
+    @asynccontextmanager
+    async def slot(self, host: str) -> AsyncIterator[None]:
+        """
+        Hold a slot for a request to a host.
+
+        Parameters
+        ----------
+        host : str
+            Host name.
+
+        Yields
+        ------
+        None
+            Once the host has a free slot.
+
+        Raises
+        ------
+        asyncio.CancelledError
+            If the task is cancelled while waiting for a slot.
+        """
+        window = self._window(host)
+        while window.in_flight >= self._capacity(window):
+            waiter = asyncio.get_running_loop().create_future()
+            window.waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                self._wake(window)
+                raise
+        window.in_flight += 1
+        try:
+            yield
+        finally:
+            window.in_flight -= 1
+            self._wake(window)
+
+    def observe(self, host: str, started: float, *, throttled: bool, hold: bool = False) -> None:
+        """
+        Adjust the limit of a host from the outcome of a request.
+
+        Must be called while the slot of the request is still held.
+
+        Parameters
+        ----------
+        host : str
+            Host name.
+        started : float
+            Monotonic time at which the request was sent, once every slot it needs was taken.
+        throttled : bool
+            Whether the host signalled overload or the request failed.
+        hold : bool
+            Whether to keep the limit from being raised, for example because the rate-limit budget
+            of the host is low.
+        """
+        window = self._window(host)
+        now = monotonic()
+        if throttled:
+            if started >= window.decreased_at:
+                # A host without a limit yet starts from the number of requests it was sent.
+                limit = window.in_flight if window.limit == inf else window.limit
+                window.limit = max(1.0, limit * self._decrease)
+                window.decreased_at = now
+                log.debug('Lowered concurrency limit of %s to %d.', host, int(window.limit))
+            return
+        latency = now - started
+        window.min_latency = min(window.min_latency, latency)
+        window.latency = latency if not window.latency else 0.8 * window.latency + 0.2 * latency
+        if (hold or window.in_flight < self._capacity(window)
+                or window.latency > window.min_latency * self._latency_factor):
+            return
+        previous = int(window.limit)
+        window.limit = min(self._ceiling, window.limit + 1 / window.limit)
+        if int(window.limit) > previous:
+            log.debug('Raised concurrency limit of %s to %d.', host, int(window.limit))
+            self._wake(window)
@@ -1,46 +1,226 @@
 """Utilities for requests module."""
 from __future__ import annotations
 
+from collections import OrderedDict
+from contextvars import ContextVar
 from dataclasses import dataclass
 from email.utils import parsedate_to_datetime
 from http import HTTPStatus
-from typing import TYPE_CHECKING
+from time import perf_counter, time
+from typing import TYPE_CHECKING, Any, cast
 from urllib.parse import urlparse
+from weakref import WeakKeyDictionary
+import asyncio
 import hashlib
+import json
 import logging
+import sqlite3
 
+from defusedxml import ElementTree as ET  # noqa: N817
 import niquests
 
+from .assertions import assert_not_none
+from .circuit import CircuitBreaker, CircuitOpenError
 from .credentials import get_api_credentials
-from .session import build_github_session, build_session
+from .http_cache import HttpCache, entry_from_response, response_from_entry
+from .latency import LatencyTracker
+from .ratelimit import AdaptiveLimiter, HostLimiter, RateLimitPacer
+from .session import build_github_session, build_session, sent_event
+from .store import get_store
 
 if TYPE_CHECKING:
-    from collections.abc import Mapping
-    import asyncio
+    from collections.abc import Mapping, Sequence
+    from xml.etree.ElementTree import Element
 
-__all__ = ('TextDataResponse', 'close_sessions', 'get_content', 'get_last_modified', 'hash_url',
-           'init_sessions', 'session_init')
+    from niquests_cache.typing import CacheEntry
+
+    from .archive import ArchiveRecorder, ArchiveReplayer
+
+__all__ = ('TextDataResponse', 'adaptive_limits', 'close_sessions', 'get_content',
+           'get_last_modified', 'hash_url', 'init_sessions', 'offline_misses', 'post_json',
+           'preferred_mirrors', 'response_json', 'response_xml', 'session_init', 'stores_responses',
+           'tripped_hosts')
 
 log = logging.getLogger(__name__)
 
 _semaphore: asyncio.Semaphore | None = None
+_multiplexed = False
+_offline = False
+_prepare_offline = False
+_offline_misses: set[str] = set()
+_recorder: ArchiveRecorder | None = None
+_replayer: ArchiveReplayer | None = None
+_pacer = RateLimitPacer()
+_limiter = HostLimiter()
+_breaker = CircuitBreaker()
+_adaptive = AdaptiveLimiter()
+_latency = LatencyTracker()
+_mirrors: dict[str, tuple[str, ...]] = {}
+_preferred_mirrors: dict[str, str] = {}
+_hedge: ContextVar[bool] = ContextVar('_hedge', default=True)
+_from_mirror: ContextVar[bool] = ContextVar('_from_mirror', default=False)
 _sessions: dict[str, niquests.AsyncSession] = {}
-
-
-def init_sessions(semaphore: asyncio.Semaphore) -> None:
+_in_flight: dict[tuple[Any, ...], asyncio.Future[niquests.Response]] = {}
+_waiters: dict[asyncio.Future[niquests.Response], int] = {}
+_responses: OrderedDict[tuple[Any, ...], niquests.Response] = OrderedDict()
+_parsed_json: WeakKeyDictionary[Any, Any] = WeakKeyDictionary()
+_parsed_xml: WeakKeyDictionary[Any, Element] = WeakKeyDictionary()
+_COALESCED_METHODS = frozenset({'GET', 'HEAD'})
+_SUCCESS_STATUSES = frozenset({
+    HTTPStatus.OK, HTTPStatus.CREATED, HTTPStatus.ACCEPTED, HTTPStatus.PARTIAL_CONTENT,
+    HTTPStatus.MOVED_PERMANENTLY, HTTPStatus.FOUND, HTTPStatus.TEMPORARY_REDIRECT,
+    HTTPStatus.PERMANENT_REDIRECT
+})
+RESPONSE_CACHE_SIZE = 256
+"""Maximum number of ``get_content`` responses kept in memory for the rest of a run."""
+RESPONSE_CACHE_MAX_BODY_SIZE = 4 * 1024 * 1024
+"""Responses with larger bodies are not kept in memory."""
+MISSING_URL_TTL = 259200
+"""Time in seconds a URL that returned 404 or 410 is not requested again by ``get_content``."""
+_MISSING_STATUSES = frozenset({HTTPStatus.NOT_FOUND, HTTPStatus.GONE})
+HEDGE_PERCENTILE = 0.95
+"""Latency percentile of a host after which a duplicate ``GET`` or ``HEAD`` request is sent."""
+HEDGE_MIN_DELAY = 1.0
+"""Requests to hosts whose latency percentile is lower than this many seconds are not hedged."""
+MIRROR_PROBE_COUNT = 3
+"""Number of mirrors of a ``mirror://`` group tried at once while its fastest mirror is unknown."""
+
+
+def init_sessions(semaphore: asyncio.Semaphore,
+                  host_limits: Mapping[str, int] | None = None,
+                  *,
+                  multiplexed: bool = False,
+                  adaptive_limits: Mapping[str, float] | None = None,
+                  mirrors: Mapping[str, Sequence[str]] | None = None,
+                  preferred_mirrors: Mapping[str, str] | None = None,
+                  offline: bool = False,
+                  prepare_offline: bool = False,
+                  recorder: ArchiveRecorder | None = None,
+                  replayer: ArchiveReplayer | None = None) -> None:
     """
     Initialise the module-level HTTP semaphore and clear the session cache.
 
+    Rate-limit budgets, circuit breaker state, latencies, offline misses and responses kept in
+    memory in a previous run are forgotten.
+
     Must be called once at the start of the async entry point before any HTTP requests.
 
     Parameters
     ----------
     semaphore : asyncio.Semaphore
         Shared semaphore bounding concurrent in-flight HTTP requests.
+    host_limits : Mapping[str, int] | None
+        Maximum concurrent in-flight HTTP requests per host. These apply within the limit of
+        ``semaphore``.
+    multiplexed : bool
+        Send concurrent requests to the same host as streams of one HTTP/2 or HTTP/3 connection
+        instead of opening a connection per request.
+    adaptive_limits : Mapping[str, float] | None
+        Adaptive per-host concurrency limits learnt in a previous run, as returned by
+        :py:func:`adaptive_limits`.
+    mirrors : Mapping[str, Sequence[str]] | None
+        Mirror base URLs of each ``mirror://`` group, as returned by
+        :py:func:`~livecheck.utils.portage.get_thirdpartymirrors`.
+    preferred_mirrors : Mapping[str, str] | None
+        Fastest mirror of each group found in a previous run, as returned by
+        :py:func:`preferred_mirrors`.
+    offline : bool
+        Answer :py:func:`get_content`, :py:func:`hash_url` and :py:func:`get_last_modified` only
+        with what they stored in the HTTP cache in earlier runs made with ``prepare_offline`` and
+        never use the network. :py:func:`post_json` fails. Requests that cannot be answered are
+        listed by :py:func:`offline_misses`.
+    prepare_offline : bool
+        Store what :py:func:`get_content`, :py:func:`hash_url` and :py:func:`get_last_modified`
+        receive in the HTTP cache for later offline runs.
+    recorder : ArchiveRecorder | None
+        Archive recording every exchange of :py:func:`get_content`, :py:func:`hash_url` and
+        :py:func:`get_last_modified` with the network.
+    replayer : ArchiveReplayer | None
+        Archive answering those functions instead of the HTTP cache. Implies ``offline``. Each
+        answer takes its simulated latency within a slot of ``semaphore``.
     """
-    global _semaphore  # noqa: PLW0603
+    global _adaptive, _breaker, _latency, _limiter, _multiplexed, _offline, _pacer, _prepare_offline, _recorder, _replayer, _semaphore  # noqa: E501, PLW0603
+    _adaptive = AdaptiveLimiter(adaptive_limits)
+    _latency = LatencyTracker()
+    _mirrors.clear()
+    _mirrors.update((group, tuple(bases)) for group, bases in (mirrors or {}).items())
+    _preferred_mirrors.clear()
+    _preferred_mirrors.update(preferred_mirrors or {})
     _semaphore = semaphore
+    _multiplexed = multiplexed
+    _offline = offline or replayer is not None
+    _prepare_offline = prepare_offline and not _offline
+    _recorder = recorder
+    _replayer = replayer
+    _offline_misses.clear()
+    _breaker = CircuitBreaker()
+    _pacer = RateLimitPacer()
+    _limiter = HostLimiter(host_limits)
     _sessions.clear()
+    _responses.clear()
+
+
+def adaptive_limits() -> dict[str, float]:
+    """
+    Get the concurrency limit learnt for every host requested during this run.
+
+    Returns
+    -------
+    dict[str, float]
+        Limits keyed by host name.
+    """
+    return _adaptive.limits
+
+
+def preferred_mirrors() -> dict[str, str]:
+    """
+    Get the fastest mirror found for each ``mirror://`` group.
+
+    Returns
+    -------
+    dict[str, str]
+        Mirror base URLs keyed by group name.
+    """
+    return dict(_preferred_mirrors)
+
+
+def tripped_hosts() -> list[str]:
+    """
+    Get the hosts that were skipped for a while during this run because they kept failing.
+
+    Returns
+    -------
+    list[str]
+        Host names, sorted.
+    """
+    return _breaker.tripped_hosts
+
+
+def stores_responses() -> bool:
+    """
+    Tell whether responses are recorded for, or answered from, an archive or the HTTP cache.
+
+    Requests whose outcome depends on how concurrent requests were batched cannot be replayed, so
+    callers should use plain requests instead.
+
+    Returns
+    -------
+    bool
+        ``True`` while recording, replaying, preparing for offline runs or offline.
+    """
+    return _offline or _prepare_offline or _recorder is not None or _replayer is not None
+
+
+def offline_misses() -> list[str]:
+    """
+    Get the requests that could not be answered from the HTTP cache in offline mode.
+
+    Returns
+    -------
+    list[str]
+        Methods and URLs of the requests, sorted.
+    """
+    return sorted(_offline_misses)
 
 
 async def close_sessions() -> None:
@@ -86,7 +266,22 @@ def session_init(module: str) -> niquests.AsyncSession:
         msg = 'Call init_sessions() before making HTTP requests.'
         raise RuntimeError(msg)
     session: niquests.AsyncSession
-    session = build_github_session(_semaphore) if module == 'github' else build_session(_semaphore)
+    if module == 'github':
+        session = build_github_session(_semaphore,
+                                       _pacer,
+                                       _limiter,
+                                       _breaker,
+                                       _adaptive,
+                                       _latency,
+                                       multiplexed=_multiplexed)
+    else:
+        session = build_session(_semaphore,
+                                _pacer,
+                                _limiter,
+                                _breaker,
+                                _adaptive,
+                                _latency,
+                                multiplexed=_multiplexed)
     match module:
         case 'github':
             token = get_api_credentials('github.com')
@@ -140,59 +335,379 @@ async def get_content(url: str,
     Returns
     -------
     niquests.Response
-        Response object, or a synthetic response on failure or unimplemented schemes.
+        Response object, or a synthetic response on failure, unknown ``mirror://`` groups, known
+        missing URLs and requests that cannot be answered offline.
+
+    Notes
+    -----
+    ``GET`` and ``HEAD`` requests for the same URL, headers and parameters are coalesced and their
+    successful responses are reused for the rest of the run. They are hedged on slow hosts
+    (``HEDGE_PERCENTILE``, ``HEDGE_MIN_DELAY``) and, unless recording or offline, skipped for URLs
+    that recently returned 404 or 410 (``MISSING_URL_TTL``). ``mirror://`` URLs are fetched from
+    the fastest known mirror of their group. In offline mode only stored or replayed responses are
+    returned.
     """
     parsed_uri = urlparse(url)
     log.debug('Fetching %s', url)
 
     if parsed_uri.scheme == 'mirror':
-        log.debug('Handling mirror:// protocol for `%s`.', url)
-        response = niquests.Response()
-        response.status_code = HTTPStatus.NOT_IMPLEMENTED
-        return response
+        r, _ = await _get_from_mirrors(url,
+                                       headers=headers,
+                                       params=params,
+                                       method=method,
+                                       data=data,
+                                       allow_redirects=allow_redirects)
+        return r
 
+    # Session headers are shared by concurrent requests so only the request is given headers.
+    request_headers: dict[str, str] = {}
     if parsed_uri.hostname == 'api.github.com':
-        session = session_init('github')
+        module = 'github'
     elif parsed_uri.hostname == 'api.gitlab.com':
-        session = session_init('gitlab')
+        module = 'gitlab'
     elif parsed_uri.hostname == 'api.bitbucket.org':
-        session = session_init('bitbucket')
+        module = 'bitbucket'
     elif parsed_uri.hostname == 'repology.org':
-        session = session_init('json')
-        session.headers['User-Agent'] = 'DistroWatch'
+        module = 'json'
+        request_headers['User-Agent'] = 'DistroWatch'
     elif url.endswith(('.atom', '.xml')):
-        session = session_init('xml')
+        module = 'xml'
     elif url.endswith('json'):
-        session = session_init('json')
+        module = 'json'
     else:
-        session = session_init('')
+        module = ''
+    session = session_init(module)
+
+    request_headers.update(headers or {})
+
+    req = niquests.Request(method=method.upper(),
+                           url=url,
+                           headers=request_headers,
+                           data=data,
+                           params=params)
+    if req.method not in _COALESCED_METHODS or data:
+        return await _send(session, req, allow_redirects=allow_redirects)
+    key = (module, req.method, url, tuple(sorted(
+        request_headers.items())), tuple(sorted((params or {}).items())), allow_redirects)
+    if (cached := _responses.get(key)) is not None:
+        _responses.move_to_end(key)
+        log.debug('Using response fetched earlier in this run for %s.', url)
+        return cached
+    # Concurrent identical requests share one round-trip.
+    if (task := _in_flight.get(key)) is None:
+        task = asyncio.ensure_future(
+            _send_and_remember(key, session, req, allow_redirects=allow_redirects))
+        _in_flight[key] = task
+        task.add_done_callback(lambda _: _in_flight.pop(key, None))
+    else:
+        log.debug('Waiting for in-flight request to %s.', url)
+    _waiters[task] = _waiters.get(task, 0) + 1
+    try:
+        return await asyncio.shield(task)
+    finally:
+        # The shared request is cancelled once every caller waiting for it has been cancelled.
+        if waiting := _waiters.pop(task) - 1:
+            _waiters[task] = waiting
+        else:
+            task.cancel()
+
+
+async def _send_and_remember(key: tuple[Any,
+                                        ...], session: niquests.AsyncSession, req: niquests.Request,
+                             allow_redirects: bool) -> niquests.Response:  # noqa: FBT001
+    r = await _send(session, req, allow_redirects=allow_redirects)
+    if HTTPStatus.OK <= (r.status_code or 0) < HTTPStatus.MULTIPLE_CHOICES and len(
+            r.content or b'') <= RESPONSE_CACHE_MAX_BODY_SIZE:
+        _responses[key] = r
+        while len(_responses) > RESPONSE_CACHE_SIZE:
+            _responses.popitem(last=False)
+    return r
 
-    if headers:
-        for key, value in headers.items():
-            session.headers[key] = value
 
-    r: TextDataResponse | niquests.Response
+def _http_cache(session: niquests.AsyncSession) -> HttpCache | None:
+    settings = getattr(session, 'settings', None)
+    cache = getattr(session, 'cache', None)
+    if settings is None or settings.disabled or not isinstance(cache, HttpCache):
+        return None
+    return cache
+
+
+async def _lookup_offline(cache: HttpCache | None,
+                          method: str,
+                          url: str,
+                          headers: Mapping[str, str] | None,
+                          body: str | None = None) -> CacheEntry | None:
+    entry: CacheEntry | None = None
+    if _replayer is not None:
+        if (replayed := _replayer.lookup(method, url, headers, body)) is not None:
+            entry, latency = replayed
+            async with assert_not_none(_semaphore):
+                await asyncio.sleep(latency)
+    elif cache is not None:
+        entry = await cache.alookup(method, url, headers)
+        cache.count(urlparse(url).hostname or '', hit=entry is not None)
+    if entry is None:
+        log.debug('Not answering %s `%s` offline: it was not recorded.', method, url)
+        _offline_misses.add(f'{method} {url}')
+    return entry
+
+
+def _record(method: str,
+            url: str,
+            r: niquests.Response | CacheEntry | None,
+            start: float,
+            headers: Mapping[str, str] | None,
+            body: str | None = None) -> None:
+    if _recorder is None:
+        return
+    if r is None:
+        r = niquests.Response()
+        r.status_code = HTTPStatus.SERVICE_UNAVAILABLE
+        r.url = url
+    _recorder.record(method, url,
+                     entry_from_response(r) if isinstance(r, niquests.Response) else r,
+                     perf_counter() - start, headers, body)
+
+
+async def _store_offline(cache: HttpCache | None,
+                         method: str,
+                         url: str,
+                         r: niquests.Response | CacheEntry,
+                         headers: Mapping[str, str] | None = None) -> None:
+    if not _prepare_offline or cache is None:
+        return
+    try:
+        await cache.arecord(method, url,
+                            entry_from_response(r) if isinstance(r, niquests.Response) else r,
+                            headers)
+    except sqlite3.Error:
+        log.exception('Could not store `%s` in the HTTP cache.', url)
+
+
+def _request_body(prepared: niquests.PreparedRequest) -> str | None:
+    if isinstance(prepared.body, bytes):
+        return prepared.body.decode(errors='replace')
+    return prepared.body if isinstance(prepared.body, str) else None
+
+
+def _hedge_delay(url: str) -> float | None:
+    delay = _latency.percentile(urlparse(url).hostname or '', HEDGE_PERCENTILE)
+    return None if delay is None or delay < HEDGE_MIN_DELAY else delay
+
+
+async def _get_from_mirrors(url: str, **kwargs: Any) -> tuple[niquests.Response, str]:
+    # Returns the response and the URL of the mirror that answered it successfully, if any.
+    group, _, path = url.removeprefix('mirror://').partition('/')
+    if not (bases := _mirrors.get(group)):
+        log.debug('Unknown mirror group in `%s`.', url)
+        r = niquests.Response()
+        r.status_code = HTTPStatus.NOT_IMPLEMENTED
+        return r, ''
+    if (preferred := _preferred_mirrors.get(group)) in bases:
+        remaining = [preferred, *(base for base in bases if base != preferred)]
+        fan_out = 1
+    else:
+        remaining = sorted(bases, key=lambda base: not base.startswith('https://'))
+        fan_out = MIRROR_PROBE_COUNT
+    tasks: dict[asyncio.Future[niquests.Response], str] = {}
+
+    def try_next() -> None:
+        if remaining:
+            base = remaining.pop(0)
+            # Mirrors are hedged with other mirrors rather than with the same URL.
+            hedge_token = _hedge.set(False)
+            mirror_token = _from_mirror.set(True)
+            try:
+                tasks[asyncio.ensure_future(get_content(f'{base.rstrip("/")}/{path}',
+                                                        **kwargs))] = base
+            finally:
+                _from_mirror.reset(mirror_token)
+                _hedge.reset(hedge_token)
+
+    for _ in range(fan_out):
+        try_next()
+    r = niquests.Response()
+    r.status_code = HTTPStatus.SERVICE_UNAVAILABLE
+    missing: niquests.Response | None = None
+    try:
+        while tasks:
+            delay = (_hedge_delay(next(iter(tasks.values())))
+                     if len(tasks) == 1 and remaining else None)
+            done, _ = await asyncio.wait(tasks, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                log.debug('Trying another mirror for `%s`.', url)
+            for task in done:
+                base = tasks.pop(task)
+                if (r := task.result()).ok:
+                    if _preferred_mirrors.get(group) != base:
+                        log.debug('Using mirror %s for mirror://%s.', base, group)
+                        _preferred_mirrors[group] = base
+                    return r, f'{base.rstrip("/")}/{path}'
+                if r.status_code in _MISSING_STATUSES:
+                    # The mirror is up, so the file is not looked for on the rest of the group.
+                    log.debug('Not trying other mirrors for `%s`: %s returned status %d.', url,
+                              base, r.status_code)
+                    missing = r
+                    remaining.clear()
+            try_next()
+        return missing or r, ''
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _resolve_mirror(url: str, headers: Mapping[str, str] | None,
+                          params: Mapping[str, str] | None) -> str:
+    # Finds a mirror that has the file the way get_content does, with a HEAD request.
+    r, mirror_url = await _get_from_mirrors(url, headers=headers, params=params, method='HEAD')
+    if not mirror_url:
+        log.debug('No mirror has `%s`: status %d.', url, r.status_code or 0)
+    return mirror_url
+
+
+async def _send_hedged(session: niquests.AsyncSession, prepared: niquests.PreparedRequest, *,
+                       allow_redirects: bool) -> niquests.Response:
+    if (delay := _hedge_delay(prepared.url or '')) is None:
+        return await session.send(prepared, allow_redirects=allow_redirects)
+    sent = asyncio.Event()
+    token = sent_event.set(sent)
+    try:
+        primary = asyncio.ensure_future(session.send(prepared, allow_redirects=allow_redirects))
+    finally:
+        sent_event.reset(token)
+    tasks = {primary}
+    try:
+        # The delay counts from when the request goes out, not while it waits for a slot.
+        sending = asyncio.ensure_future(sent.wait())
+        await asyncio.wait((primary, sending), return_when=asyncio.FIRST_COMPLETED)
+        sending.cancel()
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            log.debug('Hedging request to `%s` after %.1fs.', prepared.url, delay)
+            tasks.add(
+                asyncio.ensure_future(session.send(prepared.copy(),
+                                                   allow_redirects=allow_redirects)))
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+        return primary.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _send(session: niquests.AsyncSession, req: niquests.Request, *,
+                allow_redirects: bool) -> niquests.Response:
+    url = req.url
+    r: niquests.Response
+    idempotent = req.method in _COALESCED_METHODS and not req.data
+    # Recorded and replayed runs must see the network, not the missing URLs of earlier runs. A
+    # missing file on one mirror or for one token says nothing about other requests for the URL.
+    store = (get_store() if idempotent and not _offline and _recorder is None
+             and not _from_mirror.get() else None)
     try:
-        req = niquests.Request(method=method.upper(), url=url, data=data, params=params)
         prepared = session.prepare_request(req)
-        r = await session.send(prepared, allow_redirects=allow_redirects)
+        if prepared.headers and 'Authorization' in prepared.headers:
+            store = None
+        if store and (status := store.get_missing(prepared.url or '', MISSING_URL_TTL)):
+            log.debug('Not fetching `%s`: it returned status %d recently.', url, status)
+            r = niquests.Response()
+            r.status_code = status
+            return r
+        if _offline:
+            entry = await _lookup_offline(
+                _http_cache(session) if idempotent else None, req.method or 'GET', prepared.url
+                or '', cast('Mapping[str, str]', req.headers), _request_body(prepared))
+            if entry is None:
+                r = niquests.Response()
+                r.status_code = HTTPStatus.GATEWAY_TIMEOUT
+                return r
+            return response_from_entry(entry)
+        start = perf_counter()
+        try:
+            r = await (_send_hedged(session, prepared, allow_redirects=allow_redirects)
+                       if idempotent and _hedge.get() else session.send(
+                           prepared, allow_redirects=allow_redirects))
+        except (CircuitOpenError, niquests.RequestException):
+            _record(req.method or 'GET', prepared.url or '', None, start,
+                    cast('Mapping[str, str]', req.headers), _request_body(prepared))
+            raise
+        _record(req.method or 'GET', prepared.url or '', r, start,
+                cast('Mapping[str, str]', req.headers), _request_body(prepared))
+        # Online requests are never answered from the HTTP cache.
+        if idempotent and (cache := _http_cache(session)):
+            cache.count(urlparse(prepared.url or '').hostname or '', hit=False)
+    except CircuitOpenError as e:
+        log.debug('Not fetching `%s`: %s', url, e)
+        r = niquests.Response()
+        r.status_code = HTTPStatus.SERVICE_UNAVAILABLE
+        return r
     except niquests.RequestException:
         log.exception('Caught error attempting to fetch `%s`.', url)
         r = niquests.Response()
         r.status_code = HTTPStatus.SERVICE_UNAVAILABLE
         return r
-    if r.status_code not in {
-            HTTPStatus.OK, HTTPStatus.CREATED, HTTPStatus.ACCEPTED, HTTPStatus.PARTIAL_CONTENT,
-            HTTPStatus.MOVED_PERMANENTLY, HTTPStatus.FOUND, HTTPStatus.TEMPORARY_REDIRECT,
-            HTTPStatus.PERMANENT_REDIRECT
-    }:
+    if r.status_code not in _SUCCESS_STATUSES:
         log.error('Error fetching %s. Status code: %d', url, r.status_code)
-    elif not r.text:
+        if store and r.status_code in _MISSING_STATUSES:
+            store.put_missing(prepared.url or '', r.status_code)
+        return r
+    if not r.text:
         log.warning('Empty response for %s.', url)
-
+    if idempotent:
+        await _store_offline(_http_cache(session), req.method or 'GET', prepared.url or '', r,
+                             cast('Mapping[str, str]', req.headers))
     return r
 
 
+def response_json(r: niquests.Response) -> Any:
+    """
+    Decode the JSON body of a response.
+
+    The decoded document is remembered for as long as the response exists, so handlers sharing a
+    response returned by :py:func:`get_content` decode it only once. It must not be modified.
+
+    Parameters
+    ----------
+    r : niquests.Response
+        The response.
+
+    Returns
+    -------
+    Any
+        The decoded JSON document. Errors decoding the body propagate as from
+        :py:meth:`niquests.Response.json`.
+    """
+    if r not in _parsed_json:
+        _parsed_json[r] = r.json()
+    return _parsed_json[r]
+
+
+def response_xml(r: niquests.Response) -> Element:
+    """
+    Parse the XML body of a response.
+
+    The parsed tree is remembered for as long as the response exists, so handlers sharing a response
+    returned by :py:func:`get_content` parse it only once. It must not be modified.
+
+    Parameters
+    ----------
+    r : niquests.Response
+        The response.
+
+    Returns
+    -------
+    Element
+        The root element. Errors parsing the body propagate as from
+        :py:func:`defusedxml.ElementTree.fromstring`.
+    """
+    if r not in _parsed_xml:
+        _parsed_xml[r] = ET.fromstring(r.text or '')
+    return _parsed_xml[r]
+
+
 async def hash_url(url: str,
                    headers: Mapping[str, str] | None = None,
                    params: Mapping[str, str] | None = None) -> tuple[str, str, int]:
@@ -202,7 +717,8 @@ async def hash_url(url: str,
     Parameters
     ----------
     url : str
-        URL whose body will be hashed.
+        URL whose body will be hashed. ``mirror://`` URLs are hashed from the first mirror of their
+        group found to have the file, as with :py:func:`get_content`.
     headers : Mapping[str, str] | None
         Optional HTTP headers for the GET request.
     params : Mapping[str, str] | None
@@ -212,13 +728,25 @@ async def hash_url(url: str,
     -------
     tuple[str, str, int]
         BLAKE2b hex digest, SHA-512 hex digest, and byte length; or two empty strings and ``0`` on
-        failure.
+        failure. When preparing for offline runs, the digests are stored in the HTTP cache (the
+        body is not). They are the only answer in offline mode.
     """
+    if url.startswith('mirror://') and not (url := await _resolve_mirror(url, headers, params)):
+        return '', '', 0
     h_blake2b = hashlib.blake2b()
     h_sha512 = hashlib.sha512()
     size = 0
+    session = session_init('')
+    cache = _http_cache(session)
+    full_url = session.prepare_request(niquests.Request('GET', url, params=params)).url or url
+    if _offline:
+        entry = await _lookup_offline(cache, 'HASH', full_url, headers)
+        if entry is None or entry['status_code'] != HTTPStatus.OK:
+            return '', '', 0
+        digests = json.loads(entry['content'])
+        return digests['blake2b'], digests['sha512'], digests['size']
+    start = perf_counter()
     try:
-        session = session_init('')
         r = await session.get(url,
                               headers=dict(headers) if headers else None,
                               params=params,
@@ -230,11 +758,27 @@ async def hash_url(url: str,
                 h_blake2b.update(chunk)
                 h_sha512.update(chunk)
                 size += len(chunk)
-        return h_blake2b.hexdigest(), h_sha512.hexdigest(), size
+    except CircuitOpenError as e:
+        log.debug('Not hashing `%s`: %s', url, e)
+        _record('HASH', full_url, None, start, headers)
+        return '', '', 0
     except niquests.RequestException:
         log.exception('Error hashing URL %s.', url)
-
-    return '', '', 0
+        _record('HASH', full_url, None, start, headers)
+        return '', '', 0
+    blake2b, sha512 = h_blake2b.hexdigest(), h_sha512.hexdigest()
+    digests = {'blake2b': blake2b, 'sha512': sha512, 'size': size}
+    entry = {
+        'content': json.dumps(digests).encode(),
+        'encoding': 'utf-8',
+        'headers': {},
+        'status_code': HTTPStatus.OK,
+        'ts': time(),
+        'url': full_url
+    }
+    _record('HASH', full_url, entry, start, headers)
+    await _store_offline(cache, 'HASH', full_url, entry, headers)
+    return blake2b, sha512, size
 
 
 async def get_last_modified(url: str,
@@ -246,7 +790,8 @@ async def get_last_modified(url: str,
     Parameters
     ----------
     url : str
-        URL to request with ``HEAD``.
+        URL to request with ``HEAD``. ``mirror://`` URLs are requested from the first mirror of
+        their group found to have the file, as with :py:func:`get_content`.
     headers : Mapping[str, str] | None
         Optional HTTP headers.
     params : Mapping[str, str] | None
@@ -255,15 +800,39 @@ async def get_last_modified(url: str,
     Returns
     -------
     str
-        ``Last-Modified`` as ``YYYYMMDD``, or an empty string if unavailable or on error.
+        ``Last-Modified`` as ``YYYYMMDD``, or an empty string if unavailable or on error. When
+        preparing for offline runs, the response is stored in the HTTP cache. It is the only
+        answer in offline mode.
     """
+    if url.startswith('mirror://') and not (url := await _resolve_mirror(url, headers, params)):
+        return ''
+    session = session_init('')
+    cache = _http_cache(session)
+    full_url = session.prepare_request(niquests.Request('HEAD', url, params=params)).url or url
     try:
-        session = session_init('')
-        r = await session.head(url,
-                               headers=dict(headers) if headers else None,
-                               params=params,
-                               timeout=30)
+        if _offline:
+            if (entry := await _lookup_offline(cache, 'HEAD', full_url, headers)) is None:
+                return ''
+            r = response_from_entry(entry)
+        else:
+            start = perf_counter()
+            try:
+                r = await session.head(url,
+                                       headers=dict(headers) if headers else None,
+                                       params=params,
+                                       timeout=30)
+            except CircuitOpenError as e:
+                log.debug('Not fetching last modified header for `%s`: %s', url, e)
+                _record('HEAD', full_url, None, start, headers)
+                return ''
+            except niquests.RequestException:
+                log.exception('Error fetching last modified header for %s.', url)
+                _record('HEAD', full_url, None, start, headers)
+                return ''
+            _record('HEAD', full_url, r, start, headers)
         r.raise_for_status()
+        if not _offline:
+            await _store_offline(cache, 'HEAD', full_url, r, headers)
         if last_modified := str(r.headers.get('last-modified', '')):
             return parsedate_to_datetime(last_modified).strftime('%Y%m%d')
 
@@ -271,3 +840,36 @@ async def get_last_modified(url: str,
         log.exception('Error fetching last modified header for %s.', url)
 
     return ''
+
+
+async def post_json(url: str, payload: Any) -> Any:
+    """
+    Send a JSON ``POST`` request and decode the JSON response.
+
+    Unlike :py:func:`get_content`, the request goes through the session's request method so, for
+    ``api.github.com``, the GitHub rate-limit retries apply. ``POST`` responses are never cached,
+    so this always fails in offline mode.
+
+    Parameters
+    ----------
+    url : str
+        URL to request.
+    payload : Any
+        JSON-serialisable request body.
+
+    Returns
+    -------
+    Any
+        Decoded JSON response, or ``None`` on failure.
+    """
+    if _offline:
+        await _lookup_offline(None, 'POST', url, None)
+        return None
+    session = session_init('github' if urlparse(url).hostname == 'api.github.com' else 'json')
+    try:
+        r = await session.post(url, json=payload, timeout=30)
+        r.raise_for_status()
+        return r.json()
+    except (niquests.RequestException, ValueError):
+        log.exception('Error posting to %s.', url)
+    return None
@@ -1,30 +1,36 @@
 """Session helpers for HTTP access with caching and concurrency control."""
 from __future__ import annotations
 
-__all__ = ('build_github_session', 'build_retry', 'build_session')
+__all__ = ('build_github_session', 'build_retry', 'build_session', 'sent_event')
 
+from contextvars import ContextVar
 from http import HTTPStatus
-from time import time
-from typing import TYPE_CHECKING, Any
+from time import monotonic, time
+from typing import Any
+from urllib.parse import urlparse
 import asyncio
 import logging
 
 from niquests import RetryConfiguration as Retry
 from niquests_cache import AsyncCachedSession
-import platformdirs
+import niquests
 
-if TYPE_CHECKING:
-    import niquests
+from .circuit import CircuitBreaker
+from .http_cache import HttpCache, open_http_cache
+from .latency import LatencyTracker
+from .ratelimit import AdaptiveLimiter, HostLimiter, RateLimitPacer
 
 log = logging.getLogger(__name__)
 
 _GITHUB_MAX_RATE_LIMIT_RETRIES = 5
 _GITHUB_SECONDARY_BACKOFF_BASE = 60.0
 _RATE_LIMIT_BODY_HINTS = ('rate limit', 'abuse detection', 'secondary rate')
-
-
-def _cache_path() -> Any:
-    return platformdirs.user_cache_path('livecheck', appauthor=False, ensure_exists=True) / 'http'
+_THROTTLING_STATUSES = frozenset(
+    {HTTPStatus.TOO_MANY_REQUESTS, HTTPStatus.SERVICE_UNAVAILABLE, HTTPStatus.GATEWAY_TIMEOUT})
+_in_send: ContextVar[bool] = ContextVar('_in_send', default=False)
+_sent: ContextVar[bool] = ContextVar('_sent', default=False)
+sent_event: ContextVar[asyncio.Event | None] = ContextVar('sent_event', default=None)
+"""Event set when a request sent in this context has taken its slots and goes out."""
 
 
 def build_retry() -> Retry:
@@ -51,8 +57,17 @@ def _build_github_retry() -> Retry:
 
 
 class _ConcurrencyLimitedSession(AsyncCachedSession):
-    """Cached async session whose requests are gated by a shared semaphore."""
-    def __init__(self, *, semaphore: asyncio.Semaphore, **kwargs: Any) -> None:
+    """Cached async session whose network requests are paced and gated by shared semaphores."""
+    def __init__(self,
+                 *,
+                 semaphore: asyncio.Semaphore,
+                 pacer: RateLimitPacer | None = None,
+                 limiter: HostLimiter | None = None,
+                 breaker: CircuitBreaker | None = None,
+                 adaptive: AdaptiveLimiter | None = None,
+                 latency: LatencyTracker | None = None,
+                 retries: Retry | None = None,
+                 **kwargs: Any) -> None:
         """
         Initialise the session.
 
@@ -60,16 +75,38 @@ class _ConcurrencyLimitedSession(AsyncCachedSession):
         ----------
         semaphore : asyncio.Semaphore
             Shared semaphore bounding the total number of in-flight requests.
+        pacer : RateLimitPacer | None
+            Shared rate-limit pacer. A private one is created if not given.
+        limiter : HostLimiter | None
+            Shared per-host concurrency limits. Hosts are only bound by ``semaphore`` if not given.
+        breaker : CircuitBreaker | None
+            Shared circuit breaker. A private one is created if not given.
+        adaptive : AdaptiveLimiter | None
+            Shared adaptive per-host concurrency limits. A private one is created if not given.
+        latency : LatencyTracker | None
+            Shared tracker recording the latency of every response that does not signal throttling.
+            A private one is created if not given.
+        retries : Retry | None
+            Retry policy for transient failures. Retries are made by :py:meth:`send` rather than
+            the connection adapter so no slot is held while waiting to retry.
         **kwargs : Any
             Forwarded to :py:class:`~niquests_cache.AsyncCachedSession`.
         """
         self._semaphore = semaphore
+        self._pacer = pacer or RateLimitPacer()
+        self._limiter = limiter or HostLimiter()
+        self._breaker = breaker or CircuitBreaker()
+        self._adaptive = adaptive or AdaptiveLimiter()
+        self._latency = latency or LatencyTracker()
+        self._retry = retries
         super().__init__(**kwargs)
 
     async def request(  # type: ignore[override]
             self, method: str, url: str, *args: Any, **kwargs: Any) -> niquests.Response:
         """
-        Send a request while respecting the shared concurrency limit.
+        Send a request, answering it from the cache if possible.
+
+        Every cacheable request counts as a hit or a miss of its host in the cache statistics.
 
         Parameters
         ----------
@@ -85,10 +122,144 @@ class _ConcurrencyLimitedSession(AsyncCachedSession):
         Returns
         -------
         niquests.Response
-            The HTTP response.
+            The cached or received response.
         """
-        async with self._semaphore:
+        if (self.settings.disabled or method.upper() not in self.settings.allowable_methods
+                or not isinstance(self.cache, HttpCache)):
             return await super().request(method, url, *args, **kwargs)
+        token = _sent.set(False)
+        try:
+            response: niquests.Response = await super().request(method, url, *args, **kwargs)
+            self.cache.count(urlparse(url).hostname or '', hit=not _sent.get())
+        finally:
+            _sent.reset(token)
+        return response
+
+    async def send(  # type: ignore[override]
+            self, request: niquests.PreparedRequest, **kwargs: Any) -> niquests.Response:
+        """
+        Send a prepared request while respecting rate limits and the concurrency limits.
+
+        Slots of the host (its configured limit and its adaptive limit) are taken before a slot of
+        the shared semaphore so a busy host does not keep requests to other hosts waiting. The
+        outcome of every attempt adjusts the adaptive limit of the host. Transient failures are
+        retried according to the retry policy of the session, and all slots are given up while
+        waiting to retry. Requests that still fail count towards opening the circuit of the host,
+        after which requests to it fail immediately with
+        :py:class:`~livecheck.utils.circuit.CircuitOpenError` for a while.
+
+        All network traffic passes through here, whether it comes from
+        :py:meth:`~niquests_cache.AsyncCachedSession.request` on a cache miss or from a direct call.
+        Redirects followed by the outer call reuse its slot. In multiplexed sessions the response
+        is awaited before the slots are released.
+
+        Parameters
+        ----------
+        request : niquests.PreparedRequest
+            The request to send.
+        **kwargs : Any
+            Forwarded to the underlying session.
+
+        Returns
+        -------
+        niquests.Response
+            The HTTP response.
+
+        Raises
+        ------
+        niquests.ConnectionError
+            If the connection still fails after the last retry.
+        niquests.Timeout
+            If the request still times out after the last retry.
+        """
+        _sent.set(True)
+        if _in_send.get():
+            return await super().send(request, **kwargs)  # type: ignore[no-any-return]
+        host = urlparse(request.url or '').hostname or ''
+        method = (request.method or 'GET').upper()
+        retries = self._max_retries(method)
+        attempt = 0
+        while True:
+            self._breaker.check(host)
+            try:
+                response = await self._send_once(host, request, **kwargs)
+            except (niquests.ConnectionError, niquests.Timeout):
+                if attempt >= retries:
+                    self._breaker.record_failure(host)
+                    raise
+                delay = self._backoff(attempt + 1)
+            else:
+                if attempt >= retries or not self._is_retryable_status(response):
+                    if (response.status_code or 0) >= HTTPStatus.INTERNAL_SERVER_ERROR:
+                        self._breaker.record_failure(host)
+                    else:
+                        self._breaker.record_success(host)
+                    return response
+                delay = self._retry_after(response) or self._backoff(attempt + 1)
+            attempt += 1
+            log.debug('Retrying %s %s in %.1fs (attempt %d/%d).', method, request.url, delay,
+                      attempt, retries)
+            await asyncio.sleep(delay)
+
+    async def _send_once(self, host: str, request: niquests.PreparedRequest,
+                         **kwargs: Any) -> niquests.Response:
+        path = urlparse(request.url or '').path
+        await self._pacer.wait(host, path)
+        token = _in_send.set(True)
+        try:
+            async with self._limiter.slot(host), self._adaptive.slot(host), self._semaphore:
+                # Time only the exchange with the host, not the wait for slots.
+                started = monotonic()
+                if (event := sent_event.get()) is not None:
+                    event.set()
+                try:
+                    response: niquests.Response = await super().send(request, **kwargs)
+                    if response.lazy:
+                        await self.gather(response)
+                except (niquests.ConnectionError, niquests.Timeout):
+                    self._adaptive.observe(host, started, throttled=True)
+                    raise
+                throttled = response.status_code in _THROTTLING_STATUSES
+                if not throttled:
+                    self._latency.record(host, monotonic() - started)
+                self._pacer.observe(host, response.headers, path)
+                self._adaptive.observe(host,
+                                       started,
+                                       throttled=throttled,
+                                       hold=self._pacer.is_low(host, path))
+        finally:
+            _in_send.reset(token)
+        return response
+
+    async def close(self) -> None:  # type: ignore[override]
+        """Close the session and its cache, writing pending uses of cached responses."""
+        await super().close()
+        if isinstance(self.cache, HttpCache):
+            self.cache.close()
+
+    def _max_retries(self, method: str) -> int:
+        if self._retry is None or method not in (self._retry.allowed_methods or ()):
+            return 0
+        return int(self._retry.total or 0)
+
+    def _is_retryable_status(self, response: niquests.Response) -> bool:
+        return self._retry is not None and response.status_code in (self._retry.status_forcelist or
+                                                                    ())
+
+    def _backoff(self, retry: int) -> float:
+        # Same schedule as urllib3: retry at once, then back off exponentially.
+        if self._retry is None or retry <= 1:
+            return 0.0
+        return float(min(self._retry.backoff_max, self._retry.backoff_factor * 2 ** (retry - 1)))
+
+    def _retry_after(self, response: niquests.Response) -> float | None:
+        if (self._retry is None or not self._retry.respect_retry_after_header
+                or response.status_code not in Retry.RETRY_AFTER_STATUS_CODES):
+            return None
+        try:
+            return max(0.0, float(response.headers.get('retry-after', '')))
+        except ValueError:
+            return None
 
 
 class _GitHubSession(_ConcurrencyLimitedSession):
@@ -114,22 +285,20 @@ class _GitHubSession(_ConcurrencyLimitedSession):
         niquests.Response
             The response after any rate-limit-driven retries.
         """
-        async with self._semaphore:
-            response: niquests.Response
-            for attempt in range(_GITHUB_MAX_RATE_LIMIT_RETRIES + 1):
-                response = await AsyncCachedSession.request(self, method, url, *args, **kwargs)
-                sleep_for = self._rate_limit_sleep(response, attempt)
-                if sleep_for is None:
-                    await self._park_if_depleted(response)
-                    return response
-                if attempt == _GITHUB_MAX_RATE_LIMIT_RETRIES:
-                    log.warning('GitHub rate limit: giving up after %d retries for %s %s.',
-                                _GITHUB_MAX_RATE_LIMIT_RETRIES, method, url)
-                    return response
-                log.warning('GitHub rate limit hit for %s %s; sleeping %.1fs (attempt %d/%d).',
-                            method, url, sleep_for, attempt + 1, _GITHUB_MAX_RATE_LIMIT_RETRIES)
-                await asyncio.sleep(sleep_for)
-            return response  # pragma: no cover
+        response: niquests.Response
+        for attempt in range(_GITHUB_MAX_RATE_LIMIT_RETRIES + 1):
+            response = await super().request(method, url, *args, **kwargs)
+            sleep_for = self._rate_limit_sleep(response, attempt)
+            if sleep_for is None:
+                return response
+            if attempt == _GITHUB_MAX_RATE_LIMIT_RETRIES:
+                log.warning('GitHub rate limit: giving up after %d retries for %s %s.',
+                            _GITHUB_MAX_RATE_LIMIT_RETRIES, method, url)
+                return response
+            log.warning('GitHub rate limit hit for %s %s; sleeping %.1fs (attempt %d/%d).', method,
+                        url, sleep_for, attempt + 1, _GITHUB_MAX_RATE_LIMIT_RETRIES)
+            await asyncio.sleep(sleep_for)
+        return response  # pragma: no cover
 
     @classmethod
     def _rate_limit_sleep(cls, response: niquests.Response, attempt: int) -> float | None:
@@ -184,20 +353,6 @@ class _GitHubSession(_ConcurrencyLimitedSession):
             return False
         return any(hint in body for hint in _RATE_LIMIT_BODY_HINTS)
 
-    @staticmethod
-    async def _park_if_depleted(response: niquests.Response) -> None:
-        remaining = response.headers.get('x-ratelimit-remaining')
-        reset = response.headers.get('x-ratelimit-reset')
-        if remaining != '0' or reset is None:
-            return
-        try:
-            delay = max(0.0, float(reset) - time())
-        except ValueError:
-            return
-        if delay > 0:
-            log.info('GitHub rate limit exhausted; parking %.1fs until reset.', delay)
-            await asyncio.sleep(delay)
-
     @staticmethod
     def _retry_after_seconds(response: niquests.Response) -> float | None:
         value = response.headers.get('retry-after')
@@ -209,7 +364,14 @@ class _GitHubSession(_ConcurrencyLimitedSession):
             return None
 
 
-def build_session(semaphore: asyncio.Semaphore) -> _ConcurrencyLimitedSession:
+def build_session(semaphore: asyncio.Semaphore,
+                  pacer: RateLimitPacer | None = None,
+                  limiter: HostLimiter | None = None,
+                  breaker: CircuitBreaker | None = None,
+                  adaptive: AdaptiveLimiter | None = None,
+                  latency: LatencyTracker | None = None,
+                  *,
+                  multiplexed: bool = False) -> _ConcurrencyLimitedSession:
     """
     Build a cached async session with concurrency limiting.
 
@@ -217,20 +379,44 @@ def build_session(semaphore: asyncio.Semaphore) -> _ConcurrencyLimitedSession:
     ----------
     semaphore : asyncio.Semaphore
         Shared semaphore bounding concurrent in-flight requests.
+    pacer : RateLimitPacer | None
+        Shared rate-limit pacer.
+    limiter : HostLimiter | None
+        Shared per-host concurrency limits.
+    breaker : CircuitBreaker | None
+        Shared circuit breaker.
+    adaptive : AdaptiveLimiter | None
+        Shared adaptive per-host concurrency limits.
+    latency : LatencyTracker | None
+        Shared per-host latency tracker.
+    multiplexed : bool
+        Send concurrent requests to the same host as streams of one HTTP/2 or HTTP/3 connection.
 
     Returns
     -------
     _ConcurrencyLimitedSession
         An async session backed by a SQLite cache with HTTP cache-control honoured.
     """
-    return _ConcurrencyLimitedSession(cache_name=_cache_path(),
-                                      backend='sqlite',
+    return _ConcurrencyLimitedSession(backend=open_http_cache(),
                                       cache_control=True,
                                       retries=build_retry(),
-                                      semaphore=semaphore)
-
-
-def build_github_session(semaphore: asyncio.Semaphore) -> _GitHubSession:
+                                      semaphore=semaphore,
+                                      pacer=pacer,
+                                      limiter=limiter,
+                                      breaker=breaker,
+                                      adaptive=adaptive,
+                                      latency=latency,
+                                      multiplexed=multiplexed)
+
+
+def build_github_session(semaphore: asyncio.Semaphore,
+                         pacer: RateLimitPacer | None = None,
+                         limiter: HostLimiter | None = None,
+                         breaker: CircuitBreaker | None = None,
+                         adaptive: AdaptiveLimiter | None = None,
+                         latency: LatencyTracker | None = None,
+                         *,
+                         multiplexed: bool = False) -> _GitHubSession:
     """
     Build a GitHub-aware cached async session.
 
@@ -241,15 +427,32 @@ def build_github_session(semaphore: asyncio.Semaphore) -> _GitHubSession:
     ----------
     semaphore : asyncio.Semaphore
         Shared semaphore bounding concurrent in-flight requests.
+    pacer : RateLimitPacer | None
+        Shared rate-limit pacer.
+    limiter : HostLimiter | None
+        Shared per-host concurrency limits.
+    breaker : CircuitBreaker | None
+        Shared circuit breaker.
+    adaptive : AdaptiveLimiter | None
+        Shared adaptive per-host concurrency limits.
+    latency : LatencyTracker | None
+        Shared per-host latency tracker.
+    multiplexed : bool
+        Send concurrent requests to the same host as streams of one HTTP/2 or HTTP/3 connection.
 
     Returns
     -------
     _GitHubSession
         An async session that honours GitHub's REST API rate-limit headers.
     """
-    return _GitHubSession(cache_name=_cache_path(),
-                          backend='sqlite',
+    return _GitHubSession(backend=open_http_cache(),
                           cache_control=True,
                           always_revalidate=True,
                           retries=_build_github_retry(),
-                          semaphore=semaphore)
+                          semaphore=semaphore,
+                          pacer=pacer,
+                          limiter=limiter,
+                          breaker=breaker,
+                          adaptive=adaptive,
+                          latency=latency,
+                          multiplexed=multiplexed)
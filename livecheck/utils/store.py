@@ -0,0 +1,332 @@
+"""Persistent store of upstream check results."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from time import time
+from typing import TYPE_CHECKING
+import sqlite3
+
+import platformdirs
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+    from pathlib import Path
+
+__all__ = ('ResultStore', 'StoredResult', 'close_store', 'get_store', 'open_store')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    catpkg TEXT NOT NULL,
+    restrict_version TEXT NOT NULL,
+    ebuild_version TEXT NOT NULL,
+    handler TEXT NOT NULL,
+    url TEXT NOT NULL,
+    last_version TEXT NOT NULL,
+    top_hash TEXT NOT NULL,
+    hash_date TEXT NOT NULL,
+    checked_at REAL NOT NULL,
+    ttl INTEGER NOT NULL,
+    PRIMARY KEY (catpkg, restrict_version)
+);
+CREATE TABLE IF NOT EXISTS strategies (
+    catpkg TEXT PRIMARY KEY,
+    strategy TEXT NOT NULL,
+    url TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS concurrency (
+    host TEXT PRIMARY KEY,
+    concurrency_limit REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS mirrors (
+    mirror_group TEXT PRIMARY KEY,
+    base TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS missing (
+    url TEXT PRIMARY KEY,
+    status INTEGER NOT NULL,
+    checked_at REAL NOT NULL
+);
+"""
+
+_store: ResultStore | None = None
+
+
+def _store_path() -> Path:
+    return platformdirs.user_cache_path('livecheck', appauthor=False,
+                                        ensure_exists=True) / 'results.sqlite'
+
+
+@dataclass
+class StoredResult:
+    """A previously recorded upstream check result."""
+    handler: str
+    """Name of the handler that produced the result."""
+    url: str
+    """Final URL returned by the handler."""
+    last_version: str
+    """Latest upstream version, if any."""
+    top_hash: str
+    """Latest upstream commit hash, if any."""
+    hash_date: str
+    """Date associated with ``top_hash``."""
+    checked_at: float
+    """UNIX timestamp of the check."""
+
+
+class ResultStore:
+    """SQLite-backed store of the last upstream result of each package."""
+    def __init__(self, path: Path | str) -> None:
+        """
+        Open (and create if necessary) the store.
+
+        Parameters
+        ----------
+        path : Path | str
+            Path to the SQLite database.
+        """
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+
+    def get(self,
+            catpkg: str,
+            ebuild_version: str,
+            max_age: float,
+            restrict_version: str = '') -> StoredResult | None:
+        """
+        Get a fresh result for a package.
+
+        A result is fresh if it was recorded for the same ebuild version and is younger than both
+        ``max_age`` and the TTL of the handler that produced it.
+
+        Parameters
+        ----------
+        catpkg : str
+            Category and package name.
+        ebuild_version : str
+            Version of the local ebuild.
+        max_age : float
+            Maximum age in seconds.
+        restrict_version : str
+            Version restriction the package was checked with.
+
+        Returns
+        -------
+        StoredResult | None
+            The stored result or ``None`` if there is no fresh result.
+        """
+        row = self._conn.execute(
+            'SELECT handler, url, last_version, top_hash, hash_date, checked_at, ttl '
+            'FROM results WHERE catpkg = ? AND restrict_version = ? AND ebuild_version = ?',
+            (catpkg, restrict_version, ebuild_version)).fetchone()
+        if row is None:
+            return None
+        *fields, ttl = row
+        result = StoredResult(*fields)
+        if time() - result.checked_at >= min(max_age, ttl):
+            return None
+        return result
+
+    def put(self,
+            catpkg: str,
+            ebuild_version: str,
+            result: StoredResult,
+            ttl: int,
+            restrict_version: str = '') -> None:
+        """
+        Record the result of a check, replacing any previous one.
+
+        Parameters
+        ----------
+        catpkg : str
+            Category and package name.
+        ebuild_version : str
+            Version of the local ebuild.
+        result : StoredResult
+            Result to record.
+        ttl : int
+            Time in seconds the result is considered valid.
+        restrict_version : str
+            Version restriction the package was checked with.
+        """
+        self._conn.execute(
+            'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (catpkg, restrict_version, ebuild_version, result.handler, result.url,
+             result.last_version, result.top_hash, result.hash_date, result.checked_at, ttl))
+
+    def get_strategy(self, catpkg: str) -> tuple[str, str] | None:
+        """
+        Get the discovery strategy that last found a result for a package.
+
+        Parameters
+        ----------
+        catpkg : str
+            Category and package name.
+
+        Returns
+        -------
+        tuple[str, str] | None
+            Strategy name and the URL it was applied to, or ``None`` if none is known.
+        """
+        row = self._conn.execute('SELECT strategy, url FROM strategies WHERE catpkg = ?',
+                                 (catpkg,)).fetchone()
+        return None if row is None else (row[0], row[1])
+
+    def put_strategy(self, catpkg: str, strategy: str, url: str) -> None:
+        """
+        Remember the discovery strategy that found a result for a package.
+
+        Parameters
+        ----------
+        catpkg : str
+            Category and package name.
+        strategy : str
+            Strategy name.
+        url : str
+            URL the strategy was applied to.
+        """
+        self._conn.execute('INSERT OR REPLACE INTO strategies VALUES (?, ?, ?)',
+                           (catpkg, strategy, url))
+
+    def delete_strategy(self, catpkg: str) -> None:
+        """
+        Forget the discovery strategy of a package.
+
+        Parameters
+        ----------
+        catpkg : str
+            Category and package name.
+        """
+        self._conn.execute('DELETE FROM strategies WHERE catpkg = ?', (catpkg,))
+
+    def get_concurrency_limits(self) -> dict[str, float]:
+        """
+        Get the adaptive concurrency limits learnt in previous runs.
+
+        Returns
+        -------
+        dict[str, float]
+            Limits keyed by host name.
+        """
+        return dict(self._conn.execute('SELECT host, concurrency_limit FROM concurrency'))
+
+    def put_concurrency_limits(self, limits: Mapping[str, float]) -> None:
+        """
+        Record adaptive concurrency limits, replacing those of the same hosts.
+
+        Parameters
+        ----------
+        limits : Mapping[str, float]
+            Limits keyed by host name.
+        """
+        self._conn.executemany('INSERT OR REPLACE INTO concurrency VALUES (?, ?)', limits.items())
+
+    def get_preferred_mirrors(self) -> dict[str, str]:
+        """
+        Get the fastest mirror found for each ``mirror://`` group in previous runs.
+
+        Returns
+        -------
+        dict[str, str]
+            Mirror base URLs keyed by group name.
+        """
+        return dict(self._conn.execute('SELECT mirror_group, base FROM mirrors'))
+
+    def put_preferred_mirrors(self, mirrors: Mapping[str, str]) -> None:
+        """
+        Record the fastest mirror of ``mirror://`` groups, replacing those of the same groups.
+
+        Parameters
+        ----------
+        mirrors : Mapping[str, str]
+            Mirror base URLs keyed by group name.
+        """
+        self._conn.executemany('INSERT OR REPLACE INTO mirrors VALUES (?, ?)', mirrors.items())
+
+    def get_missing(self, url: str, ttl: float) -> int | None:
+        """
+        Get the status code of a URL recently found to be missing upstream.
+
+        Parameters
+        ----------
+        url : str
+            Request URL.
+        ttl : float
+            Time in seconds a recorded miss is considered valid.
+
+        Returns
+        -------
+        int | None
+            The status code of the recorded miss or ``None`` if there is no fresh one.
+        """
+        row = self._conn.execute('SELECT status, checked_at FROM missing WHERE url = ?',
+                                 (url,)).fetchone()
+        if row is None or time() - row[1] >= ttl:
+            return None
+        return int(row[0])
+
+    def put_missing(self, url: str, status: int) -> None:
+        """
+        Record that a URL is missing upstream, replacing any previous record.
+
+        Parameters
+        ----------
+        url : str
+            Request URL.
+        status : int
+            Status code of the response.
+        """
+        self._conn.execute('INSERT OR REPLACE INTO missing VALUES (?, ?, ?)', (url, status, time()))
+
+    def delete_missing(self, url: str | None = None) -> None:
+        """
+        Forget recorded misses.
+
+        Parameters
+        ----------
+        url : str | None
+            Request URL. If ``None``, all recorded misses are forgotten.
+        """
+        if url is None:
+            self._conn.execute('DELETE FROM missing')
+        else:
+            self._conn.execute('DELETE FROM missing WHERE url = ?', (url,))
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._conn.close()
+
+
+def open_store() -> ResultStore:
+    """
+    Open the module-level result store.
+
+    Returns
+    -------
+    ResultStore
+        The opened store.
+    """
+    global _store  # noqa: PLW0603
+    if _store is None:
+        _store = ResultStore(_store_path())
+    return _store
+
+
+def get_store() -> ResultStore | None:
+    """
+    Get the module-level result store.
+
+    Returns
+    -------
+    ResultStore | None
+        The store or ``None`` if :py:func:`open_store` has not been called.
+    """
+    return _store
+
+
+def close_store() -> None:
+    """Close the module-level result store."""
+    global _store  # noqa: PLW0603
+    if _store is not None:
+        _store.close()
+        _store = None
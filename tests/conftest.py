@@ -7,6 +7,7 @@ import contextlib
 import os
 
 from click.testing import CliRunner
+from livecheck.utils import credentials, http_cache, portage, store
 from livecheck.utils.requests import close_sessions, init_sessions
 from niquests_cache.session import CacheMixin
 from niquests_mock import MockRouter
@@ -15,6 +16,7 @@ import pytest
 
 if TYPE_CHECKING:
     from collections.abc import Iterator
+    from pathlib import Path
 
     from niquests import Response
     from niquests.models import PreparedRequest
@@ -108,6 +110,34 @@ def _init_test_sessions() -> Iterator[None]:
         asyncio.run(close_sessions())
 
 
+@pytest.fixture(autouse=True)
+def _no_keyring(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Never read API tokens from the keyring of the machine running the tests."""
+    monkeypatch.setattr('keyring.get_password', lambda *_: None)
+    credentials.get_api_credentials.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def _forget_package_versions() -> None:
+    """Forget versions and metadata of packages read from the tree by other tests."""
+    portage.get_package_versions.cache_clear()
+    portage._metadata.clear()  # noqa: SLF001
+
+
+@pytest.fixture(autouse=True)
+def _isolate_result_store(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Iterator[None]:
+    """Keep the result store out of the user cache directory."""
+    monkeypatch.setattr(store, '_store_path', lambda: tmp_path / 'results.sqlite')
+    yield
+    store.close_store()
+
+
+@pytest.fixture(autouse=True)
+def _isolate_http_cache(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """Keep the HTTP cache out of the user cache directory."""
+    monkeypatch.setattr(http_cache, '_cache_path', lambda: tmp_path / 'http.sqlite')
+
+
 @pytest.fixture
 def runner() -> CliRunner:
     return CliRunner()
@@ -66,7 +66,7 @@ def test_is_github(test_case: dict[str, Any]) -> None:
 
 
 def make_mock_response(json_data: Any, *, ok: bool = True) -> Any:
-    @dataclass
+    @dataclass(eq=False)
     class MockResponse:
         ok: bool = True
 
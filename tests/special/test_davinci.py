@@ -27,6 +27,7 @@ async def test_get_latest_davinci_package_success(mocker: MockerFixture) -> None
                                     return_value=mock_response)
     result = await get_latest_davinci_package('davinci')
     assert result == '18.5.1'
+    mock_response = mocker.Mock()
     mock_response.json.return_value = {
         'linux': {
             'releaseId': 'a6e2bbb59c294d728d131fa21d18676b',
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from typing import TYPE_CHECKING, Any
+import asyncio
 
 from defusedxml import ElementTree as ET  # noqa: N817
 from livecheck.special.github import (
@@ -546,3 +547,143 @@ async def test_get_latest_github_package_annotated_tag_success(mocker: MockerFix
     result = await get_latest_github_package('', 'category/repo-1.0.0.ebuild',
                                              mocker.Mock(branches={}))
     assert result == ('1.0.0', 'def456abc789')
+
+
+def _graphql_tags_response(*nodes: dict[str, Any]) -> dict[str, Any]:
+    return {'data': {'r0': {'refs': {'nodes': list(nodes)}}}}
+
+
+@pytest.mark.asyncio
+async def test_get_latest_github_package_graphql(mocker: MockerFixture) -> None:
+    mocker.patch('livecheck.special.github.get_api_credentials', return_value='token')
+    mock_post_json = mocker.patch('livecheck.special.github.post_json',
+                                  return_value=_graphql_tags_response(
+                                      {
+                                          'name': 'v1.1.0',
+                                          'target': {
+                                              'oid': 'tagobject',
+                                              'target': {
+                                                  'oid': 'peeledsha'
+                                              }
+                                          }
+                                      }, {
+                                          'name': 'v1.0.0',
+                                          'target': {
+                                              'oid': 'commitsha'
+                                          }
+                                      }))
+    mock_get_content = mocker.patch('livecheck.special.github.get_content')
+    mock_get_last_version = mocker.patch('livecheck.special.github.get_last_version',
+                                         return_value={
+                                             'id': 'v1.1.0',
+                                             'version': '1.1.0'
+                                         })
+    result = await get_latest_github_package('https://github.com/owner/repo', 'category/repo-1.0.0',
+                                             mocker.Mock(branches={}))
+    assert result == ('1.1.0', 'peeledsha')
+    mock_get_content.assert_not_called()
+    assert mock_get_last_version.call_args.args[0] == [{
+        'tag': 'v1.1.0',
+        'id': 'v1.1.0'
+    }, {
+        'tag': 'v1.0.0',
+        'id': 'v1.0.0'
+    }]
+    query = mock_post_json.call_args.args[1]['query']
+    assert 'r0: repository(owner: "owner", name: "repo")' in query
+
+
+@pytest.mark.asyncio
+async def test_get_latest_github_package_no_graphql_when_storing_responses(
+        mocker: MockerFixture) -> None:
+    mocker.patch('livecheck.special.github.get_api_credentials', return_value='token')
+    mocker.patch('livecheck.special.github.stores_responses', return_value=True)
+    mock_post_json = mocker.patch('livecheck.special.github.post_json')
+    mock_get_content = mocker.patch('livecheck.special.github.get_content', return_value=None)
+    assert await get_latest_github_package('https://github.com/owner/repo', 'category/repo-1.0.0',
+                                           mocker.Mock(branches={})) == ('', '')
+    mock_post_json.assert_not_called()
+    mock_get_content.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_get_latest_github_package_graphql_no_version(mocker: MockerFixture) -> None:
+    mocker.patch('livecheck.special.github.get_api_credentials', return_value='token')
+    mocker.patch('livecheck.special.github.post_json', return_value=_graphql_tags_response())
+    mocker.patch('livecheck.special.github.get_last_version', return_value=None)
+    result = await get_latest_github_package('https://github.com/owner/repo', 'category/repo-1.0.0',
+                                             mocker.Mock(branches={}))
+    assert result == ('', '')
+
+
+@pytest.mark.asyncio
+async def test_get_latest_github_package_graphql_failure_falls_back(mocker: MockerFixture) -> None:
+    mocker.patch('livecheck.special.github.get_api_credentials', return_value='token')
+    mocker.patch('livecheck.special.github.post_json', return_value=None)
+    mock_get_content = mocker.patch('livecheck.special.github.get_content', return_value=None)
+    result = await get_latest_github_package('https://github.com/owner/repo', 'category/repo-1.0.0',
+                                             mocker.Mock(branches={}))
+    assert result == ('', '')
+    mock_get_content.assert_called_once_with('https://github.com/owner/repo/tags.atom')
+
+
+@pytest.mark.asyncio
+async def test_get_latest_github_commit2_graphql(mocker: MockerFixture) -> None:
+    mocker.patch('livecheck.special.github.get_api_credentials', return_value='token')
+    mocker.patch('livecheck.special.github.post_json',
+                 return_value={
+                     'data': {
+                         'r0': {
+                             'ref': {
+                                 'target': {
+                                     'oid': 'headsha',
+                                     'committedDate': '2024-06-01T12:00:00Z'
+                                 }
+                             }
+                         }
+                     }
+                 })
+    mock_get_content = mocker.patch('livecheck.special.github.get_content')
+    assert await get_latest_github_commit2('owner', 'repo', 'main') == ('headsha', '20240601')
+    mock_get_content.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_graphql_lookups_are_batched(mocker: MockerFixture) -> None:
+    mocker.patch('livecheck.special.github.get_api_credentials', return_value='token')
+
+    def fake_post_json(url: str, payload: dict[str, str]) -> dict[str, Any]:
+        assert url == 'https://api.github.com/graphql'
+        count = payload['query'].count('repository(')
+        return {
+            'data': {
+                f'r{i}': {
+                    'ref': {
+                        'target': {
+                            'oid': f'sha{i}',
+                            'committedDate': '2024-06-01T12:00:00Z'
+                        }
+                    }
+                }
+                for i in range(count)
+            }
+        }
+
+    mock_post_json = mocker.patch('livecheck.special.github.post_json', side_effect=fake_post_json)
+    results = await asyncio.gather(get_latest_github_commit2('owner', 'a', 'main'),
+                                   get_latest_github_commit2('owner', 'b', 'main'),
+                                   get_latest_github_commit2('owner', 'a', 'main'))
+    assert mock_post_json.call_count == 1
+    assert mock_post_json.call_args.args[1]['query'].count('repository(') == 2
+    assert list(results) == [('sha0', '20240601'), ('sha1', '20240601'), ('sha0', '20240601')]
+
+
+@pytest.mark.asyncio
+async def test_graphql_batch_size_limit(mocker: MockerFixture) -> None:
+    mocker.patch('livecheck.special.github.get_api_credentials', return_value='token')
+    mocker.patch('livecheck.special.github.GRAPHQL_BATCH_SIZE', 2)
+    mock_post_json = mocker.patch('livecheck.special.github.post_json', return_value=None)
+    mock_get_content = mocker.patch('livecheck.special.github.get_content', return_value=None)
+    await asyncio.gather(*(get_latest_github_commit2('owner', name, 'main') for name in 'abc'))
+    assert mock_post_json.call_count == 2
+    assert mock_get_content.call_count == 3
@@ -1,17 +1,20 @@
 # ruff: noqa: FBT001
 from __future__ import annotations
 
+from time import time
 from typing import TYPE_CHECKING, Any
 import logging
 
 from defusedxml import ElementTree as ET  # noqa: N817
 from livecheck.main import (
+    cache,
     do_main,
     execute_hooks,
     extract_restrict_version,
     get_egit_repo,
     get_old_sha,
     get_props,
+    get_url_handler,
     main,
     parse_metadata,
     parse_url,
@@ -19,6 +22,9 @@ from livecheck.main import (
     replace_date_in_ebuild,
     str_version,
 )
+from livecheck.utils.archive import ArchiveRecorder, ArchiveReplayer
+from livecheck.utils.http_cache import open_http_cache
+from livecheck.utils.store import StoredResult, close_store, get_store, open_store
 import click
 import pytest
 
@@ -190,6 +196,7 @@ async def test_do_main_update_with_sha(mocker: MockerFixture, tmp_path: Path,
     mock_async_proc = mocker.AsyncMock()
     mock_async_proc.wait = mocker.AsyncMock(return_value=0)
     mocker.patch('livecheck.main.asyncio.create_subprocess_exec', return_value=mock_async_proc)
+    mock_versions = mocker.patch('livecheck.main.get_package_versions')
     await do_main(cat=cat,
                   ebuild_version=ebuild_version,
                   hash_date=hash_date,
@@ -201,6 +208,7 @@ async def test_do_main_update_with_sha(mocker: MockerFixture, tmp_path: Path,
                   top_hash=top_hash,
                   url=url)
     mock_write.assert_called_once_with('abcdef1', encoding='utf-8')
+    mock_versions.cache_clear.assert_called_once_with()
 
 
 @pytest.mark.asyncio
@@ -2168,6 +2176,7 @@ async def test_get_props_restrict_version_sets_process_prefix(mocker: MockerFixt
     mocker.patch('livecheck.main.get_aux', new_callable=mocker.AsyncMock, return_value=[])
     mocker.patch('livecheck.main.parse_url', side_effect=fake_parse_url)
     mocker.patch('livecheck.main.log')
+    mock_load_metadata = mocker.patch('livecheck.main.load_metadata')
 
     results = await get_props(search_dir=fake_repo,
                               repo_root=fake_repo,
@@ -2176,6 +2185,7 @@ async def test_get_props_restrict_version_sets_process_prefix(mocker: MockerFixt
                               exclude=[])
 
     assert seen_prefixes == [prefix]
+    mock_load_metadata.assert_awaited_once_with(['cat/pkg-1.0.0'], fake_repo)
     assert mock_settings2.restrict_version_process is None
     assert results == [('cat', 'pkg', '1.0.0', '1.1.0', '', '', '')]
 
@@ -2261,8 +2271,9 @@ async def test_get_props_no_names_argument_yields(mocker: MockerFixture, fake_re
     ebuild2.parent.mkdir(parents=True, exist_ok=True)
     ebuild1.write_text('EAPI=8\n', encoding='utf-8')
     ebuild2.write_text('EAPI=8\n', encoding='utf-8')
-    mocker.patch('livecheck.main.get_highest_matches',
-                 return_value=['cat1/pkg1-1.0.0', 'cat2/pkg2-2.0.0'])
+    (ebuild1.parent / 'pkg1-1.1.0.ebuild').write_text('EAPI=8\n', encoding='utf-8')
+    mock_get_highest_matches = mocker.patch('livecheck.main.get_highest_matches',
+                                            return_value=['cat1/pkg1-1.0.0', 'cat2/pkg2-2.0.0'])
 
     def fake_catpkg_catpkgsplit(arg: str) -> tuple[str, str, str, str]:
         if arg == 'cat1/pkg1-1.0.0':
@@ -2291,6 +2302,8 @@ async def test_get_props_no_names_argument_yields(mocker: MockerFixture, fake_re
                               exclude=[])
     assert results == [('cat1', 'pkg1', '1.0.0', 'ver1', 'sha1', 'date1', 'url1'),
                        ('cat2', 'pkg2', '2.0.0', 'ver2', 'sha2', 'date2', 'url2')]
+    mock_get_highest_matches.assert_called_once_with(['cat/pkg', 'cat1/pkg1', 'cat2/pkg2'],
+                                                     fake_repo, mock_settings2)
 
 
 @pytest.mark.asyncio
@@ -3106,7 +3119,7 @@ def test_main_various_paths(mocker: MockerFixture, runner: CliRunner, auto_updat
 
 def test_main_calls_get_props_and_do_main(mocker: MockerFixture, runner: CliRunner,
                                           tmp_path: Path) -> None:
-    mock_settings = mocker.Mock()
+    mock_settings = mocker.Mock(host_limits={})
     mocker.patch('livecheck.main.chdir')
     mock_setup_logging = mocker.patch('livecheck.main.setup_logging')
     mocker.patch('livecheck.main.gather_settings', return_value=mock_settings)
@@ -3205,7 +3218,7 @@ def test_main_handles_exception_in_get_props(mocker: MockerFixture, runner: CliR
 
 def test_main_auto_update_git_happy_path(mocker: MockerFixture, runner: CliRunner,
                                          tmp_path: Path) -> None:
-    mock_settings = mocker.Mock()
+    mock_settings = mocker.Mock(host_limits={})
     mocker.patch('livecheck.main.chdir')
     mocker.patch('livecheck.main.setup_logging')
     mocker.patch('livecheck.main.gather_settings', return_value=mock_settings)
@@ -3304,7 +3317,7 @@ def test_main_auto_update_git_pkgdev_not_installed(mocker: MockerFixture, runner
 
 def test_main_handles_exception_in_do_main(mocker: MockerFixture, runner: CliRunner,
                                            tmp_path: Path) -> None:
-    mock_settings = mocker.Mock()
+    mock_settings = mocker.Mock(host_limits={})
     mocker.patch('livecheck.main.chdir')
     mocker.patch('livecheck.main.setup_logging')
     mocker.patch('livecheck.main.gather_settings', return_value=mock_settings)
@@ -3614,3 +3627,651 @@ async def test_get_props_type_ida_free_calls_handler(mocker: MockerFixture, fake
     mock_ida_handler.assert_called_once_with('dev-util/ida-free-9.2', mock_settings2)
     # Verify result includes the version from the handler
     assert results == [('dev-util', 'ida-free', '9.2', '9.3', '', '', '')]
+
+
+@pytest.mark.asyncio
+async def test_get_props_puts_results_on_queue(mocker: MockerFixture, fake_repo: Path,
+                                               mock_settings2: Mock) -> None:
+    import asyncio
+    mocker.patch('livecheck.main.get_highest_matches', return_value=['cat/pkg-1.0.0'])
+    mocker.patch('livecheck.main._check_one_package',
+                 return_value=('cat', 'pkg', '1.0.0', '1.0.1', '', '', ''))
+    mocker.patch('livecheck.main.log')
+    queue: asyncio.Queue[Any] = asyncio.Queue()
+    results = await get_props(search_dir=fake_repo,
+                              repo_root=fake_repo,
+                              settings=mock_settings2,
+                              names=['cat/pkg'],
+                              exclude=[],
+                              queue=queue)
+    assert results == [('cat', 'pkg', '1.0.0', '1.0.1', '', '', '')]
+    assert queue.get_nowait() == ('cat', 'pkg', '1.0.0', '1.0.1', '', '', '')
+    assert queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_get_props_does_not_queue_ignored_packages(mocker: MockerFixture, fake_repo: Path,
+                                                         mock_settings2: Mock) -> None:
+    import asyncio
+    mocker.patch('livecheck.main.get_highest_matches', return_value=['cat/pkg-1.0.0'])
+    mocker.patch('livecheck.main._check_one_package', return_value=None)
+    mocker.patch('livecheck.main.log')
+    queue: asyncio.Queue[Any] = asyncio.Queue()
+    results = await get_props(search_dir=fake_repo,
+                              repo_root=fake_repo,
+                              settings=mock_settings2,
+                              names=['cat/pkg'],
+                              exclude=[],
+                              queue=queue)
+    assert results == []
+    assert queue.empty()
+
+
+def _fake_streaming_get_props(props: list[tuple[str, ...]]) -> Any:
+    async def _get_props(*args: Any, queue: Any = None, **kwargs: Any) -> list[tuple[str, ...]]:
+        for prop in props:
+            await queue.put(prop)
+        return props
+
+    return _get_props
+
+
+def test_main_stream_runs_do_main_per_queued_result(mocker: MockerFixture, runner: CliRunner,
+                                                    tmp_path: Path) -> None:
+    mock_settings = mocker.Mock(host_limits={})
+    mocker.patch('livecheck.main.chdir')
+    mocker.patch('livecheck.main.setup_logging')
+    mocker.patch('livecheck.main.gather_settings', return_value=mock_settings)
+    mocker.patch('livecheck.main.get_repository_root_if_inside',
+                 return_value=(str(tmp_path), 'repo'))
+    mocker.patch('os.access', return_value=True)
+    mocker.patch('pathlib.Path.is_dir', return_value=True)
+    mocker.patch('livecheck.main.check_program', return_value=True)
+    mock_do_main = mocker.patch('livecheck.main.do_main')
+    mocker.patch('livecheck.main.get_props',
+                 side_effect=_fake_streaming_get_props([
+                     ('cat', 'pkg', '1.0.0', '1.0.1', 'sha', 'date', 'url'),
+                     ('cat2', 'pkg2', '2.0.0', '2.0.1', 'sha2', 'date2', 'url2'),
+                     ('cat3', 'pkg3', '3.0.0', '3.0.1', 'sha3', 'date3', 'url3'),
+                 ]))
+    result = runner.invoke(
+        main,
+        ['--auto-update', '--stream', '--update-parallel', '2', '--working-dir',
+         str(tmp_path)])
+    assert result.exit_code == 0
+    assert mock_do_main.call_count == 3
+    mock_do_main.assert_any_call(cat='cat2',
+                                 pkg='pkg2',
+                                 ebuild_version='2.0.0',
+                                 last_version='2.0.1',
+                                 top_hash='sha2',
+                                 hash_date='date2',
+                                 url='url2',
+                                 search_dir=tmp_path,
+                                 settings=mock_settings,
+                                 hook_dir=None)
+
+
+def test_main_stream_handles_exception_in_do_main(mocker: MockerFixture, runner: CliRunner,
+                                                  tmp_path: Path) -> None:
+    mocker.patch('livecheck.main.chdir')
+    mocker.patch('livecheck.main.setup_logging')
+    mocker.patch('livecheck.main.gather_settings', return_value=mocker.Mock(host_limits={}))
+    mocker.patch('livecheck.main.get_repository_root_if_inside',
+                 return_value=(str(tmp_path), 'repo'))
+    mocker.patch('os.access', return_value=True)
+    mocker.patch('pathlib.Path.is_dir', return_value=True)
+    mocker.patch('livecheck.main.check_program', return_value=True)
+    mock_do_main = mocker.patch('livecheck.main.do_main', side_effect=Exception('fail'))
+    mocker.patch('livecheck.main.get_props',
+                 side_effect=_fake_streaming_get_props([
+                     ('cat', 'pkg', '1.0.0', '1.0.1', 'sha', 'date', 'url'),
+                     ('cat2', 'pkg2', '2.0.0', '2.0.1', 'sha2', 'date2', 'url2'),
+                     ('cat3', 'pkg3', '3.0.0', '3.0.1', 'sha3', 'date3', 'url3'),
+                 ]))
+    result = runner.invoke(main,
+                           ['--auto-update', '--stream', '-U', '1', '--working-dir',
+                            str(tmp_path)])
+    assert result.exit_code != 0
+    assert mock_do_main.called
+
+
+def test_get_url_handler() -> None:
+    assert get_url_handler('https://github.com/owner/repo/archive/v1.0.0.tar.gz') == 'github'
+    assert get_url_handler(
+        'https://files.pythonhosted.org/packages/source/p/pkg/pkg-1.0.tar.gz') == 'pypi'
+    assert not get_url_handler('https://example.com/pkg-1.0.0.tar.gz')
+
+
+def _store_settings(mock_settings2: Mock, max_age: int = 0, *, refresh: bool = False) -> Mock:
+    mock_settings2.max_age = max_age
+    mock_settings2.refresh_flag = refresh
+    return mock_settings2
+
+
+def _patch_get_props(mocker: MockerFixture) -> Mock:
+    mocker.patch('livecheck.main.get_highest_matches', return_value=['cat/pkg-1.0.0'])
+    mocker.patch('livecheck.main.get_first_src_uri',
+                 return_value='https://github.com/owner/pkg/archive/v1.0.0.tar.gz')
+    mocker.patch('livecheck.main.get_egit_repo', return_value=('', ''))
+    mocker.patch('livecheck.main.get_aux', new_callable=mocker.AsyncMock, return_value=[''])
+    return mocker.patch('livecheck.main.parse_url',
+                        return_value=('2.0.0', '', '', 'https://github.com/owner/pkg'))
+
+
+@pytest.mark.asyncio
+async def test_get_props_records_result(mocker: MockerFixture, fake_repo: Path,
+                                        mock_settings2: Mock) -> None:
+    _patch_get_props(mocker)
+    store = open_store()
+    result = await get_props(fake_repo, fake_repo, _store_settings(mock_settings2), ['cat/pkg'])
+    assert result == [('cat', 'pkg', '1.0.0', '2.0.0', '', '', 'https://github.com/owner/pkg')]
+    stored = store.get('cat/pkg', '1.0.0', 3600)
+    assert stored is not None
+    assert stored.handler == 'github'
+    assert stored.last_version == '2.0.0'
+
+
+@pytest.mark.asyncio
+async def test_get_props_does_not_record_empty_result(mocker: MockerFixture, fake_repo: Path,
+                                                      mock_settings2: Mock) -> None:
+    mock_parse_url = _patch_get_props(mocker)
+    mock_parse_url.return_value = ('', '', '', 'https://github.com/owner/pkg')
+    mocker.patch('livecheck.main.parse_metadata', return_value=('', '', '', ''))
+    mocker.patch('livecheck.main.get_latest_repology', return_value='')
+    mocker.patch('livecheck.main.get_latest_directory_package', return_value=('', ''))
+    store = open_store()
+    assert await get_props(fake_repo, fake_repo, _store_settings(mock_settings2), ['cat/pkg']) == []
+    assert store.get('cat/pkg', '1.0.0', 3600) is None
+
+
+@pytest.mark.asyncio
+async def test_get_props_uses_stored_result(mocker: MockerFixture, fake_repo: Path,
+                                            mock_settings2: Mock) -> None:
+    mock_parse_url = _patch_get_props(mocker)
+    open_store().put('cat/pkg', '1.0.0', StoredResult('github', 'url', '3.0.0', '', '', time()),
+                     3600)
+    result = await get_props(fake_repo, fake_repo, _store_settings(mock_settings2, 60), ['cat/pkg'])
+    assert result == [('cat', 'pkg', '1.0.0', '3.0.0', '', '', 'url')]
+    mock_parse_url.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_props_stored_result_no_update(mocker: MockerFixture, fake_repo: Path,
+                                                 mock_settings2: Mock) -> None:
+    mock_parse_url = _patch_get_props(mocker)
+    open_store().put('cat/pkg', '1.0.0', StoredResult('repology', '', '', '', '', time()), 3600)
+    assert await get_props(fake_repo, fake_repo, _store_settings(mock_settings2, 60),
+                           ['cat/pkg']) == []
+    mock_parse_url.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_props_refresh_ignores_stored_result(mocker: MockerFixture, fake_repo: Path,
+                                                       mock_settings2: Mock) -> None:
+    mock_parse_url = _patch_get_props(mocker)
+    store = open_store()
+    store.put('cat/pkg', '1.0.0', StoredResult('github', 'url', '3.0.0', '', '', time()), 3600)
+    result = await get_props(fake_repo, fake_repo, _store_settings(mock_settings2, 60,
+                                                                   refresh=True), ['cat/pkg'])
+    assert result == [('cat', 'pkg', '1.0.0', '2.0.0', '', '', 'https://github.com/owner/pkg')]
+    mock_parse_url.assert_called_once()
+    stored = store.get('cat/pkg', '1.0.0', 60)
+    assert stored is not None
+    assert stored.last_version == '2.0.0'
+
+
+@pytest.mark.asyncio
+async def test_get_props_sync_version_not_stored(mocker: MockerFixture, fake_repo: Path,
+                                                 mock_settings2: Mock) -> None:
+    _patch_get_props(mocker)
+    mocker.patch('livecheck.main.get_highest_matches', return_value=['cat/other-2.0.0'])
+    mock_settings2.sync_version = {'cat/pkg': 'cat/other'}
+    store = open_store()
+    await get_props(fake_repo, fake_repo, _store_settings(mock_settings2), ['cat/pkg'])
+    assert store.get('cat/pkg', '1.0.0', 3600) is None
+
+
+def test_main_max_age_and_refresh(mocker: MockerFixture, runner: CliRunner, tmp_path: Path) -> None:
+    mock_settings = mocker.Mock(host_limits={})
+    mocker.patch('livecheck.main.chdir')
+    mocker.patch('livecheck.main.setup_logging')
+    mocker.patch('livecheck.main.gather_settings', return_value=mock_settings)
+    mocker.patch('livecheck.main.get_repository_root_if_inside',
+                 return_value=(str(tmp_path), 'repo'))
+    mocker.patch('livecheck.main.get_props', return_value=[])
+    result = runner.invoke(main, ['--max-age', '3600', '--refresh', '--working-dir', str(tmp_path)])
+    assert result.exit_code == 0
+    assert mock_settings.max_age == 3600
+    assert mock_settings.refresh_flag is True
+    assert get_store() is None
+
+
+def test_main_host_limit(mocker: MockerFixture, runner: CliRunner, tmp_path: Path) -> None:
+    mock_settings = mocker.Mock(host_limits={'sourceforge.net': 2, 'pypi.org': 4})
+    mocker.patch('livecheck.main.chdir')
+    mocker.patch('livecheck.main.setup_logging')
+    mocker.patch('livecheck.main.gather_settings', return_value=mock_settings)
+    mocker.patch('livecheck.main.get_repository_root_if_inside',
+                 return_value=(str(tmp_path), 'repo'))
+    mocker.patch('livecheck.main.get_props', return_value=[])
+    mock_init_sessions = mocker.patch('livecheck.main.init_sessions')
+    result = runner.invoke(main, [
+        '--host-limit', 'SourceForge.net=1', '--host-limit', 'gitlab.com=3', '--working-dir',
+        str(tmp_path)
+    ])
+    assert result.exit_code == 0
+    assert mock_init_sessions.call_args[0][1] == {
+        'sourceforge.net': 1,
+        'pypi.org': 4,
+        'gitlab.com': 3
+    }
+
+
+def test_main_persists_adaptive_limits(mocker: MockerFixture, runner: CliRunner,
+                                       tmp_path: Path) -> None:
+    mocker.patch('livecheck.main.chdir')
+    mocker.patch('livecheck.main.setup_logging')
+    mocker.patch('livecheck.main.gather_settings', return_value=mocker.Mock(host_limits={}))
+    mocker.patch('livecheck.main.get_repository_root_if_inside',
+                 return_value=(str(tmp_path), 'repo'))
+    mocker.patch('livecheck.main.get_props', return_value=[])
+    mock_init_sessions = mocker.patch('livecheck.main.init_sessions')
+    mocker.patch('livecheck.main.adaptive_limits', return_value={'pypi.org': 9.0})
+    open_store().put_concurrency_limits({'api.github.com': 12.0})
+    close_store()
+    result = runner.invoke(main, ['--working-dir', str(tmp_path)])
+    assert result.exit_code == 0
+    assert mock_init_sessions.call_args.kwargs['adaptive_limits'] == {'api.github.com': 12.0}
+    assert open_store().get_concurrency_limits() == {'api.github.com': 12.0, 'pypi.org': 9.0}
+
+
+@pytest.mark.parametrize(('args', 'pruned'), [([], True), (['--offline'], False)])
+def test_main_prunes_http_cache_when_due(mocker: MockerFixture, runner: CliRunner, tmp_path: Path,
+                                         args: list[str], pruned: bool) -> None:
+    mocker.patch('livecheck.main.chdir')
+    mocker.patch('livecheck.main.setup_logging')
+    mocker.patch('livecheck.main.gather_settings', return_value=mocker.Mock(host_limits={}))
+    mocker.patch('livecheck.main.get_repository_root_if_inside',
+                 return_value=(str(tmp_path), 'repo'))
+    mocker.patch('livecheck.main.get_props', return_value=[])
+    mocker.patch('livecheck.main.init_sessions')
+    mock_prune_if_due = mocker.patch('livecheck.utils.http_cache.HttpCache.prune_if_due',
+                                     return_value=3)
+    result = runner.invoke(main, ['--working-dir', str(tmp_path), *args])
+    assert result.exit_code == 0
+    assert mock_prune_if_due.called is pruned
+
+
+def test_main_logs_http_cache_prune_errors(mocker: MockerFixture, runner: CliRunner,
+                                           tmp_path: Path) -> None:
+    mocker.patch('livecheck.main.chdir')
+    mocker.patch('livecheck.main.setup_logging')
+    mocker.patch('livecheck.main.gather_settings', return_value=mocker.Mock(host_limits={}))
+    mocker.patch('livecheck.main.get_repository_root_if_inside',
+                 return_value=(str(tmp_path), 'repo'))
+    mocker.patch('livecheck.main.get_props', return_value=[])
+    mocker.patch('livecheck.main.init_sessions')
+    mocker.patch('livecheck.utils.http_cache.HttpCache.prune_if_due',
+                 side_effect=ValueError('bad schema'))
+    mock_log = mocker.patch('livecheck.main.log')
+    result = runner.invoke(main, ['--working-dir', str(tmp_path)])
+    assert result.exit_code == 0
+    mock_log.exception.assert_called_once_with('Could not prune the HTTP cache.')
+
+
+def test_main_cache_maintain(mocker: MockerFixture, runner: CliRunner) -> None:
+    mock_maintain = mocker.patch('livecheck.utils.http_cache.HttpCache.maintain')
+    result = runner.invoke(cache, ['maintain'])
+    assert result.exit_code == 0
+    mock_maintain.assert_called_once_with()
+
+
+def test_main_cache_unsupported_schema(mocker: MockerFixture, runner: CliRunner) -> None:
+    mocker.patch('livecheck.utils.http_cache.HttpCache.stats',
+                 side_effect=ValueError('Unsupported niquests-cache version?'))
+    result = runner.invoke(cache, ['stats'])
+    assert result.exit_code != 0
+    assert 'Unsupported niquests-cache version?' in result.output
+
+
+@pytest.mark.asyncio
+async def test_main_cache_stats(runner: CliRunner) -> None:
+    http_cache = open_http_cache()
+    await http_cache.aset(
+        'a', {
+            'content': b'x' * 1000,
+            'encoding': 'utf-8',
+            'headers': {},
+            'status_code': 200,
+            'ts': time(),
+            'url': 'https://pypi.org/simple/a/'
+        })
+    http_cache.count('pypi.org', hit=True)
+    http_cache.count('pypi.org', hit=False)
+    http_cache.count('api.github.com', hit=False)
+    http_cache.close()
+    result = runner.invoke(cache, ['stats'])
+    assert result.exit_code == 0
+    lines = [line.split() for line in result.output.splitlines()]
+    assert lines[0] == ['HOST', 'ENTRIES', 'SIZE', 'HITS', 'MISSES', 'HIT', 'RATIO']
+    assert lines[1] == ['pypi.org', '1', '1.0', 'KiB', '1', '1', '50%']
+    assert lines[2] == ['api.github.com', '0', '0', 'B', '0', '1', '0%']
+    assert lines[3] == ['Total', '1', '1.0', 'KiB', '1', '2', '33%']
+    assert lines[4][:2] == ['Database', 'size:']
+
+
+def test_main_cache_stats_empty(runner: CliRunner) -> None:
+    result = runner.invoke(cache, ['stats'])
+    assert result.exit_code == 0
+    assert result.output.splitlines()[1].split() == ['Total', '0', '0', 'B', '0', '0', '-']
+
+
+def test_main_cache_prune(mocker: MockerFixture, runner: CliRunner) -> None:
+    mock_prune = mocker.patch('livecheck.utils.http_cache.HttpCache.prune', return_value=3)
+    result = runner.invoke(cache, ['prune', '--max-size', '64', '--max-age', '3600'])
+    assert result.exit_code == 0
+    assert result.output == 'Removed 3 responses.\n'
+    mock_prune.assert_called_once_with(64 * 1024 ** 2, 3600)
+
+
+def test_main_cache_clear(mocker: MockerFixture, runner: CliRunner) -> None:
+    mocker.patch('livecheck.utils.http_cache.HttpCache.clear', return_value=2)
+    result = runner.invoke(cache, ['clear'])
+    assert result.exit_code == 0
+    assert result.output == 'Removed 2 responses.\n'
+
+
+def test_main_cache_vacuum(mocker: MockerFixture, runner: CliRunner) -> None:
+    mocker.patch('livecheck.utils.http_cache.HttpCache.file_size',
+                 new_callable=mocker.PropertyMock,
+                 side_effect=[3 * 1024 ** 3, 5 * 1024 ** 2])
+    mock_vacuum = mocker.patch('livecheck.utils.http_cache.HttpCache.vacuum')
+    result = runner.invoke(cache, ['vacuum'])
+    assert result.exit_code == 0
+    assert result.output == 'Database size: 3.0 GiB -> 5.0 MiB\n'
+    mock_vacuum.assert_called_once_with()
+
+
+def test_main_cache_help(runner: CliRunner) -> None:
+    result = runner.invoke(cache, ['--help'], prog_name='livecheck-cache')
+    assert result.exit_code == 0
+    assert result.output.startswith('Usage: livecheck-cache [OPTIONS] COMMAND [ARGS]...')
+
+
+def test_main_uses_and_persists_mirrors(mocker: MockerFixture, runner: CliRunner,
+                                        tmp_path: Path) -> None:
+    mocker.patch('livecheck.main.chdir')
+    mocker.patch('livecheck.main.setup_logging')
+    mocker.patch('livecheck.main.gather_settings', return_value=mocker.Mock(host_limits={}))
+    mocker.patch('livecheck.main.get_repository_root_if_inside',
+                 return_value=(str(tmp_path), 'repo'))
+    mocker.patch('livecheck.main.get_props', return_value=[])
+    mock_get_thirdpartymirrors = mocker.patch('livecheck.main.get_thirdpartymirrors',
+                                              return_value={'gnu': ('https://a.example/gnu',)})
+    mock_init_sessions = mocker.patch('livecheck.main.init_sessions')
+    mocker.patch('livecheck.main.preferred_mirrors', return_value={'gnu': 'https://a.example/gnu'})
+    open_store().put_preferred_mirrors({'sourceforge': 'https://b.example'})
+    close_store()
+    result = runner.invoke(main, ['--working-dir', str(tmp_path)])
+    assert result.exit_code == 0
+    mock_get_thirdpartymirrors.assert_called_once_with(str(tmp_path))
+    assert mock_init_sessions.call_args.kwargs['mirrors'] == {'gnu': ('https://a.example/gnu',)}
+    assert mock_init_sessions.call_args.kwargs['preferred_mirrors'] == {
+        'sourceforge': 'https://b.example'
+    }
+    assert open_store().get_preferred_mirrors() == {
+        'gnu': 'https://a.example/gnu',
+        'sourceforge': 'https://b.example'
+    }
+
+
+@pytest.mark.parametrize('multiplexed', [False, True])
+def test_main_multiplexed(mocker: MockerFixture, runner: CliRunner, tmp_path: Path,
+                          multiplexed: bool) -> None:
+    mocker.patch('livecheck.main.chdir')
+    mocker.patch('livecheck.main.setup_logging')
+    mocker.patch('livecheck.main.gather_settings', return_value=mocker.Mock(host_limits={}))
+    mocker.patch('livecheck.main.get_repository_root_if_inside',
+                 return_value=(str(tmp_path), 'repo'))
+    mocker.patch('livecheck.main.get_props', return_value=[])
+    mock_init_sessions = mocker.patch('livecheck.main.init_sessions')
+    args = ['--working-dir', str(tmp_path)]
+    result = runner.invoke(main, [*args, '--multiplexed'] if multiplexed else args)
+    assert result.exit_code == 0
+    assert mock_init_sessions.call_args.kwargs['multiplexed'] is multiplexed
+
+
+def test_main_offline(mocker: MockerFixture, runner: CliRunner, tmp_path: Path) -> None:
+    mocker.patch('livecheck.main.chdir')
+    mocker.patch('livecheck.main.setup_logging')
+    mocker.patch('livecheck.main.gather_settings', return_value=mocker.Mock(host_limits={}))
+    mocker.patch('livecheck.main.get_repository_root_if_inside',
+                 return_value=(str(tmp_path), 'repo'))
+    mocker.patch('livecheck.main.get_props', return_value=[])
+    mock_init_sessions = mocker.patch('livecheck.main.init_sessions')
+    mocker.patch('livecheck.main.offline_misses',
+                 return_value=['GET https://a.example/', 'HEAD https://b.example/'])
+    mock_open_http_cache = mocker.patch('livecheck.main.open_http_cache')
+    mock_log = mocker.patch('livecheck.main.log')
+    result = runner.invoke(main, ['--working-dir', str(tmp_path), '--offline'])
+    assert result.exit_code == 0
+    assert mock_init_sessions.call_args.kwargs['offline'] is True
+    mock_open_http_cache.assert_not_called()
+    mock_log.warning.assert_called_once_with('%d requests could not be answered offline: %s.', 2,
+                                             'GET https://a.example/, HEAD https://b.example/')
+
+
+def test_main_prepare_offline(mocker: MockerFixture, runner: CliRunner, tmp_path: Path) -> None:
+    mocker.patch('livecheck.main.chdir')
+    mocker.patch('livecheck.main.setup_logging')
+    mocker.patch('livecheck.main.gather_settings', return_value=mocker.Mock(host_limits={}))
+    mocker.patch('livecheck.main.get_repository_root_if_inside',
+                 return_value=(str(tmp_path), 'repo'))
+    mocker.patch('livecheck.main.get_props', return_value=[])
+    mock_init_sessions = mocker.patch('livecheck.main.init_sessions')
+    result = runner.invoke(main, ['--working-dir', str(tmp_path), '--prepare-offline'])
+    assert result.exit_code == 0
+    assert mock_init_sessions.call_args.kwargs['prepare_offline'] is True
+
+
+@pytest.mark.parametrize('option', ['--offline', '--replay'])
+def test_main_prepare_offline_conflicts(mocker: MockerFixture, runner: CliRunner, tmp_path: Path,
+                                        option: str) -> None:
+    mocker.patch('livecheck.main.chdir')
+    mocker.patch('livecheck.main.setup_logging')
+    mocker.patch('livecheck.main.get_repository_root_if_inside',
+                 return_value=(str(tmp_path), 'repo'))
+    mock_init_sessions = mocker.patch('livecheck.main.init_sessions')
+    archive = tmp_path / 'archive.jsonl.gz'
+    archive.touch()
+    args = [option, str(archive)] if option == '--replay' else [option]
+    result = runner.invoke(main, ['--working-dir', str(tmp_path), '--prepare-offline', *args])
+    assert result.exit_code != 0
+    mock_init_sessions.assert_not_called()
+
+
+def test_main_record(mocker: MockerFixture, runner: CliRunner, tmp_path: Path) -> None:
+    mocker.patch('livecheck.main.chdir')
+    mocker.patch('livecheck.main.setup_logging')
+    mocker.patch('livecheck.main.gather_settings', return_value=mocker.Mock(host_limits={}))
+    mocker.patch('livecheck.main.get_repository_root_if_inside',
+                 return_value=(str(tmp_path), 'repo'))
+    mocker.patch('livecheck.main.get_props', return_value=[])
+    mock_init_sessions = mocker.patch('livecheck.main.init_sessions')
+    archive = tmp_path / 'archive.jsonl.gz'
+    result = runner.invoke(main, ['--working-dir', str(tmp_path), '--record', str(archive)])
+    assert result.exit_code == 0
+    recorder = mock_init_sessions.call_args.kwargs['recorder']
+    assert recorder.path == archive
+    assert recorder.count == 0
+    assert mock_init_sessions.call_args.kwargs['replayer'] is None
+    assert ArchiveReplayer(archive).lookup('GET', 'https://a.example/') is None
+
+
+@pytest.mark.parametrize('option', ['--offline', '--replay'])
+def test_main_record_conflicts(mocker: MockerFixture, runner: CliRunner, tmp_path: Path,
+                               option: str) -> None:
+    mocker.patch('livecheck.main.chdir')
+    mocker.patch('livecheck.main.setup_logging')
+    mocker.patch('livecheck.main.get_repository_root_if_inside',
+                 return_value=(str(tmp_path), 'repo'))
+    mock_init_sessions = mocker.patch('livecheck.main.init_sessions')
+    archive = tmp_path / 'archive.jsonl.gz'
+    archive.touch()
+    args = [option, str(archive)] if option == '--replay' else [option]
+    result = runner.invoke(
+        main, ['--working-dir',
+               str(tmp_path), '--record',
+               str(tmp_path / 'new.jsonl.gz'), *args])
+    assert result.exit_code != 0
+    mock_init_sessions.assert_not_called()
+
+
+def test_main_replay(mocker: MockerFixture, runner: CliRunner, tmp_path: Path) -> None:
+    mocker.patch('livecheck.main.chdir')
+    mocker.patch('livecheck.main.setup_logging')
+    mocker.patch('livecheck.main.gather_settings', return_value=mocker.Mock(host_limits={}))
+    mocker.patch('livecheck.main.get_repository_root_if_inside',
+                 return_value=(str(tmp_path), 'repo'))
+    mocker.patch('livecheck.main.get_props', return_value=[])
+    mock_init_sessions = mocker.patch('livecheck.main.init_sessions')
+    mock_open_http_cache = mocker.patch('livecheck.main.open_http_cache')
+    archive = tmp_path / 'archive.jsonl.gz'
+    ArchiveRecorder(archive).close()
+    result = runner.invoke(
+        main, ['--working-dir',
+               str(tmp_path), '--replay',
+               str(archive), '--replay-latency', '0.1'])
+    assert result.exit_code == 0
+    assert isinstance(mock_init_sessions.call_args.kwargs['replayer'], ArchiveReplayer)
+    assert mock_init_sessions.call_args.kwargs['recorder'] is None
+    mock_open_http_cache.assert_not_called()
+
+
+def test_main_replay_invalid_archive(mocker: MockerFixture, runner: CliRunner,
+                                     tmp_path: Path) -> None:
+    mocker.patch('livecheck.main.chdir')
+    mocker.patch('livecheck.main.setup_logging')
+    mocker.patch('livecheck.main.gather_settings', return_value=mocker.Mock(host_limits={}))
+    mocker.patch('livecheck.main.get_repository_root_if_inside',
+                 return_value=(str(tmp_path), 'repo'))
+    mock_init_sessions = mocker.patch('livecheck.main.init_sessions')
+    archive = tmp_path / 'archive.jsonl.gz'
+    archive.write_bytes(b'not an archive')
+    result = runner.invoke(main, ['--working-dir', str(tmp_path), '--replay', str(archive)])
+    assert result.exit_code == 1
+    assert 'is not a valid livecheck archive' in result.output
+    mock_init_sessions.assert_not_called()
+
+
+def test_main_reports_tripped_hosts(mocker: MockerFixture, runner: CliRunner,
+                                    tmp_path: Path) -> None:
+    mocker.patch('livecheck.main.chdir')
+    mocker.patch('livecheck.main.setup_logging')
+    mocker.patch('livecheck.main.gather_settings', return_value=mocker.Mock(host_limits={}))
+    mocker.patch('livecheck.main.get_repository_root_if_inside',
+                 return_value=(str(tmp_path), 'repo'))
+    mocker.patch('livecheck.main.get_props', return_value=[])
+    mocker.patch('livecheck.main.tripped_hosts', return_value=['a.example.com', 'b.example.com'])
+    mock_log = mocker.patch('livecheck.main.log')
+    result = runner.invoke(main, ['--working-dir', str(tmp_path)])
+    assert result.exit_code == 0
+    mock_log.warning.assert_called_once_with(
+        'Some packages could not be checked because these hosts kept failing: %s.',
+        'a.example.com, b.example.com')
+
+
+@pytest.mark.parametrize('refresh', [False, True])
+def test_main_refresh_forgets_missing_urls(mocker: MockerFixture, runner: CliRunner, tmp_path: Path,
+                                           refresh: bool) -> None:
+    mocker.patch('livecheck.main.chdir')
+    mocker.patch('livecheck.main.setup_logging')
+    mocker.patch('livecheck.main.gather_settings', return_value=mocker.Mock(host_limits={}))
+    mocker.patch('livecheck.main.get_repository_root_if_inside',
+                 return_value=(str(tmp_path), 'repo'))
+    mocker.patch('livecheck.main.get_props', return_value=[])
+    open_store().put_missing('https://example.com/gone', 404)
+    close_store()
+    args = ['--working-dir', str(tmp_path)]
+    result = runner.invoke(main, [*args, '--refresh'] if refresh else args)
+    assert result.exit_code == 0
+    missing = open_store().get_missing('https://example.com/gone', 60)
+    assert missing is None if refresh else missing == 404
+
+
+@pytest.mark.parametrize('value', ['sourceforge.net', 'sourceforge.net=0', '=2', 'a=b'])
+def test_main_host_limit_invalid(runner: CliRunner, tmp_path: Path, value: str) -> None:
+    result = runner.invoke(main, ['--host-limit', value, '--working-dir', str(tmp_path)])
+    assert result.exit_code == 2
+    assert 'Expected HOST=N' in result.output
+
+
+@pytest.mark.asyncio
+async def test_get_props_remembers_winning_strategy(mocker: MockerFixture, fake_repo: Path,
+                                                    mock_settings2: Mock) -> None:
+    mock_parse_url = _patch_get_props(mocker)
+    mocker.patch('livecheck.main.get_aux',
+                 new_callable=mocker.AsyncMock,
+                 return_value=['https://a.example.com https://b.example.com'])
+    mock_parse_url.side_effect = [('', '', '', ''), ('', '', '', ''),
+                                  ('2.0.0', '', '', 'https://b.example.com')]
+    mocker.patch('livecheck.main.parse_metadata', return_value=('', '', '', ''))
+    store = open_store()
+    await get_props(fake_repo, fake_repo, _store_settings(mock_settings2), ['cat/pkg'])
+    assert store.get_strategy('cat/pkg') == ('homepage', 'https://b.example.com')
+
+
+@pytest.mark.asyncio
+async def test_get_props_tries_remembered_strategy_first(mocker: MockerFixture, fake_repo: Path,
+                                                         mock_settings2: Mock) -> None:
+    mock_parse_url = _patch_get_props(mocker)
+    mock_repology = mocker.patch('livecheck.main.get_latest_repology', return_value='3.0.0')
+    open_store().put_strategy('cat/pkg', 'repology', '')
+    result = await get_props(fake_repo, fake_repo, _store_settings(mock_settings2), ['cat/pkg'])
+    assert result == [('cat', 'pkg', '1.0.0', '3.0.0', '', '', '')]
+    mock_repology.assert_called_once_with('cat/pkg-1.0.0', mock_settings2)
+    mock_parse_url.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_props_remembered_src_uri_uses_current_src_uri(mocker: MockerFixture,
+                                                                 fake_repo: Path,
+                                                                 mock_settings2: Mock) -> None:
+    mock_parse_url = _patch_get_props(mocker)
+    open_store().put_strategy('cat/pkg', 'src_uri', 'https://old.example.com')
+    await get_props(fake_repo, fake_repo, _store_settings(mock_settings2), ['cat/pkg'])
+    mock_parse_url.assert_called_once_with('https://github.com/owner/pkg/archive/v1.0.0.tar.gz',
+                                           'cat/pkg-1.0.0',
+                                           mock_settings2,
+                                           force_sha=False)
+
+
+@pytest.mark.asyncio
+async def test_get_props_remembered_strategy_falls_back(mocker: MockerFixture, fake_repo: Path,
+                                                        mock_settings2: Mock) -> None:
+    mock_parse_url = _patch_get_props(mocker)
+    mock_repology = mocker.patch('livecheck.main.get_latest_repology', return_value='')
+    store = open_store()
+    store.put_strategy('cat/pkg', 'repology', '')
+    result = await get_props(fake_repo, fake_repo, _store_settings(mock_settings2), ['cat/pkg'])
+    assert result == [('cat', 'pkg', '1.0.0', '2.0.0', '', '', 'https://github.com/owner/pkg')]
+    mock_repology.assert_called_once()
+    mock_parse_url.assert_called_once()
+    assert store.get_strategy('cat/pkg') == ('src_uri',
+                                             'https://github.com/owner/pkg/archive/v1.0.0.tar.gz')
+
+
+@pytest.mark.asyncio
+async def test_get_props_forgets_remembered_strategy_that_stopped_working(
+        mocker: MockerFixture, fake_repo: Path, mock_settings2: Mock) -> None:
+    mock_parse_url = _patch_get_props(mocker)
+    mock_parse_url.return_value = ('', '', '', '')
+    mocker.patch('livecheck.main.parse_metadata', return_value=('', '', '', ''))
+    mocker.patch('livecheck.main.get_latest_directory_package', return_value=('', ''))
+    mock_repology = mocker.patch('livecheck.main.get_latest_repology', return_value='')
+    store = open_store()
+    store.put_strategy('cat/pkg', 'repology', '')
+    await get_props(fake_repo, fake_repo, _store_settings(mock_settings2), ['cat/pkg'])
+    mock_repology.assert_called_once()
+    assert store.get_strategy('cat/pkg') is None
@@ -765,3 +765,28 @@ def test_gather_settings_type_location_checksum_missing_url_logs_error(
     result = gather_settings(tmp_path)
     logger.error.assert_any_call('No "url" in %s.', mocker.ANY)
     assert 'cat/pkg' not in result.custom_livechecks
+
+
+def test_gather_settings_with_host_limits(tmp_path: Path) -> None:
+    make_json_file(tmp_path, 'cat/pkg/livecheck.json',
+                   {'host_limits': {
+                       'SourceForge.net': 2,
+                       'pypi.org': 8
+                   }})
+    make_json_file(tmp_path, 'cat/pkg2/livecheck.json', {'host_limits': {'sourceforge.net': 1}})
+    result = gather_settings(tmp_path)
+    assert result.host_limits == {'sourceforge.net': 1, 'pypi.org': 8}
+
+
+def test_gather_settings_with_invalid_host_limits(tmp_path: Path, mocker: MockerFixture) -> None:
+    mock_log = mocker.patch('livecheck.settings.log')
+    make_json_file(tmp_path, 'cat/pkg/livecheck.json',
+                   {'host_limits': {
+                       'a.org': 0,
+                       'b.org': True,
+                       'c.org': '2'
+                   }})
+    make_json_file(tmp_path, 'cat/pkg2/livecheck.json', {'host_limits': ['d.org']})
+    result = gather_settings(tmp_path)
+    assert not result.host_limits
+    assert mock_log.error.call_count == 4
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+import gzip
+
+from livecheck.utils.archive import ArchiveRecorder, ArchiveReplayer
+import pytest
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from niquests_cache.typing import CacheEntry
+
+
+def _entry(content: bytes, status_code: int = 200) -> CacheEntry:
+    return {
+        'content': content,
+        'encoding': 'utf-8',
+        'headers': {
+            'Content-Type': 'text/plain'
+        },
+        'status_code': status_code,
+        'ts': 1000.0,
+        'url': 'https://a.example/a'
+    }
+
+
+def test_archive_round_trip(tmp_path: Path) -> None:
+    path = tmp_path / 'archive.jsonl.gz'
+    recorder = ArchiveRecorder(path)
+    recorder.record('get', 'https://a.example/a', _entry(b'first'), 0.5, {'Accept': 'text/plain'})
+    recorder.record('GET', 'https://a.example/a', _entry(b'second'), 0.25, {'accept': 'text/plain'})
+    recorder.record('GET', 'https://a.example/b', _entry(b'\xff\xfe'), 0.1)
+    recorder.record('POST', 'https://a.example/b', _entry(b'posted', 201), 0.1, body='a=b')
+    recorder.close()
+    assert recorder.count == 4
+    replayer = ArchiveReplayer(path)
+    assert replayer.lookup('GET', 'https://a.example/a',
+                           {'ACCEPT': 'text/plain'}) == (_entry(b'first'), 0.5)
+    for _ in range(2):
+        assert replayer.lookup('GET', 'https://a.example/a',
+                               {'Accept': 'text/plain'}) == (_entry(b'second'), 0.25)
+    assert replayer.lookup('GET', 'https://a.example/a') is None
+    assert replayer.lookup('GET', 'https://a.example/b') == (_entry(b'\xff\xfe'), 0.1)
+    assert replayer.lookup('POST', 'https://a.example/b') is None
+    assert replayer.lookup('POST', 'https://a.example/b', body='a=b') == (_entry(b'posted',
+                                                                                 201), 0.1)
+    assert ArchiveReplayer(path, latency=0).lookup(
+        'GET', 'https://a.example/b') == (_entry(b'\xff\xfe'), 0)
+
+
+@pytest.mark.parametrize('content', [
+    b'not gzip',
+    gzip.compress(b'{"livecheck_archive": 2}\n'),
+    gzip.compress(b'{"livecheck_archive": 1}\n')[:-8],
+    gzip.compress(b'{"livecheck_archive": 1}\n')[:10] + b'corrupt deflate data',
+    gzip.compress(b'{"livecheck_archive": 1}\n{"method": "GET", "url"\n')
+])
+def test_archive_replayer_rejects_other_files(tmp_path: Path, content: bytes) -> None:
+    path = tmp_path / 'archive.jsonl.gz'
+    path.write_bytes(content)
+    with pytest.raises(ValueError, match='livecheck archive'):
+        ArchiveReplayer(path)
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from livecheck.utils.circuit import CircuitBreaker, CircuitOpenError
+import pytest
+
+if TYPE_CHECKING:
+    from pytest_mock import MockerFixture
+
+
+def test_circuit_opens_after_threshold(mocker: MockerFixture) -> None:
+    mock_time = mocker.patch('livecheck.utils.circuit.time', return_value=1000.0)
+    breaker = CircuitBreaker(threshold=3, cooldown=60)
+    for _ in range(2):
+        breaker.record_failure('example.com')
+    breaker.check('example.com')
+    breaker.record_failure('example.com')
+    with pytest.raises(CircuitOpenError) as exc_info:
+        breaker.check('example.com')
+    assert exc_info.value.host == 'example.com'
+    breaker.check('other.example.com')
+    assert breaker.tripped_hosts == ['example.com']
+    mock_time.return_value = 1060.0
+    breaker.check('example.com')
+    breaker.record_failure('example.com')
+    with pytest.raises(CircuitOpenError):
+        breaker.check('example.com')
+
+
+def test_circuit_success_resets_failures() -> None:
+    breaker = CircuitBreaker(threshold=2)
+    breaker.record_failure('example.com')
+    breaker.record_success('example.com')
+    breaker.record_failure('example.com')
+    breaker.check('example.com')
+    assert not breaker.tripped_hosts
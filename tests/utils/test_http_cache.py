@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+import os
+
+from livecheck.utils import http_cache
+from livecheck.utils.http_cache import (
+    HostStats,
+    HttpCache,
+    entry_from_response,
+    open_http_cache,
+    response_from_entry,
+)
+import niquests
+import pytest
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from niquests_cache.typing import CacheEntry
+    from pytest_mock import MockerFixture
+
+
+def _entry(url: str, size: int, ts: float = 1000.0) -> CacheEntry:
+    return {
+        'content': b'x' * size,
+        'encoding': 'utf-8',
+        'headers': {},
+        'status_code': 200,
+        'ts': ts,
+        'url': url
+    }
+
+
+def _content(entry: CacheEntry | None) -> bytes | None:
+    return entry['content'] if entry else None
+
+
+def _keys(cache: HttpCache) -> set[str]:
+    return {row[0] for row in cache._conn.execute('SELECT key FROM niquests_cache')}  # noqa: SLF001
+
+
+def _stored(cache: HttpCache, key: str) -> bytes:
+    return bytes(
+        cache._conn.execute(  # noqa: SLF001
+            'SELECT content FROM niquests_cache WHERE key = ?', (key,)).fetchone()[0])
+
+
+@pytest.mark.parametrize(
+    ('content', 'compressed'),
+    [
+        (b'{"releases": {}}' * 1000, True),
+        (b'x' * (http_cache.MIN_COMPRESSED_SIZE - 1), False),
+        (os.urandom(4096), False),
+        (b'\x00zlib\x00 small body', True),
+        (b'', False),
+    ],
+)
+@pytest.mark.asyncio
+async def test_http_cache_compresses_bodies(tmp_path: Path, content: bytes,
+                                            compressed: bool) -> None:  # noqa: FBT001
+    cache = HttpCache(tmp_path / 'http.sqlite')
+    entry = _entry('https://pypi.org/pypi/boto3/json', 0)
+    entry['content'] = content
+    await cache.aset('a', entry)
+    cache.set('b', entry)
+    assert entry['content'] == content
+    for key in ('a', 'b'):
+        assert (_stored(cache, key) != content) is compressed
+    assert _content(await cache.aget('a')) == content
+    assert _content(cache.get('b')) == content
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_http_cache_reads_compressed_bodies_without_compression(tmp_path: Path) -> None:
+    content = b'<a href="foo-1.0.tar.gz">' * 100
+    cache = HttpCache(tmp_path / 'http.sqlite')
+    await cache.aset('a', _entry('https://a.example/', 0) | {'content': content})
+    cache.close()
+    cache = HttpCache(tmp_path / 'http.sqlite', compression_level=None)
+    await cache.aset('b', _entry('https://a.example/', 0) | {'content': content})
+    assert _stored(cache, 'b') == content
+    await cache.aset('c', _entry('https://a.example/', 0) | {'content': b'\x00zlib\x00'})
+    assert _content(await cache.aget('c')) == b'\x00zlib\x00'
+    assert _content(await cache.aget('a')) == content
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_http_cache_ignores_corrupt_bodies(tmp_path: Path) -> None:
+    cache = HttpCache(tmp_path / 'http.sqlite')
+    await cache.aset('a', _entry('https://a.example/', 10))
+    cache._conn.execute(  # noqa: SLF001
+        'UPDATE niquests_cache SET content = ?', (b'\x00zlib\x00corrupt',))
+    cache._conn.commit()  # noqa: SLF001
+    assert await cache.aget('a') is None
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_http_cache_records_exchanges(tmp_path: Path) -> None:
+    cache = HttpCache(tmp_path / 'http.sqlite')
+    url = 'https://a.example/a?v=1'
+    await cache.arecord('GET', url, _entry(url, 10), {'Accept': 'text/html'})
+    assert await cache.alookup('GET', url, {'accept': 'text/html'}) == _entry(url, 10)
+    assert await cache.alookup('GET', url) is None
+    assert await cache.alookup('HEAD', url, {'Accept': 'text/html'}) is None
+    assert await cache.aget(url) is None
+    cache.close()
+
+
+def test_response_entry_round_trip() -> None:
+    response = niquests.Response()
+    response.status_code = 200
+    response.url = 'https://a.example/a'
+    response.headers['Last-Modified'] = 'Wed, 21 Oct 2015 07:28:00 GMT'
+    response._content = b'data'  # noqa: SLF001
+    entry = entry_from_response(response)
+    assert entry['encoding'] == 'utf-8'
+    r = response_from_entry(entry)
+    assert (r.status_code, r.url, r.content, r.text) == (200, 'https://a.example/a', b'data',
+                                                         'data')
+    assert r.headers['last-modified'] == 'Wed, 21 Oct 2015 07:28:00 GMT'
+
+
+def test_host_stats_hit_ratio() -> None:
+    assert HostStats().hit_ratio is None
+    assert HostStats(hits=3, misses=1).hit_ratio == pytest.approx(0.75)
+
+
+@pytest.mark.asyncio
+async def test_http_cache_stats(tmp_path: Path) -> None:
+    cache = HttpCache(tmp_path / 'http.sqlite')
+    await cache.aset('a', _entry('https://pypi.org/simple/a/', 100))
+    await cache.aset('b', _entry('https://pypi.org/simple/b/', 50))
+    await cache.aset('c', _entry('https://api.github.com/repos/a/b', 10))
+    cache.count('pypi.org', hit=True)
+    cache.count('pypi.org', hit=False)
+    cache.count('gitlab.com', hit=False)
+    cache.close()
+    cache = HttpCache(tmp_path / 'http.sqlite')
+    cache.count('pypi.org', hit=True)
+    assert cache.stats() == {
+        'pypi.org': HostStats(2, 206, 2, 1),
+        'api.github.com': HostStats(1, 44, 0, 0),
+        'gitlab.com': HostStats(0, 0, 0, 1)
+    }
+    assert cache.file_size > 0
+    cache.close()
+    cache.close()
+
+
+def test_http_cache_response_table_has_the_columns_used(tmp_path: Path) -> None:
+    cache = HttpCache(tmp_path / 'http.sqlite')
+    columns = {
+        row[1]
+        for row in cache._conn.execute('PRAGMA table_info(niquests_cache)')  # noqa: SLF001
+    }
+    assert columns >= http_cache._RESPONSE_COLUMNS  # noqa: SLF001
+    cache.close()
+
+
+def test_http_cache_rejects_unknown_response_table(tmp_path: Path) -> None:
+    cache = HttpCache(tmp_path / 'http.sqlite')
+    cache._conn.execute('ALTER TABLE niquests_cache RENAME COLUMN ts TO created')  # noqa: SLF001
+    with pytest.raises(ValueError, match='has no column ts'):
+        cache.stats()
+    with pytest.raises(ValueError, match='has no column ts'):
+        cache.prune()
+    with pytest.raises(ValueError, match='has no column ts'):
+        cache.clear()
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_http_cache_prune_by_age(tmp_path: Path, mocker: MockerFixture) -> None:
+    mocker.patch('livecheck.utils.http_cache.time', return_value=2000.0)
+    cache = HttpCache(tmp_path / 'http.sqlite')
+    await cache.aset('old', _entry('https://a.example/old', 10, ts=500.0))
+    await cache.aset('new', _entry('https://a.example/new', 10, ts=1500.0))
+    assert cache.prune(max_age=1000) == 1
+    assert _keys(cache) == {'new'}
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_http_cache_prune_least_recently_used(tmp_path: Path, mocker: MockerFixture) -> None:
+    mock_time = mocker.patch('livecheck.utils.http_cache.time', return_value=1000.0)
+    cache = HttpCache(tmp_path / 'http.sqlite')
+    for key in ('a', 'b', 'c'):
+        await cache.aset(key, _entry(f'https://a.example/{key}', 10))
+    mock_time.return_value = 1001.0
+    assert await cache.aget('a') is not None
+    assert await cache.aget('missing') is None
+    assert cache.prune(max_size=40) == 2
+    assert _keys(cache) == {'a'}
+    assert cache._conn.execute(  # noqa: SLF001
+        'SELECT key FROM livecheck_usage').fetchall() == [('a',)]
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_http_cache_clear(tmp_path: Path) -> None:
+    cache = HttpCache(tmp_path / 'http.sqlite')
+    await cache.aset('a', _entry('https://a.example/a', 10))
+    cache.count('a.example', hit=True)
+    cache.flush()
+    cache.count('a.example', hit=False)
+    assert cache.clear() == 1
+    assert cache.stats() == {}
+    cache.close()
+
+
+@pytest.mark.parametrize(('pruned_at', 'pruned'), [(None, True), (1000.0, False),
+                                                   (1000.0 - http_cache.PRUNE_INTERVAL, True)])
+def test_http_cache_prune_if_due(tmp_path: Path, mocker: MockerFixture, pruned_at: float | None,
+                                 pruned: bool) -> None:  # noqa: FBT001
+    mocker.patch('livecheck.utils.http_cache.time', return_value=1000.0)
+    cache = HttpCache(tmp_path / 'http.sqlite')
+    if pruned_at is not None:
+        cache._conn.execute(  # noqa: SLF001
+            "INSERT INTO livecheck_meta VALUES ('pruned_at', ?)", (pruned_at,))
+    assert cache.prune_if_due() == (0 if pruned else None)
+    assert cache._conn.execute(  # noqa: SLF001
+        "SELECT value FROM livecheck_meta WHERE name = 'pruned_at'").fetchone() == (1000.0 if pruned
+                                                                                    else pruned_at,)
+    cache.close()
+
+
+@pytest.mark.parametrize(('vacuumed_at', 'vacuumed'), [(None, True), (1000.0, False),
+                                                       (1000.0 - http_cache.VACUUM_INTERVAL, True)])
+def test_http_cache_maintain(tmp_path: Path, mocker: MockerFixture, vacuumed_at: float | None,
+                             vacuumed: bool) -> None:  # noqa: FBT001
+    mocker.patch('livecheck.utils.http_cache.time', return_value=1000.0)
+    cache = HttpCache(tmp_path / 'http.sqlite')
+    if vacuumed_at is not None:
+        cache._conn.execute(  # noqa: SLF001
+            "INSERT INTO livecheck_meta VALUES ('vacuumed_at', ?)", (vacuumed_at,))
+    mock_prune = mocker.patch.object(cache, 'prune')
+    mock_vacuum = mocker.patch.object(cache, 'vacuum', wraps=cache.vacuum)
+    cache.maintain()
+    mock_prune.assert_called_once_with()
+    assert mock_vacuum.called is vacuumed
+    assert cache._conn.execute(  # noqa: SLF001
+        "SELECT value FROM livecheck_meta WHERE name = 'vacuumed_at'").fetchone() == (
+            1000.0 if vacuumed else vacuumed_at,)
+    cache.close()
+
+
+def test_open_http_cache(tmp_path: Path) -> None:
+    cache = open_http_cache()
+    assert cache.database == tmp_path / 'http.sqlite'
+    cache.close()
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from livecheck.utils.latency import LatencyTracker
+import pytest
+
+
+def test_percentile_needs_min_samples() -> None:
+    tracker = LatencyTracker(min_samples=3)
+    assert tracker.percentile('sourceforge.net', 0.95) is None
+    tracker.record('sourceforge.net', 1.0)
+    tracker.record('sourceforge.net', 2.0)
+    assert tracker.percentile('sourceforge.net', 0.95) is None
+    tracker.record('sourceforge.net', 3.0)
+    assert tracker.percentile('sourceforge.net', 0.95) == pytest.approx(3.0)
+    assert tracker.percentile('pypi.org', 0.95) is None
+
+
+def test_percentile() -> None:
+    tracker = LatencyTracker(min_samples=1)
+    for latency in range(100, 0, -1):
+        tracker.record('sourceforge.net', latency / 10)
+    assert tracker.percentile('sourceforge.net', 0) == pytest.approx(0.1)
+    assert tracker.percentile('sourceforge.net', 0.95) == pytest.approx(9.5)
+    assert tracker.percentile('sourceforge.net', 1) == pytest.approx(10.0)
+
+
+def test_window_keeps_recent_latencies() -> None:
+    tracker = LatencyTracker(window=2, min_samples=1)
+    for latency in (9.0, 1.0, 2.0):
+        tracker.record('sourceforge.net', latency)
+    assert tracker.percentile('sourceforge.net', 1) == pytest.approx(2.0)
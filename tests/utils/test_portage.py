@@ -2,9 +2,11 @@ from __future__ import annotations
 
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, NoReturn
+import hashlib
 import operator
 import re as real_re
 
+from livecheck.utils import portage
 from livecheck.utils.portage import (
     accept_version,
     catpkg_catpkgsplit,
@@ -12,14 +14,18 @@ from livecheck.utils.portage import (
     compare_versions,
     digest_ebuild,
     fetch_ebuild,
+    find_packages,
     get_aux,
     get_distdir,
     get_fetch_map,
     get_first_src_uri,
     get_highest_matches,
     get_last_version,
+    get_package_versions,
     get_repository_root_if_inside,
+    get_thirdpartymirrors,
     is_version_development,
+    load_metadata,
     mask_version,
     remove_initial_match,
     remove_leading_zeros,
@@ -134,9 +140,7 @@ async def test_get_highest_matches_basic(mocker: MockerFixture) -> None:
         return ('cat/pkg', 'cat', 'pkg', '1.2.2')
 
     mocker.patch('livecheck.utils.portage.catpkg_catpkgsplit', side_effect=catpkg_side_effect)
-    mock_p.async_xmatch = mocker.AsyncMock()
-    mock_p.async_xmatch.return_value = ['cat/pkg-1.2.3', 'cat/pkg-1.2.2']
-    mock_p.findname2.return_value = ('cat/pkg-1.2.3', '/repo/root')
+    mock_p.cp_list.return_value = ['cat/pkg-1.2.3', 'cat/pkg-1.2.2']
 
     names = ['cat/pkg']
     repo_root = Path('/repo/root')
@@ -148,8 +152,7 @@ async def test_get_highest_matches_basic(mocker: MockerFixture) -> None:
 
 async def test_get_highest_matches_no_matches(mocker: MockerFixture) -> None:
     mock_p = mocker.patch('livecheck.utils.portage.P')
-    mock_p.async_xmatch = mocker.AsyncMock()
-    mock_p.async_xmatch.return_value = []
+    mock_p.cp_list.return_value = []
     names = ['cat/pkg']
     repo_root = Path('/repo/root')
     dummy_settings = mocker.Mock()
@@ -159,8 +162,7 @@ async def test_get_highest_matches_no_matches(mocker: MockerFixture) -> None:
 
 async def test_get_highest_matches_invalid_package_structure(mocker: MockerFixture) -> None:
     mock_p = mocker.patch('livecheck.utils.portage.P')
-    mock_p.async_xmatch = mocker.AsyncMock()
-    mock_p.async_xmatch.return_value = ['invalid']
+    mock_p.cp_list.return_value = ['invalid']
 
     def raise_value_error(x: Any) -> NoReturn:
         msg = 'bad structure'
@@ -176,12 +178,11 @@ async def test_get_highest_matches_invalid_package_structure(mocker: MockerFixtu
 
 async def test_get_highest_matches_wrong_repo_root(mocker: MockerFixture) -> None:
     mock_p = mocker.patch('livecheck.utils.portage.P')
-    mock_p.async_xmatch = mocker.AsyncMock()
-    mock_p.async_xmatch.return_value = ['cat/pkg-1.2.3']
+    mock_p.async_xmatch = mocker.AsyncMock(return_value=['cat/pkg-1.2.3'])
     mocker.patch('livecheck.utils.portage.catpkg_catpkgsplit',
                  return_value=('cat/pkg', 'cat', 'pkg', '1.2.3'))
     mock_p.findname2.return_value = ('cat/pkg-1.2.3', '/other/root')
-    names = ['cat/pkg']
+    names = ['pkg']
     repo_root = Path('/repo/root')
     dummy_settings = mocker.Mock()
     result = await get_highest_matches(names, repo_root, dummy_settings)
@@ -190,11 +191,9 @@ async def test_get_highest_matches_wrong_repo_root(mocker: MockerFixture) -> Non
 
 async def test_get_highest_matches_ignores_9999(mocker: MockerFixture) -> None:
     mock_p = mocker.patch('livecheck.utils.portage.P')
-    mock_p.async_xmatch = mocker.AsyncMock()
-    mock_p.async_xmatch.return_value = ['cat/pkg-9999']
+    mock_p.cp_list.return_value = ['cat/pkg-9999']
     mocker.patch('livecheck.utils.portage.catpkg_catpkgsplit',
                  return_value=('cat/pkg', 'cat', 'pkg', '9999'))
-    mock_p.findname2.return_value = ('cat/pkg-9999', '/repo/root')
     names = ['cat/pkg']
     repo_root = Path('/repo/root')
     dummy_settings = mocker.Mock()
@@ -204,11 +203,9 @@ async def test_get_highest_matches_ignores_9999(mocker: MockerFixture) -> None:
 
 async def test_get_highest_matches_single_version_included(mocker: MockerFixture) -> None:
     mock_p = mocker.patch('livecheck.utils.portage.P')
-    mock_p.async_xmatch = mocker.AsyncMock()
-    mock_p.async_xmatch.return_value = ['cat/pkg-1.2.3']
+    mock_p.cp_list.return_value = ['cat/pkg-1.2.3']
     mocker.patch('livecheck.utils.portage.catpkg_catpkgsplit',
                  return_value=('cat/pkg', 'cat', 'pkg', '1.2.3'))
-    mock_p.findname2.return_value = ('cat/pkg-1.2.3', '/repo/root')
     names = ['cat/pkg']
     repo_root = Path('/repo/root')
     dummy_settings = mocker.Mock()
@@ -219,8 +216,7 @@ async def test_get_highest_matches_single_version_included(mocker: MockerFixture
 
 async def test_get_highest_matches_9999_ignored(mocker: MockerFixture) -> None:
     mock_p = mocker.patch('livecheck.utils.portage.P')
-    mock_p.async_xmatch = mocker.AsyncMock()
-    mock_p.async_xmatch.return_value = ['cat/pkg-1.2.3', 'cat/pkg-9999']
+    mock_p.cp_list.return_value = ['cat/pkg-1.2.3', 'cat/pkg-9999']
 
     def catpkg_side_effect(atom: str) -> tuple[str, str, str, str]:
         if '9999' in atom:
@@ -228,7 +224,6 @@ async def test_get_highest_matches_9999_ignored(mocker: MockerFixture) -> None:
         return ('cat/pkg', 'cat', 'pkg', '1.2.3')
 
     mocker.patch('livecheck.utils.portage.catpkg_catpkgsplit', side_effect=catpkg_side_effect)
-    mock_p.findname2.return_value = ('cat/pkg-1.2.3', '/repo/root')
     names = ['cat/pkg']
     repo_root = Path('/repo/root')
     dummy_settings = mocker.Mock()
@@ -239,8 +234,7 @@ async def test_get_highest_matches_9999_ignored(mocker: MockerFixture) -> None:
 
 async def test_get_highest_matches_multiple_versions_included(mocker: MockerFixture) -> None:
     mock_p = mocker.patch('livecheck.utils.portage.P')
-    mock_p.async_xmatch = mocker.AsyncMock()
-    mock_p.async_xmatch.return_value = ['cat/pkg-1.2.3', 'cat/pkg-1.2.2', 'cat/pkg-1.2.1']
+    mock_p.cp_list.return_value = ['cat/pkg-1.2.3', 'cat/pkg-1.2.2', 'cat/pkg-1.2.1']
 
     def catpkg_side_effect(atom: str) -> tuple[str, str, str, str]:
         if '1.2.3' in atom:
@@ -250,7 +244,6 @@ async def test_get_highest_matches_multiple_versions_included(mocker: MockerFixt
         return ('cat/pkg', 'cat', 'pkg', '1.2.1')
 
     mocker.patch('livecheck.utils.portage.catpkg_catpkgsplit', side_effect=catpkg_side_effect)
-    mock_p.findname2.return_value = ('cat/pkg-1.2.3', '/repo/root')
     names = ['cat/pkg']
     repo_root = Path('/repo/root')
     dummy_settings = mocker.Mock()
@@ -261,8 +254,7 @@ async def test_get_highest_matches_multiple_versions_included(mocker: MockerFixt
 
 async def test_get_highest_matches_with_9999_and_multiple_versions(mocker: MockerFixture) -> None:
     mock_p = mocker.patch('livecheck.utils.portage.P')
-    mock_p.async_xmatch = mocker.AsyncMock()
-    mock_p.async_xmatch.return_value = ['cat/pkg-1.2.3', 'cat/pkg-1.2.2', 'cat/pkg-9999']
+    mock_p.cp_list.return_value = ['cat/pkg-1.2.3', 'cat/pkg-1.2.2', 'cat/pkg-9999']
 
     def catpkg_side_effect(atom: str) -> tuple[str, str, str, str]:
         if '9999' in atom:
@@ -272,7 +264,6 @@ async def test_get_highest_matches_with_9999_and_multiple_versions(mocker: Mocke
         return ('cat/pkg', 'cat', 'pkg', '1.2.2')
 
     mocker.patch('livecheck.utils.portage.catpkg_catpkgsplit', side_effect=catpkg_side_effect)
-    mock_p.findname2.return_value = ('cat/pkg-1.2.3', '/repo/root')
     names = ['cat/pkg']
     repo_root = Path('/repo/root')
     dummy_settings = mocker.Mock()
@@ -281,6 +272,40 @@ async def test_get_highest_matches_with_9999_and_multiple_versions(mocker: Mocke
     assert result == ['cat/pkg-1.2.3']
 
 
+async def test_get_highest_matches_other_atoms(mocker: MockerFixture) -> None:
+    mock_p = mocker.patch('livecheck.utils.portage.P')
+    mock_p.async_xmatch = mocker.AsyncMock(return_value=['cat/pkg-2.0.0'])
+    mock_p.findname2.return_value = ('cat/pkg-2.0.0', '/repo/root')
+    settings = mocker.Mock(restrict_version={})
+    assert await get_highest_matches(['pkg', '<cat/pkg-3'], Path('/repo/root'),
+                                     settings) == ['cat/pkg-2.0.0']
+    assert mock_p.async_xmatch.call_args_list == [
+        mocker.call('match-all', 'pkg'),
+        mocker.call('match-all', '<cat/pkg-3')
+    ]
+    mock_p.cp_list.assert_not_called()
+
+
+async def test_get_highest_matches_reads_each_package_once(mocker: MockerFixture) -> None:
+    mock_p = mocker.patch('livecheck.utils.portage.P')
+    mock_p.cp_list.return_value = ['cat/pkg-1.0.0', 'cat/pkg-1.1.0']
+    settings = mocker.Mock(restrict_version={})
+    assert await get_highest_matches(['cat/pkg', 'cat/pkg'], Path('/repo/root'),
+                                     settings) == ['cat/pkg-1.1.0']
+    assert await get_highest_matches(['cat/pkg'], Path('/repo/root'), settings) == ['cat/pkg-1.1.0']
+    assert await get_highest_matches(['cat/pkg'], None, settings) == ['cat/pkg-1.1.0']
+    assert mock_p.cp_list.call_args_list == [
+        mocker.call('cat/pkg', mytree='/repo/root'),
+        mocker.call('cat/pkg', mytree=None)
+    ]
+
+
+def test_get_package_versions_unknown_repository(mocker: MockerFixture) -> None:
+    mock_p = mocker.patch('livecheck.utils.portage.P')
+    mock_p.cp_list.side_effect = KeyError('/not/a/repo')
+    assert get_package_versions('cat/pkg', '/not/a/repo') == ()
+
+
 def test_catpkgsplit2_valid_atom(mocker: MockerFixture) -> None:
     mock_catpkgsplit = mocker.patch('livecheck.utils.portage.catpkgsplit')
     mock_catpkgsplit.return_value = ('cat', 'pkg', '1.2.3', 'r0')
@@ -413,6 +438,42 @@ async def test_get_first_src_uri_multiple_lines(mocker: MockerFixture) -> None:
     assert result == 'https://foo.com/bar.tar.gz'
 
 
+@pytest.fixture
+def package_tree(tmp_path: Path) -> Path:
+    repo_root = tmp_path / 'repo'
+    for path in ('cat1/pkg1/pkg1-1.0.ebuild', 'cat1/pkg1/pkg1-1.1.ebuild',
+                 'cat1/pkg1/files/old.ebuild', 'cat1/pkg2/pkg2-2.0.ebuild',
+                 'cat1/empty/metadata.xml', 'cat2/pkg3/pkg3-3.0.ebuild', 'eclass/foo.eclass',
+                 'metadata/md5-cache/cat1/pkg1-1.0', 'other/pkg4/pkg4-4.0.ebuild',
+                 '.git/pkg5/pkg5-5.0.ebuild', 'profiles/categories'):
+        (repo_root / path).parent.mkdir(parents=True, exist_ok=True)
+        (repo_root / path).touch()
+    (repo_root / 'profiles' / 'categories').write_text('# comment\ncat1\ncat2\n\ncat3\n',
+                                                       encoding='utf-8')
+    return repo_root
+
+
+@pytest.mark.parametrize(('search_dir', 'expected'), [
+    ('.', ['cat1/pkg1', 'cat1/pkg2', 'cat2/pkg3']),
+    ('cat1', ['cat1/pkg1', 'cat1/pkg2']),
+    ('cat1/pkg1', ['cat1/pkg1']),
+    ('cat1/pkg1/files', ['cat1/pkg1']),
+    ('cat1/empty', []),
+    ('other', []),
+    ('eclass', []),
+    ('..', []),
+])
+def test_find_packages(package_tree: Path, search_dir: str, expected: list[str]) -> None:
+    assert find_packages(package_tree / search_dir, package_tree) == expected
+
+
+def test_find_packages_without_categories(package_tree: Path) -> None:
+    (package_tree / 'profiles' / 'categories').unlink()
+    assert find_packages(package_tree,
+                         package_tree) == ['cat1/pkg1', 'cat1/pkg2', 'cat2/pkg3', 'other/pkg4']
+    assert find_packages(package_tree / 'other', package_tree) == ['other/pkg4']
+
+
 def test_get_repository_root_if_inside_inside_overlay(mocker: MockerFixture,
                                                       tmp_path: Path) -> None:
     # Setup fake repo structure
@@ -967,9 +1028,102 @@ async def test_get_aux_calls_async_aux_get(mocker: MockerFixture) -> None:
     mock_p.async_aux_get.assert_awaited_once_with('cat/pkg-1.2.3', ['SRC_URI'], mytree='/repo')
 
 
+def test_portdbapi_is_created_on_first_use(mocker: MockerFixture) -> None:
+    mock_portdbapi = mocker.patch('livecheck.utils.portage._portdbapi')
+    proxy = portage._LazyPortdbapi()  # noqa: SLF001
+    mock_portdbapi.assert_not_called()
+    assert proxy.findname2 is mock_portdbapi.return_value.findname2
+    mock_portdbapi.assert_called_once_with()
+
+
+def _md5(content: bytes) -> str:
+    return hashlib.md5(content, usedforsecurity=False).hexdigest()
+
+
+@pytest.fixture
+def md5_cache_tree(tmp_path: Path) -> Path:
+    repo_root = tmp_path / 'repo'
+    (repo_root / 'eclass').mkdir(parents=True)
+    (repo_root / 'eclass' / 'foo.eclass').write_bytes(b'foo')
+    (repo_root / 'cat' / 'pkg').mkdir(parents=True)
+    (repo_root / 'metadata' / 'md5-cache' / 'cat').mkdir(parents=True)
+    for version, ebuild_md5, eclass_md5 in (('1.0', None, _md5(b'foo')), ('2.0', '0' * 32, None),
+                                            ('3.0', None, '0' * 32), ('4.0', None, None)):
+        ebuild = f'EAPI=8 # {version}\n'.encode()
+        (repo_root / 'cat' / 'pkg' / f'pkg-{version}.ebuild').write_bytes(ebuild)
+        if version == '4.0':
+            continue
+        (repo_root / 'metadata' / 'md5-cache' / 'cat' / f'pkg-{version}').write_text(
+            f'EAPI=8\nHOMEPAGE=https://example.com/\n'
+            f'SRC_URI=https://example.com/pkg-{version}.tar.gz\n'
+            f'_eclasses_=foo\t{eclass_md5 or _md5(b"foo")}\n'
+            f'_md5_={ebuild_md5 or _md5(ebuild)}\n',
+            encoding='utf-8')
+    return repo_root
+
+
+async def test_load_metadata(mocker: MockerFixture, md5_cache_tree: Path) -> None:
+    mock_p = mocker.patch('livecheck.utils.portage.P')
+    mock_p.repositories.get_repo_for_location.side_effect = KeyError
+    mock_p.async_aux_get = mocker.AsyncMock(return_value=['from portage'])
+    await load_metadata(['cat/pkg-1.0', 'cat/pkg-2.0', 'cat/pkg-3.0', 'cat/pkg-4.0', 'invalid'],
+                        md5_cache_tree)
+    mytree = str(md5_cache_tree)
+    assert await get_aux('cat/pkg-1.0', ['HOMEPAGE', 'SRC_URI', 'LICENSE'], mytree=mytree) == [
+        'https://example.com/', 'https://example.com/pkg-1.0.tar.gz', ''
+    ]
+    assert await get_first_src_uri('cat/pkg-1.0',
+                                   md5_cache_tree) == 'https://example.com/pkg-1.0.tar.gz'
+    mock_p.async_aux_get.assert_not_called()
+    for match in ('cat/pkg-2.0', 'cat/pkg-3.0', 'cat/pkg-4.0'):
+        assert await get_aux(match, ['HOMEPAGE'], mytree=mytree) == ['from portage']
+    assert await get_aux('cat/pkg-1.0', ['repository'], mytree=mytree) == ['from portage']
+    assert await get_aux('cat/pkg-1.0', ['HOMEPAGE'], mytree='/other') == ['from portage']
+    assert mock_p.async_aux_get.await_count == 5
+
+
+async def test_load_metadata_eclass_from_master(mocker: MockerFixture, md5_cache_tree: Path,
+                                                tmp_path: Path) -> None:
+    master = tmp_path / 'master'
+    (master / 'eclass').mkdir(parents=True)
+    (master / 'eclass' / 'foo.eclass').write_bytes(b'foo')
+    (md5_cache_tree / 'eclass' / 'foo.eclass').unlink()
+    mock_p = mocker.patch('livecheck.utils.portage.P')
+    mock_p.repositories.get_repo_for_location.return_value.eclass_locations = (str(master),
+                                                                               str(md5_cache_tree))
+    mock_p.async_aux_get = mocker.AsyncMock(return_value=['from portage'])
+    await load_metadata(['cat/pkg-1.0'], md5_cache_tree)
+    assert await get_aux('cat/pkg-1.0', ['HOMEPAGE'],
+                         mytree=str(md5_cache_tree)) == ['https://example.com/']
+    mock_p.repositories.get_repo_for_location.assert_called_once_with(str(md5_cache_tree))
+
+
 async def test_get_fetch_map_calls_async_fetch_map(mocker: MockerFixture) -> None:
     mock_p = mocker.patch('livecheck.utils.portage.P')
     mock_p.async_fetch_map = mocker.AsyncMock(return_value={'src.tar.gz': ('uri',)})
     result = await get_fetch_map('cat/pkg-1.2.3')
     assert result == {'src.tar.gz': ('uri',)}
     mock_p.async_fetch_map.assert_awaited_once_with('cat/pkg-1.2.3')
+
+
+def test_get_thirdpartymirrors(mocker: MockerFixture, tmp_path: Path) -> None:
+    mock_portage = mocker.patch('livecheck.utils.portage.portage')
+    mock_portage.settings.thirdpartymirrors.return_value = {
+        'gnu': ['https://ftp.gnu.org/gnu'],
+        'pypi': ['https://files.pythonhosted.org/packages/source']
+    }
+    (tmp_path / 'profiles').mkdir()
+    (tmp_path / 'profiles' / 'thirdpartymirrors').write_text(
+        '# Comment\n'
+        'gnu https://ftpmirror.gnu.org/gnu https://mirrors.kernel.org/gnu # Trailing comment\n'
+        '\n'
+        'empty\n',
+        encoding='utf-8')
+    assert get_thirdpartymirrors(tmp_path) == {
+        'gnu': ('https://ftpmirror.gnu.org/gnu', 'https://mirrors.kernel.org/gnu'),
+        'pypi': ('https://files.pythonhosted.org/packages/source',)
+    }
+    assert get_thirdpartymirrors(tmp_path / 'missing') == {
+        'gnu': ('https://ftp.gnu.org/gnu',),
+        'pypi': ('https://files.pythonhosted.org/packages/source',)
+    }
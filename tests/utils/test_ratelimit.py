@@ -0,0 +1,259 @@
+# ruff: noqa: SLF001
+from __future__ import annotations
+
+from time import time
+from typing import TYPE_CHECKING
+from unittest.mock import AsyncMock
+import asyncio
+
+from livecheck.utils.ratelimit import AdaptiveLimiter, HostLimiter, RateLimitPacer
+import pytest
+
+if TYPE_CHECKING:
+    from pytest_mock import MockerFixture
+
+
+def test_delay_unknown_host() -> None:
+    assert RateLimitPacer().delay('api.github.com') == 0
+
+
+def test_delay_within_budget() -> None:
+    pacer = RateLimitPacer()
+    pacer.observe(
+        'api.github.com', {
+            'x-ratelimit-limit': '5000',
+            'x-ratelimit-remaining': '4000',
+            'x-ratelimit-reset': str(time() + 3600)
+        })
+    assert pacer.delay('api.github.com') == 0
+    assert pacer._budgets['api.github.com', ''].remaining == 3999
+
+
+def test_delay_spreads_remaining_budget() -> None:
+    pacer = RateLimitPacer()
+    pacer.observe(
+        'api.github.com', {
+            'x-ratelimit-limit': '100',
+            'x-ratelimit-remaining': '10',
+            'x-ratelimit-reset': str(time() + 100)
+        })
+    assert pacer.delay('api.github.com') == 0
+    second = pacer.delay('api.github.com')
+    third = pacer.delay('api.github.com')
+    assert 9 < second < 11
+    assert second < third
+
+
+def test_delay_exhausted_waits_for_reset() -> None:
+    pacer = RateLimitPacer()
+    pacer.observe('api.github.com', {
+        'x-ratelimit-remaining': '0',
+        'x-ratelimit-reset': str(time() + 30)
+    })
+    assert 29 < pacer.delay('api.github.com') <= 30
+
+
+def test_delay_reset_in_past_forgets_budget() -> None:
+    pacer = RateLimitPacer()
+    pacer.observe('api.github.com', {
+        'x-ratelimit-remaining': '0',
+        'x-ratelimit-reset': str(time() - 100)
+    })
+    assert pacer.delay('api.github.com') == 0
+    assert ('api.github.com', '') not in pacer._budgets
+
+
+def test_observe_gitlab_relative_reset() -> None:
+    pacer = RateLimitPacer()
+    pacer.observe('gitlab.com', {
+        'ratelimit-limit': '10',
+        'ratelimit-remaining': '0',
+        'ratelimit-reset': '60'
+    })
+    assert 59 < pacer.delay('gitlab.com') <= 60
+
+
+def test_observe_ignores_invalid_headers() -> None:
+    pacer = RateLimitPacer()
+    pacer.observe('api.github.com', {'x-ratelimit-remaining': '0', 'x-ratelimit-reset': 'invalid'})
+    assert not pacer._budgets
+
+
+def test_observe_ignores_missing_reset() -> None:
+    pacer = RateLimitPacer()
+    pacer.observe('api.github.com', {'x-ratelimit-remaining': '0'})
+    assert not pacer._budgets
+
+
+def test_observe_keeps_a_budget_per_resource() -> None:
+    pacer = RateLimitPacer()
+    pacer.observe(
+        'api.github.com', {
+            'x-ratelimit-remaining': '0',
+            'x-ratelimit-reset': str(time() + 30),
+            'x-ratelimit-resource': 'search'
+        }, '/search/repositories')
+    pacer.observe(
+        'api.github.com', {
+            'x-ratelimit-limit': '5000',
+            'x-ratelimit-remaining': '4000',
+            'x-ratelimit-reset': str(time() + 3600),
+            'x-ratelimit-resource': 'core'
+        }, '/repos/a/b/releases')
+    assert 29 < pacer.delay('api.github.com', '/search/code') <= 30
+    assert pacer.delay('api.github.com', '/repos/c/d/tags') == 0
+    assert pacer.delay('api.github.com', '/graphql') == 0
+    assert pacer._budgets['api.github.com', 'core'].remaining == 3999
+
+
+def test_is_low() -> None:
+    pacer = RateLimitPacer()
+    assert not pacer.is_low('api.github.com')
+    pacer.observe(
+        'api.github.com', {
+            'x-ratelimit-limit': '100',
+            'x-ratelimit-remaining': '50',
+            'x-ratelimit-reset': str(time() + 100)
+        })
+    assert not pacer.is_low('api.github.com')
+    pacer._budgets['api.github.com', ''].remaining = 10
+    assert pacer.is_low('api.github.com')
+    pacer._budgets['api.github.com', ''].reset_at = time() - 1
+    assert not pacer.is_low('api.github.com')
+
+
+@pytest.mark.asyncio
+async def test_wait_sleeps_only_when_needed(mocker: MockerFixture) -> None:
+    mock_sleep = mocker.patch('livecheck.utils.ratelimit.asyncio.sleep', new_callable=AsyncMock)
+    pacer = RateLimitPacer()
+    await pacer.wait('api.github.com')
+    mock_sleep.assert_not_called()
+    pacer.observe('api.github.com', {
+        'x-ratelimit-remaining': '0',
+        'x-ratelimit-reset': str(time() + 5)
+    })
+    await pacer.wait('api.github.com')
+    mock_sleep.assert_called_once()
+
+
+def test_host_limiter_matches_subdomains() -> None:
+    limiter = HostLimiter({'SourceForge.net': 1, 'downloads.sourceforge.net': 2})
+    assert limiter.get(
+        'downloads.sourceforge.net') is limiter._semaphores['downloads.sourceforge.net']
+    assert limiter.get('master.dl.sourceforge.net') is limiter._semaphores['sourceforge.net']
+    assert limiter.get('sourceforge.net') is limiter._semaphores['sourceforge.net']
+    assert limiter.get('pypi.org') is None
+    assert limiter.get('notsourceforge.net') is None
+
+
+@pytest.mark.asyncio
+async def test_host_limiter_slot_holds_semaphore() -> None:
+    limiter = HostLimiter({'sourceforge.net': 1})
+    async with limiter.slot('sourceforge.net'):
+        assert limiter._semaphores['sourceforge.net'].locked()
+    assert not limiter._semaphores['sourceforge.net'].locked()
+    async with limiter.slot('pypi.org'):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_adaptive_limiter_slot_waits_at_limit() -> None:
+    limiter = AdaptiveLimiter(start=1)
+    order = []
+
+    async def request(name: str) -> None:
+        async with limiter.slot('pypi.org'):
+            order.append(f'{name} start')
+            await asyncio.sleep(0)
+            order.append(f'{name} end')
+
+    await asyncio.gather(request('a'), request('b'))
+    assert order == ['a start', 'a end', 'b start', 'b end']
+    assert limiter._windows['pypi.org'].in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_adaptive_limiter_cancelled_waiter_passes_slot_on() -> None:
+    limiter = AdaptiveLimiter(start=1)
+    release = asyncio.Event()
+    entered = []
+
+    async def request(name: str) -> None:
+        async with limiter.slot('pypi.org'):
+            entered.append(name)
+            await release.wait()
+
+    first = asyncio.create_task(request('first'))
+    waiting = asyncio.create_task(request('waiting'))
+    other = asyncio.create_task(request('other'))
+    await asyncio.sleep(0)
+    waiting.cancel()
+    release.set()
+    await asyncio.wait_for(asyncio.gather(first, other), 1)
+    assert waiting.cancelled()
+    assert entered == ['first', 'other']
+    assert limiter._windows['pypi.org'].in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_adaptive_limiter_increases_when_window_is_full(mocker: MockerFixture) -> None:
+    limiter = AdaptiveLimiter(start=1)
+    mocker.patch('livecheck.utils.ratelimit.monotonic', return_value=1.0)
+    async with limiter.slot('pypi.org'):
+        limiter.observe('pypi.org', 0.0, throttled=False)
+    assert limiter.limits == {'pypi.org': 2.0}
+
+
+@pytest.mark.asyncio
+async def test_adaptive_limiter_does_not_increase_unused_window(mocker: MockerFixture) -> None:
+    limiter = AdaptiveLimiter(start=2)
+    mocker.patch('livecheck.utils.ratelimit.monotonic', return_value=1.0)
+    async with limiter.slot('pypi.org'):
+        limiter.observe('pypi.org', 0.0, throttled=False)
+    assert limiter.limits == {'pypi.org': 2.0}
+
+
+@pytest.mark.asyncio
+async def test_adaptive_limiter_holds(mocker: MockerFixture) -> None:
+    limiter = AdaptiveLimiter(start=1)
+    mocker.patch('livecheck.utils.ratelimit.monotonic', side_effect=[1.0, 11.0])
+    async with limiter.slot('pypi.org'):
+        limiter.observe('pypi.org', 0.0, throttled=False, hold=True)
+    assert limiter.limits == {'pypi.org': 1.0}
+    async with limiter.slot('pypi.org'):
+        limiter.observe('pypi.org', 1.0, throttled=False)
+    assert limiter._windows['pypi.org'].latency == pytest.approx(2.8)
+    assert limiter.limits == {'pypi.org': 1.0}
+
+
+@pytest.mark.asyncio
+async def test_adaptive_limiter_decreases_once_per_round_trip(mocker: MockerFixture) -> None:
+    limiter = AdaptiveLimiter({'api.github.com': 16})
+    mocker.patch('livecheck.utils.ratelimit.monotonic', side_effect=[1.0, 2.0, 4.0])
+    async with limiter.slot('api.github.com'), limiter.slot('api.github.com'):
+        limiter.observe('api.github.com', 0.0, throttled=True)
+        limiter.observe('api.github.com', 0.5, throttled=True)
+    assert limiter.limits == {'api.github.com': 8.0}
+    async with limiter.slot('api.github.com'):
+        limiter.observe('api.github.com', 3.0, throttled=True)
+    assert limiter.limits == {'api.github.com': 4.0}
+
+
+@pytest.mark.asyncio
+async def test_adaptive_limiter_new_host_is_unlimited_until_throttled(
+        mocker: MockerFixture) -> None:
+    limiter = AdaptiveLimiter()
+    mocker.patch('livecheck.utils.ratelimit.monotonic', return_value=1.0)
+    async with (limiter.slot('pypi.org'), limiter.slot('pypi.org'), limiter.slot('pypi.org'),
+                limiter.slot('pypi.org')):
+        limiter.observe('pypi.org', 0.0, throttled=False)
+        assert limiter.limits == {}
+        limiter.observe('pypi.org', 0.0, throttled=True)
+    assert limiter.limits == {'pypi.org': 2.0}
+
+
+def test_adaptive_limiter_bounds() -> None:
+    limiter = AdaptiveLimiter({'a.example.com': 0.2, 'b.example.com': 1000}, ceiling=32)
+    assert limiter.limits == {'a.example.com': 1.0, 'b.example.com': 32.0}
+    limiter.observe('a.example.com', 0.0, throttled=True)
+    assert limiter.limits == {'a.example.com': 1.0, 'b.example.com': 32.0}
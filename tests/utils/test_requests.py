@@ -1,21 +1,55 @@
+# ruff: noqa: SLF001
 from __future__ import annotations
 
 from http import HTTPStatus
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, cast
+from urllib.parse import urlparse
+import asyncio
 import hashlib
 import re
-
-from livecheck.utils.requests import get_content, get_last_modified, hash_url, session_init
+import sqlite3
+
+from defusedxml import ElementTree
+from livecheck.utils import requests as requests_module
+from livecheck.utils.archive import ArchiveRecorder, ArchiveReplayer
+from livecheck.utils.circuit import CircuitOpenError
+from livecheck.utils.http_cache import HttpCache
+from livecheck.utils.requests import (
+    adaptive_limits,
+    get_content,
+    get_last_modified,
+    hash_url,
+    init_sessions,
+    offline_misses,
+    post_json,
+    preferred_mirrors,
+    response_json,
+    response_xml,
+    session_init,
+    stores_responses,
+    tripped_hosts,
+)
+from livecheck.utils.session import sent_event
+from livecheck.utils.store import open_store
 import niquests
 import pytest
 
 if TYPE_CHECKING:
-    from collections.abc import AsyncGenerator
+    from collections.abc import AsyncGenerator, Collection, Mapping
+    from pathlib import Path
 
     from pytest_mock import MockerFixture
     from tests.conftest import NiquestsMocker
 
 
+def _response(status_code: int, content: bytes = b'data') -> niquests.Response:
+    response = niquests.Response()
+    response.status_code = status_code
+    response.url = 'https://example.com/'
+    response._content = content
+    return response
+
+
 @pytest.mark.asyncio
 async def test_get_content_success_github(requests_mock: NiquestsMocker,
                                           mocker: MockerFixture) -> None:
@@ -77,6 +111,186 @@ async def test_get_content_mirror_scheme(requests_mock: NiquestsMocker) -> None:
     assert r.status_code == HTTPStatus.NOT_IMPLEMENTED
 
 
+GNU_MIRRORS = {
+    'gnu': ('http://slow.example/gnu', 'https://fast.example/gnu/', 'https://bad.example/gnu')
+}
+
+
+def _mirror_send(
+    mocker: MockerFixture,
+    delays: Mapping[str, float],
+    failing: Collection[str] = (),
+    missing: Collection[str] = ()
+) -> tuple[list[str], dict[str, Any]]:
+    requested: list[str] = []
+    responses: dict[str, Any] = {}
+
+    async def send(request: Any, **kwargs: Any) -> Any:
+        host = urlparse(request.url).hostname
+        requested.append(request.url)
+        await asyncio.sleep(delays.get(host, 0))
+        if host in failing:
+            responses[host] = _response(HTTPStatus.INTERNAL_SERVER_ERROR)
+        elif host in missing:
+            responses[host] = _response(HTTPStatus.NOT_FOUND)
+        else:
+            responses[host] = _response(HTTPStatus.OK)
+        return responses[host]
+
+    mocker.patch.object(session_init(''), 'send', side_effect=send)
+    return requested, responses
+
+
+@pytest.mark.asyncio
+async def test_get_content_mirror_probes_mirrors(mocker: MockerFixture) -> None:
+    init_sessions(asyncio.Semaphore(1), mirrors=GNU_MIRRORS)
+    delays = {'slow.example': 10, 'fast.example': 0.01}
+    requested, responses = _mirror_send(mocker, delays, failing={'bad.example'})
+    r = await get_content('mirror://gnu/hello/hello-2.12.tar.gz')
+    assert r is responses['fast.example']
+    assert requested == [
+        'https://fast.example/gnu/hello/hello-2.12.tar.gz',
+        'https://bad.example/gnu/hello/hello-2.12.tar.gz',
+        'http://slow.example/gnu/hello/hello-2.12.tar.gz'
+    ]
+    assert preferred_mirrors() == {'gnu': 'https://fast.example/gnu/'}
+
+
+@pytest.mark.asyncio
+async def test_get_content_mirror_uses_preferred_mirror(mocker: MockerFixture) -> None:
+    init_sessions(asyncio.Semaphore(1),
+                  mirrors=GNU_MIRRORS,
+                  preferred_mirrors={'gnu': 'http://slow.example/gnu'})
+    requested, responses = _mirror_send(mocker, {})
+    r = await get_content('mirror://gnu/hello/')
+    assert r is responses['slow.example']
+    assert requested == ['http://slow.example/gnu/hello/']
+
+
+@pytest.mark.asyncio
+async def test_get_content_mirror_replaces_failed_mirror(mocker: MockerFixture) -> None:
+    init_sessions(asyncio.Semaphore(1),
+                  mirrors=GNU_MIRRORS,
+                  preferred_mirrors={'gnu': 'https://bad.example/gnu'})
+    requested, responses = _mirror_send(mocker, {}, failing={'bad.example'})
+    r = await get_content('mirror://gnu/hello/')
+    assert r is responses['slow.example']
+    assert requested == ['https://bad.example/gnu/hello/', 'http://slow.example/gnu/hello/']
+    assert preferred_mirrors() == {'gnu': 'http://slow.example/gnu'}
+
+
+@pytest.mark.asyncio
+async def test_get_content_mirror_hedges_with_next_mirror(mocker: MockerFixture) -> None:
+    init_sessions(asyncio.Semaphore(1),
+                  mirrors=GNU_MIRRORS,
+                  preferred_mirrors={'gnu': 'http://slow.example/gnu'})
+    _hedge_after(mocker, 0.01)
+    requested, responses = _mirror_send(mocker, {'slow.example': 10})
+    r = await get_content('mirror://gnu/hello/')
+    assert r is responses['fast.example']
+    assert requested == ['http://slow.example/gnu/hello/', 'https://fast.example/gnu/hello/']
+    assert preferred_mirrors() == {'gnu': 'https://fast.example/gnu/'}
+
+
+@pytest.mark.asyncio
+async def test_get_content_mirror_all_fail(mocker: MockerFixture) -> None:
+    init_sessions(asyncio.Semaphore(1), mirrors={'gnu': ('https://bad.example/gnu',)})
+    _, responses = _mirror_send(mocker, {}, failing={'bad.example'})
+    assert await get_content('mirror://gnu/hello/') is responses['bad.example']
+    assert not preferred_mirrors()
+
+
+@pytest.mark.asyncio
+async def test_get_content_mirror_missing_file_is_final(mocker: MockerFixture) -> None:
+    init_sessions(asyncio.Semaphore(1),
+                  mirrors=GNU_MIRRORS,
+                  preferred_mirrors={'gnu': 'https://fast.example/gnu/'})
+    requested, responses = _mirror_send(mocker, {}, missing={'fast.example'})
+    assert await get_content('mirror://gnu/hello/') is responses['fast.example']
+    assert requested == ['https://fast.example/gnu/hello/']
+
+
+@pytest.mark.asyncio
+async def test_get_content_mirror_cancels_slower_probes(mocker: MockerFixture) -> None:
+    init_sessions(asyncio.Semaphore(3), mirrors=GNU_MIRRORS)
+    cancelled: list[str] = []
+
+    async def send(request: Any, **kwargs: Any) -> Any:
+        host = urlparse(request.url).hostname or ''
+        if host == 'fast.example':
+            await asyncio.sleep(0.01)
+            return _response(HTTPStatus.OK)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(host)
+            raise
+        return _response(HTTPStatus.OK)
+
+    mocker.patch.object(session_init(''), 'send', side_effect=send)
+    await get_content('mirror://gnu/hello/')
+    await asyncio.sleep(0.01)
+    assert sorted(cancelled) == ['bad.example', 'slow.example']
+    assert not requests_module._in_flight
+    assert not requests_module._waiters
+
+
+@pytest.mark.asyncio
+async def test_hash_url_mirror(mocker: MockerFixture) -> None:
+    async def _iter_content(chunk_size: int = 8192) -> AsyncGenerator[bytes]:  # noqa: RUF029
+        yield b'abc'
+
+    init_sessions(asyncio.Semaphore(1),
+                  mirrors=GNU_MIRRORS,
+                  preferred_mirrors={'gnu': 'https://bad.example/gnu'})
+    requested, _ = _mirror_send(mocker, {}, failing={'bad.example'})
+    hashed = mocker.MagicMock()
+    hashed.iter_content = mocker.AsyncMock(return_value=_iter_content())
+    mock_get = mocker.patch.object(session_init(''), 'get', return_value=hashed)
+    assert await hash_url('mirror://gnu/hello/hello-2.12.tar.gz') == (
+        hashlib.blake2b(b'abc').hexdigest(), hashlib.sha512(b'abc').hexdigest(), 3)
+    assert requested == [
+        'https://bad.example/gnu/hello/hello-2.12.tar.gz',
+        'http://slow.example/gnu/hello/hello-2.12.tar.gz'
+    ]
+    assert mock_get.call_args.args == ('http://slow.example/gnu/hello/hello-2.12.tar.gz',)
+
+
+@pytest.mark.asyncio
+async def test_get_last_modified_mirror(mocker: MockerFixture) -> None:
+    init_sessions(asyncio.Semaphore(1),
+                  mirrors=GNU_MIRRORS,
+                  preferred_mirrors={'gnu': 'http://slow.example/gnu'})
+    _mirror_send(mocker, {})
+    head = _response(HTTPStatus.OK, b'')
+    head.headers['Last-Modified'] = 'Wed, 21 Oct 2015 07:28:00 GMT'
+    mock_head = mocker.patch.object(session_init(''), 'head', return_value=head)
+    assert await get_last_modified('mirror://gnu/hello/hello-2.12.tar.gz') == '20151021'
+    assert mock_head.call_args.args == ('http://slow.example/gnu/hello/hello-2.12.tar.gz',)
+
+
+@pytest.mark.asyncio
+async def test_hash_url_and_get_last_modified_mirror_missing(mocker: MockerFixture) -> None:
+    init_sessions(asyncio.Semaphore(1),
+                  mirrors=GNU_MIRRORS,
+                  preferred_mirrors={'gnu': 'https://fast.example/gnu/'})
+    _mirror_send(mocker, {}, missing={'fast.example'})
+    mock_get = mocker.patch.object(session_init(''), 'get')
+    mock_head = mocker.patch.object(session_init(''), 'head')
+    assert await hash_url('mirror://gnu/hello/hello-2.12.tar.gz') == ('', '', 0)
+    assert not await get_last_modified('mirror://gnu/hello/hello-2.12.tar.gz')
+    assert await hash_url('mirror://unknown/file.tar.gz') == ('', '', 0)
+    mock_get.assert_not_called()
+    mock_head.assert_not_called()
+
+
+def test_init_sessions_resets_preferred_mirrors() -> None:
+    init_sessions(asyncio.Semaphore(1), preferred_mirrors={'gnu': 'https://a.example/gnu'})
+    assert preferred_mirrors() == {'gnu': 'https://a.example/gnu'}
+    init_sessions(asyncio.Semaphore(1))
+    assert not preferred_mirrors()
+
+
 @pytest.mark.asyncio
 async def test_get_content_non_ok_status(requests_mock: NiquestsMocker) -> None:
     url = 'https://example.com'
@@ -101,6 +315,32 @@ def test_session_init_github_sets_headers_and_token(mocker: MockerFixture) -> No
     assert session.headers['timeout'] == '30'
 
 
+def test_session_init_shares_host_limits() -> None:
+    init_sessions(asyncio.Semaphore(1), {'sourceforge.net': 1})
+    github = cast('Any', session_init('github'))
+    json_session = cast('Any', session_init('json'))
+    assert github._limiter is json_session._limiter
+    assert github._pacer is json_session._pacer
+    assert github._limiter.get('downloads.sourceforge.net') is not None
+
+
+def test_session_init_shares_adaptive_limits() -> None:
+    init_sessions(asyncio.Semaphore(1), adaptive_limits={'api.github.com': 12.0})
+    github = cast('Any', session_init('github'))
+    json_session = cast('Any', session_init('json'))
+    assert github._adaptive is json_session._adaptive
+    assert adaptive_limits() == {'api.github.com': 12.0}
+    init_sessions(asyncio.Semaphore(1))
+    assert not adaptive_limits()
+
+
+def test_session_init_multiplexed() -> None:
+    assert not session_init('json').multiplexed
+    init_sessions(asyncio.Semaphore(1), multiplexed=True)
+    assert session_init('json').multiplexed
+    assert session_init('github').multiplexed
+
+
 def test_session_init_github_no_token(mocker: MockerFixture) -> None:
     mocker.patch('livecheck.utils.requests.get_api_credentials', return_value=None)
     session = session_init('github')
@@ -254,6 +494,26 @@ async def test_get_content_with_custom_headers(requests_mock: NiquestsMocker) ->
     requests_mock.get(url, text='data', status_code=HTTPStatus.OK)
     r = await get_content(url, headers={'Referer': 'https://example.com/ref'})
     assert r.status_code == HTTPStatus.OK
+    assert r.request is not None
+    assert r.request.headers is not None
+    assert r.request.headers['Referer'] == 'https://example.com/ref'
+    assert 'Referer' not in session_init('').headers
+
+
+@pytest.mark.asyncio
+async def test_get_content_repology_user_agent_is_per_request(
+        requests_mock: NiquestsMocker) -> None:
+    url = 'https://repology.org/api/v1/project/foo'
+    requests_mock.get(url, json={}, status_code=HTTPStatus.OK)
+    r = await get_content(url)
+    assert r.request is not None
+    assert r.request.headers is not None
+    assert r.request.headers['User-Agent'] == 'DistroWatch'
+    assert session_init('json').headers['User-Agent'] != 'DistroWatch'
+    r = await get_content(url, headers={'User-Agent': 'custom'})
+    assert r.request is not None
+    assert r.request.headers is not None
+    assert r.request.headers['User-Agent'] == 'custom'
 
 
 @pytest.mark.asyncio
@@ -308,6 +568,336 @@ async def test_get_content_request_exception(mocker: MockerFixture) -> None:
     assert r.status_code == HTTPStatus.SERVICE_UNAVAILABLE
 
 
+@pytest.mark.asyncio
+async def test_get_content_circuit_open(mocker: MockerFixture) -> None:
+    mocker.patch.object(session_init(''), 'send', side_effect=CircuitOpenError('example.com'))
+    mock_log = mocker.patch('livecheck.utils.requests.log')
+    r = await get_content('https://example.com/fail')
+    assert r.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    mock_log.exception.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_hash_url_circuit_open(mocker: MockerFixture) -> None:
+    mocker.patch.object(session_init(''), 'get', side_effect=CircuitOpenError('example.com'))
+    mock_log = mocker.patch('livecheck.utils.requests.log')
+    assert await hash_url('https://example.com/file.txt') == ('', '', 0)
+    mock_log.exception.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_last_modified_circuit_open(mocker: MockerFixture) -> None:
+    mocker.patch.object(session_init(''), 'head', side_effect=CircuitOpenError('example.com'))
+    mock_log = mocker.patch('livecheck.utils.requests.log')
+    assert not await get_last_modified('https://example.com/file.txt')
+    mock_log.exception.assert_not_called()
+
+
+def test_tripped_hosts() -> None:
+    assert not tripped_hosts()
+    for _ in range(5):
+        requests_module._breaker.record_failure('example.com')
+    assert tripped_hosts() == ['example.com']
+    init_sessions(asyncio.Semaphore(1))
+    assert not tripped_hosts()
+
+
+def _hedge_after(mocker: MockerFixture, delay: float) -> None:
+    mocker.patch.object(requests_module._latency, 'percentile', return_value=delay)
+    mocker.patch.object(requests_module, 'HEDGE_MIN_DELAY', 0.01)
+
+
+def _mark_sent() -> None:
+    # Done by the session once a request has taken its slots.
+    if (event := sent_event.get()) is not None:
+        event.set()
+
+
+@pytest.mark.asyncio
+async def test_get_content_hedges_slow_request(mocker: MockerFixture) -> None:
+    _hedge_after(mocker, 0.01)
+    slow = _response(HTTPStatus.OK, b'slow')
+    fast = _response(HTTPStatus.OK, b'fast')
+    cancelled: list[bool] = []
+
+    async def send(request: Any, **kwargs: Any) -> Any:
+        _mark_sent()
+        if not cancelled:
+            cancelled.append(False)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled[0] = True
+                raise
+            return slow  # pragma: no cover
+        return fast
+
+    mock_send = mocker.patch.object(session_init(''), 'send', side_effect=send)
+    r = await get_content('https://downloads.sourceforge.net/project/x/rss')
+    assert r is fast
+    assert mock_send.call_count == 2
+    await asyncio.sleep(0)
+    assert cancelled == [True]
+
+
+@pytest.mark.asyncio
+async def test_get_content_does_not_hedge_while_waiting_for_slot(mocker: MockerFixture) -> None:
+    _hedge_after(mocker, 0.01)
+    response = _response(HTTPStatus.OK, b'data')
+
+    async def send(request: Any, **kwargs: Any) -> Any:
+        await asyncio.sleep(0.05)
+        _mark_sent()
+        return response
+
+    mock_send = mocker.patch.object(session_init(''), 'send', side_effect=send)
+    assert await get_content('https://downloads.sourceforge.net/project/x/rss') is response
+    assert mock_send.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_get_content_hedge_not_needed(mocker: MockerFixture) -> None:
+    _hedge_after(mocker, 1)
+    response = _response(HTTPStatus.OK, b'data')
+    mock_send = mocker.patch.object(session_init(''), 'send', return_value=response)
+    assert await get_content('https://downloads.sourceforge.net/project/x/rss') is response
+    assert mock_send.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_get_content_hedge_failure_waits_for_primary(mocker: MockerFixture) -> None:
+    _hedge_after(mocker, 0.01)
+    response = _response(HTTPStatus.OK, b'data')
+    calls = []
+
+    async def send(request: Any, **kwargs: Any) -> Any:
+        _mark_sent()
+        calls.append(request)
+        if len(calls) == 1:
+            await asyncio.sleep(0.05)
+            return response
+        raise niquests.ConnectionError
+
+    mocker.patch.object(session_init(''), 'send', side_effect=send)
+    assert await get_content('https://downloads.sourceforge.net/project/x/rss') is response
+    assert len(calls) == 2
+    assert calls[0] is not calls[1]
+
+
+@pytest.mark.asyncio
+async def test_get_content_hedged_requests_both_fail(mocker: MockerFixture) -> None:
+    _hedge_after(mocker, 0.01)
+
+    async def send(request: Any, **kwargs: Any) -> Any:
+        _mark_sent()
+        await asyncio.sleep(0.02)
+        raise niquests.ConnectionError
+
+    mocker.patch.object(session_init(''), 'send', side_effect=send)
+    r = await get_content('https://downloads.sourceforge.net/project/x/rss')
+    assert r.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+
+
+@pytest.mark.asyncio
+async def test_get_content_does_not_hedge_post(mocker: MockerFixture) -> None:
+    _hedge_after(mocker, 0.01)
+
+    async def send(request: Any, **kwargs: Any) -> Any:
+        await asyncio.sleep(0.05)
+        return _response(HTTPStatus.OK, b'data')
+
+    mock_send = mocker.patch.object(session_init(''), 'send', side_effect=send)
+    await get_content('https://example.com/form', method='POST', data={'a': 'b'})
+    assert mock_send.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_get_content_skips_known_missing(mocker: MockerFixture) -> None:
+    store = open_store()
+    mock_send = mocker.patch.object(session_init(''),
+                                    'send',
+                                    return_value=_response(HTTPStatus.NOT_FOUND))
+    r = await get_content('https://example.com/gone', params={'q': 'pkg'})
+    assert r.status_code == HTTPStatus.NOT_FOUND
+    assert store.get_missing('https://example.com/gone?q=pkg', 60) == HTTPStatus.NOT_FOUND
+    r = await get_content('https://example.com/gone', params={'q': 'pkg'})
+    assert r.status_code == HTTPStatus.NOT_FOUND
+    assert mock_send.call_count == 1
+    await get_content('https://example.com/gone', params={'q': 'other'})
+    assert mock_send.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_get_content_known_missing_expires(mocker: MockerFixture) -> None:
+    store = open_store()
+    store.put_missing('https://example.com/gone', HTTPStatus.GONE)
+    mocker.patch.object(requests_module, 'MISSING_URL_TTL', 0)
+    mock_send = mocker.patch.object(session_init(''), 'send', return_value=_response(HTTPStatus.OK))
+    r = await get_content('https://example.com/gone')
+    assert r.status_code == HTTPStatus.OK
+    assert mock_send.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_get_content_missing_not_recorded(mocker: MockerFixture) -> None:
+    store = open_store()
+    mock_send = mocker.patch.object(session_init(''),
+                                    'send',
+                                    return_value=_response(HTTPStatus.NOT_FOUND))
+    await get_content('https://example.com/form', method='POST', data={'a': 'b'})
+    mock_send.return_value.status_code = HTTPStatus.INTERNAL_SERVER_ERROR
+    await get_content('https://example.com/error')
+    assert store.get_missing('https://example.com/form', 60) is None
+    assert store.get_missing('https://example.com/error', 60) is None
+
+
+@pytest.mark.asyncio
+async def test_get_content_missing_not_recorded_for_mirrors_or_tokens(
+        mocker: MockerFixture) -> None:
+    store = open_store()
+    mocker.patch('livecheck.utils.requests.get_api_credentials', return_value='gh-token')
+    init_sessions(asyncio.Semaphore(1),
+                  mirrors=GNU_MIRRORS,
+                  preferred_mirrors={'gnu': 'https://fast.example/gnu/'})
+    requested, _ = _mirror_send(mocker, {}, missing={'fast.example', 'example.com'})
+    mocker.patch.object(session_init('github'),
+                        'send',
+                        return_value=_response(HTTPStatus.NOT_FOUND))
+    await get_content('mirror://gnu/hello/')
+    await get_content('https://api.github.com/repos/owner/private')
+    await get_content('https://example.com/private', headers={'Authorization': 'Bearer x'})
+    assert store.get_missing('https://fast.example/gnu/hello/', 60) is None
+    assert store.get_missing('https://api.github.com/repos/owner/private', 60) is None
+    assert store.get_missing('https://example.com/private', 60) is None
+    await get_content('https://example.com/public')
+    assert store.get_missing('https://example.com/public', 60) == HTTPStatus.NOT_FOUND
+    assert 'https://example.com/private' in requested
+
+
+@pytest.mark.asyncio
+async def test_get_content_coalesces_concurrent_requests(mocker: MockerFixture) -> None:
+    response = _response(HTTPStatus.OK, b'data')
+
+    async def send(*args: Any, **kwargs: Any) -> Any:
+        await asyncio.sleep(0)
+        return response
+
+    mock_send = mocker.patch.object(session_init(''), 'send', side_effect=send)
+    results = await asyncio.gather(get_content('https://example.com/a'),
+                                   get_content('https://example.com/a'),
+                                   get_content('https://example.com/a', headers={'X-A': '1'}),
+                                   get_content('https://example.com/b'))
+    assert all(r is response for r in results)
+    assert mock_send.call_count == 3
+    assert not requests_module._in_flight
+
+
+@pytest.mark.asyncio
+async def test_get_content_reuses_earlier_response(mocker: MockerFixture) -> None:
+    response = _response(HTTPStatus.OK, b'data')
+    mock_send = mocker.patch.object(session_init('json'), 'send', return_value=response)
+    assert await get_content('https://example.com/a.json') is response
+    assert await get_content('https://example.com/a.json') is response
+    assert mock_send.call_count == 1
+    init_sessions(asyncio.Semaphore(1))
+    mock_send = mocker.patch.object(session_init('json'), 'send', return_value=response)
+    await get_content('https://example.com/a.json')
+    assert mock_send.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_get_content_does_not_reuse_failed_or_large_responses(mocker: MockerFixture) -> None:
+    failed = _response(HTTPStatus.NOT_FOUND, b'')
+    large = _response(HTTPStatus.OK, b'x' * (requests_module.RESPONSE_CACHE_MAX_BODY_SIZE + 1))
+    mock_send = mocker.patch.object(session_init(''),
+                                    'send',
+                                    side_effect=[failed, failed, large, large])
+    for _ in range(4):
+        await get_content('https://example.com/a')
+    assert mock_send.call_count == 4
+
+
+@pytest.mark.asyncio
+async def test_get_content_evicts_least_recently_used_response(mocker: MockerFixture) -> None:
+    mocker.patch.object(requests_module, 'RESPONSE_CACHE_SIZE', 2)
+    response = _response(HTTPStatus.OK, b'data')
+    mock_send = mocker.patch.object(session_init(''), 'send', return_value=response)
+    await get_content('https://example.com/a')
+    await get_content('https://example.com/b')
+    await get_content('https://example.com/a')
+    await get_content('https://example.com/c')
+    assert mock_send.call_count == 3
+    await get_content('https://example.com/a')
+    assert mock_send.call_count == 3
+    await get_content('https://example.com/b')
+    assert mock_send.call_count == 4
+
+
+@pytest.mark.asyncio
+async def test_get_content_does_not_coalesce_requests_with_data(mocker: MockerFixture) -> None:
+    response = _response(HTTPStatus.OK, b'data')
+
+    async def send(*args: Any, **kwargs: Any) -> Any:
+        await asyncio.sleep(0)
+        return response
+
+    mock_send = mocker.patch.object(session_init(''), 'send', side_effect=send)
+    await asyncio.gather(get_content('https://example.com/a', method='POST'),
+                         get_content('https://example.com/a', method='POST'),
+                         get_content('https://example.com/a', data={'a': 'b'}),
+                         get_content('https://example.com/a', data={'a': 'b'}))
+    assert mock_send.call_count == 4
+
+
+@pytest.mark.asyncio
+async def test_get_content_coalesced_request_survives_cancelled_caller(
+        mocker: MockerFixture) -> None:
+    response = _response(HTTPStatus.OK, b'data')
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def send(*args: Any, **kwargs: Any) -> Any:
+        started.set()
+        await release.wait()
+        return response
+
+    mocker.patch.object(session_init(''), 'send', side_effect=send)
+    first = asyncio.create_task(get_content('https://example.com/a'))
+    await started.wait()
+    second = asyncio.create_task(get_content('https://example.com/a'))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+    assert await second is response
+
+
+def test_response_json_decodes_once(mocker: MockerFixture) -> None:
+    r = niquests.Response()
+    mock_json = mocker.patch.object(r, 'json', return_value={'a': 1})
+    assert response_json(r) == {'a': 1}
+    assert response_json(r) is response_json(r)
+    mock_json.assert_called_once()
+
+
+def test_response_json_error_is_not_remembered(mocker: MockerFixture) -> None:
+    r = niquests.Response()
+    mocker.patch.object(r, 'json', side_effect=[ValueError('bad'), {'a': 1}])
+    with pytest.raises(ValueError, match='bad'):
+        response_json(r)
+    assert response_json(r) == {'a': 1}
+
+
+def test_response_xml_parses_once(mocker: MockerFixture) -> None:
+    r = niquests.Response()
+    r._content = b'<feed><entry>1</entry></feed>'
+    mock_fromstring = mocker.patch('defusedxml.ElementTree.fromstring',
+                                   wraps=ElementTree.fromstring)
+    root = response_xml(r)
+    assert root.tag == 'feed'
+    assert response_xml(r) is root
+    mock_fromstring.assert_called_once()
+
+
 @pytest.mark.asyncio
 async def test_hash_url_skips_empty_chunks(mocker: MockerFixture) -> None:
     url = 'https://example.com/file.txt'
@@ -334,3 +924,236 @@ async def test_get_content_atom_url(requests_mock: NiquestsMocker) -> None:
     requests_mock.get(url, text='<feed></feed>', status_code=HTTPStatus.OK)
     r = await get_content(url)
     assert r.status_code == HTTPStatus.OK
+
+
+@pytest.mark.asyncio
+async def test_post_json_success(requests_mock: NiquestsMocker, mocker: MockerFixture) -> None:
+    mocker.patch('livecheck.utils.requests.get_api_credentials', return_value='gh-token')
+    url = 'https://api.github.com/graphql'
+    requests_mock.post(url, json={'data': {'r0': None}}, status_code=HTTPStatus.OK)
+    assert await post_json(url, {'query': 'query { }'}) == {'data': {'r0': None}}
+
+
+@pytest.mark.asyncio
+async def test_post_json_error_status(requests_mock: NiquestsMocker) -> None:
+    url = 'https://example.com/api'
+    requests_mock.post(url, json={}, status_code=HTTPStatus.BAD_REQUEST)
+    assert await post_json(url, {}) is None
+
+
+@pytest.mark.asyncio
+async def test_post_json_invalid_json(requests_mock: NiquestsMocker) -> None:
+    url = 'https://example.com/api'
+    requests_mock.post(url, text='not json', status_code=HTTPStatus.OK)
+    assert await post_json(url, {}) is None
+
+
+@pytest.mark.asyncio
+async def test_get_content_offline(mocker: MockerFixture) -> None:
+    init_sessions(asyncio.Semaphore(1), prepare_offline=True)
+    mocker.patch.object(session_init(''), 'send', return_value=_response(HTTPStatus.OK, b'data'))
+    await get_content('https://example.com/a', params={'v': '1'})
+    await get_content('https://example.com/b', method='POST', data={'a': 'b'})
+    init_sessions(asyncio.Semaphore(1), offline=True)
+    mock_send = mocker.patch.object(session_init(''), 'send')
+    r = await get_content('https://example.com/a', params={'v': '1'})
+    assert r.status_code == HTTPStatus.OK
+    assert r.content == b'data'
+    assert (await get_content('https://example.com/a',
+                              headers={'Accept': 'text/html'},
+                              params={'v': '1'})).status_code == HTTPStatus.GATEWAY_TIMEOUT
+    assert (await get_content('https://example.com/b', method='POST',
+                              data={'a': 'b'})).status_code == HTTPStatus.GATEWAY_TIMEOUT
+    mock_send.assert_not_called()
+    assert offline_misses() == ['GET https://example.com/a?v=1', 'POST https://example.com/b']
+    init_sessions(asyncio.Semaphore(1))
+    assert offline_misses() == []
+
+
+@pytest.mark.asyncio
+async def test_get_content_counts_http_cache_lookups(mocker: MockerFixture) -> None:
+    init_sessions(asyncio.Semaphore(1), prepare_offline=True)
+    session = session_init('')
+    mocker.patch.object(session, 'send', return_value=_response(HTTPStatus.OK, b'data'))
+    await get_content('https://example.com/a')
+    await get_content('https://example.com/b', method='POST', data={'a': 'b'})
+    cache = cast('HttpCache', cast('Any', session).cache)
+    init_sessions(asyncio.Semaphore(1), offline=True)
+    session = session_init('')
+    await get_content('https://example.com/a')
+    await get_content('https://example.com/c')
+    assert cache.stats()['example.com'].misses == 1
+    offline_cache = cast('HttpCache', cast('Any', session).cache)
+    stats = offline_cache.stats()['example.com']
+    assert (stats.hits, stats.misses) == (1, 2)
+
+
+@pytest.mark.asyncio
+async def test_hash_url_offline(mocker: MockerFixture) -> None:
+    async def _iter_content(chunk_size: int = 8192) -> AsyncGenerator[bytes]:  # noqa: RUF029
+        yield b'abc'
+
+    mock_response = mocker.MagicMock()
+    mock_response.iter_content = mocker.AsyncMock(return_value=_iter_content())
+    init_sessions(asyncio.Semaphore(1), prepare_offline=True)
+    mocker.patch.object(session_init(''), 'get', return_value=mock_response)
+    await hash_url('https://example.com/file.txt', params={'v': '1'})
+    init_sessions(asyncio.Semaphore(1), offline=True)
+    mock_get = mocker.patch.object(session_init(''), 'get')
+    assert await hash_url('https://example.com/file.txt', params={'v':
+        '1'}) == (hashlib.blake2b(b'abc').hexdigest(), hashlib.sha512(b'abc').hexdigest(), 3)
+    assert await hash_url('https://example.com/file.txt') == ('', '', 0)
+    mock_get.assert_not_called()
+    assert offline_misses() == ['HASH https://example.com/file.txt']
+
+
+@pytest.mark.asyncio
+async def test_get_last_modified_offline(mocker: MockerFixture) -> None:
+    response = _response(HTTPStatus.OK, b'')
+    response.headers['Last-Modified'] = 'Wed, 21 Oct 2015 07:28:00 GMT'
+    init_sessions(asyncio.Semaphore(1), prepare_offline=True)
+    mocker.patch.object(session_init(''), 'head', return_value=response)
+    await get_last_modified('https://example.com/file.txt')
+    init_sessions(asyncio.Semaphore(1), offline=True)
+    mock_head = mocker.patch.object(session_init(''), 'head')
+    assert await get_last_modified('https://example.com/file.txt') == '20151021'
+    assert not await get_last_modified('https://example.com/other.txt')
+    mock_head.assert_not_called()
+    assert offline_misses() == ['HEAD https://example.com/other.txt']
+
+
+@pytest.mark.asyncio
+async def test_get_content_stores_nothing_unless_preparing_offline(mocker: MockerFixture) -> None:
+    mocker.patch.object(session_init(''), 'send', return_value=_response(HTTPStatus.OK, b'data'))
+    mock_arecord = mocker.patch.object(HttpCache, 'arecord')
+    await get_content('https://example.com/a')
+    mock_arecord.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_content_survives_http_cache_errors(mocker: MockerFixture) -> None:
+    init_sessions(asyncio.Semaphore(1), prepare_offline=True)
+    response = _response(HTTPStatus.OK, b'data')
+    mocker.patch.object(session_init(''), 'send', return_value=response)
+    mocker.patch.object(HttpCache, 'arecord', side_effect=sqlite3.OperationalError('locked'))
+    mock_log = mocker.patch('livecheck.utils.requests.log')
+    assert await get_content('https://example.com/a') is response
+    mock_log.exception.assert_called_once_with('Could not store `%s` in the HTTP cache.',
+                                               'https://example.com/a')
+
+
+@pytest.mark.asyncio
+async def test_post_json_offline(mocker: MockerFixture) -> None:
+    init_sessions(asyncio.Semaphore(1), offline=True)
+    mock_post = mocker.patch.object(session_init('json'), 'post')
+    assert await post_json('https://example.com/graphql', {}) is None
+    mock_post.assert_not_called()
+    assert offline_misses() == ['POST https://example.com/graphql']
+
+
+@pytest.mark.asyncio
+async def test_record_and_replay(mocker: MockerFixture, tmp_path: Path) -> None:
+    async def _iter_content(chunk_size: int = 8192) -> AsyncGenerator[bytes]:  # noqa: RUF029
+        yield b'abc'
+
+    hashed = mocker.MagicMock()
+    hashed.iter_content = mocker.AsyncMock(return_value=_iter_content())
+    head = _response(HTTPStatus.OK, b'')
+    head.headers['Last-Modified'] = 'Wed, 21 Oct 2015 07:28:00 GMT'
+    recorder = ArchiveRecorder(tmp_path / 'archive.jsonl.gz')
+    init_sessions(asyncio.Semaphore(1), recorder=recorder)
+    session = session_init('')
+    mocker.patch.object(session,
+                        'send',
+                        side_effect=[
+                            _response(HTTPStatus.OK, b'data'),
+                            _response(HTTPStatus.CREATED, b'posted'),
+                            niquests.ConnectionError('fail')
+                        ])
+    mocker.patch.object(session, 'get', return_value=hashed)
+    mocker.patch.object(session, 'head', return_value=head)
+    await get_content('https://example.com/a', params={'v': '1'})
+    await get_content('https://example.com/a', method='POST', data={'a': 'b'})
+    await get_content('https://example.com/down')
+    await hash_url('https://example.com/file.txt')
+    await get_last_modified('https://example.com/file.txt')
+    recorder.close()
+    assert recorder.count == 5
+
+    init_sessions(asyncio.Semaphore(1),
+                  replayer=ArchiveReplayer(tmp_path / 'archive.jsonl.gz', latency=0.5))
+    session = session_init('')
+    mock_send = mocker.patch.object(session, 'send')
+    mock_get = mocker.patch.object(session, 'get')
+    mock_head = mocker.patch.object(session, 'head')
+    mock_sleep = mocker.patch('livecheck.utils.requests.asyncio.sleep')
+    r = await get_content('https://example.com/a', params={'v': '1'})
+    assert (r.status_code, r.content) == (HTTPStatus.OK, b'data')
+    r = await get_content('https://example.com/a', method='POST', data={'a': 'b'})
+    assert (r.status_code, r.content) == (HTTPStatus.CREATED, b'posted')
+    assert (await
+            get_content('https://example.com/down')).status_code == (HTTPStatus.SERVICE_UNAVAILABLE)
+    assert await hash_url('https://example.com/file.txt') == (hashlib.blake2b(b'abc').hexdigest(),
+                                                              hashlib.sha512(b'abc').hexdigest(), 3)
+    assert await get_last_modified('https://example.com/file.txt') == '20151021'
+    assert (await get_content('https://example.com/b')).status_code == HTTPStatus.GATEWAY_TIMEOUT
+    mock_send.assert_not_called()
+    mock_get.assert_not_called()
+    mock_head.assert_not_called()
+    assert mock_sleep.call_count == 5
+    mock_sleep.assert_called_with(0.5)
+    assert offline_misses() == ['GET https://example.com/b']
+
+
+def test_stores_responses(tmp_path: Path) -> None:
+    assert not stores_responses()
+    recorder = ArchiveRecorder(tmp_path / 'archive.jsonl.gz')
+    init_sessions(asyncio.Semaphore(1), recorder=recorder)
+    assert stores_responses()
+    recorder.close()
+    init_sessions(asyncio.Semaphore(1),
+                  replayer=ArchiveReplayer(tmp_path / 'archive.jsonl.gz', latency=0))
+    assert stores_responses()
+    init_sessions(asyncio.Semaphore(1), prepare_offline=True)
+    assert stores_responses()
+    init_sessions(asyncio.Semaphore(1), offline=True)
+    assert stores_responses()
+
+
+@pytest.mark.asyncio
+async def test_record_and_replay_ignore_known_missing(mocker: MockerFixture,
+                                                      tmp_path: Path) -> None:
+    store = open_store()
+    store.put_missing('https://example.com/a', HTTPStatus.NOT_FOUND)
+    recorder = ArchiveRecorder(tmp_path / 'archive.jsonl.gz')
+    init_sessions(asyncio.Semaphore(1), recorder=recorder)
+    mocker.patch.object(
+        session_init(''),
+        'send',
+        side_effect=[_response(HTTPStatus.OK, b'data'),
+                     _response(HTTPStatus.NOT_FOUND)])
+    assert (await get_content('https://example.com/a')).status_code == HTTPStatus.OK
+    assert (await get_content('https://example.com/b')).status_code == HTTPStatus.NOT_FOUND
+    recorder.close()
+    assert recorder.count == 2
+    assert store.get_missing('https://example.com/b', 60) is None
+    init_sessions(asyncio.Semaphore(1),
+                  replayer=ArchiveReplayer(tmp_path / 'archive.jsonl.gz', latency=0))
+    r = await get_content('https://example.com/a')
+    assert (r.status_code, r.content) == (HTTPStatus.OK, b'data')
+
+
+@pytest.mark.asyncio
+async def test_replay_of_failed_hash_and_head(mocker: MockerFixture, tmp_path: Path) -> None:
+    recorder = ArchiveRecorder(tmp_path / 'archive.jsonl.gz')
+    init_sessions(asyncio.Semaphore(1), recorder=recorder)
+    mocker.patch.object(session_init(''), 'get', side_effect=niquests.RequestException('fail'))
+    mocker.patch.object(session_init(''), 'head', side_effect=niquests.RequestException('fail'))
+    await hash_url('https://example.com/file.txt')
+    await get_last_modified('https://example.com/file.txt')
+    recorder.close()
+    init_sessions(asyncio.Semaphore(1),
+                  replayer=ArchiveReplayer(tmp_path / 'archive.jsonl.gz', latency=0))
+    assert await hash_url('https://example.com/file.txt') == ('', '', 0)
+    assert not await get_last_modified('https://example.com/file.txt')
+    assert offline_misses() == []
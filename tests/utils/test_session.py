@@ -1,4 +1,4 @@
-# ruff: noqa: EM101, RUF012, RUF069, SLF001
+# ruff: noqa: EM101, FBT001, RUF012, RUF069, SLF001
 from __future__ import annotations
 
 from http import HTTPStatus
@@ -7,12 +7,16 @@ from typing import TYPE_CHECKING, Any, cast
 from unittest.mock import AsyncMock
 import asyncio
 
-from livecheck.utils.session import build_github_session, build_retry, build_session
+from livecheck.utils.circuit import CircuitBreaker, CircuitOpenError
+from livecheck.utils.http_cache import HostStats, HttpCache, open_http_cache
+from livecheck.utils.latency import LatencyTracker
+from livecheck.utils.ratelimit import AdaptiveLimiter, HostLimiter, RateLimitPacer
+from livecheck.utils.session import build_github_session, build_retry, build_session, sent_event
+import niquests
 import pytest
 
 if TYPE_CHECKING:
     from pytest_mock import MockerFixture
-    import niquests
 
 
 def test_build_retry_returns_retry_with_expected_status_codes() -> None:
@@ -47,16 +51,90 @@ def test_build_github_session_returns_github_session() -> None:
     assert session._semaphore is sem
 
 
+def test_build_sessions_multiplexed() -> None:
+    sem = asyncio.Semaphore(1)
+    assert not build_session(sem).multiplexed
+    assert build_session(sem, multiplexed=True).multiplexed
+    assert build_github_session(sem, multiplexed=True).multiplexed
+
+
+def _ok_response(url: str) -> niquests.Response:
+    response = niquests.Response()
+    response.status_code = HTTPStatus.OK
+    response.url = url
+    response._content = b'data'
+    response._content_consumed = True
+    return response
+
+
+@pytest.mark.asyncio
+async def test_session_request_counts_cache_hits(mocker: MockerFixture) -> None:
+    session = build_session(asyncio.Semaphore(1))
+    mock_send = mocker.patch('niquests.AsyncSession.send',
+                             new_callable=AsyncMock,
+                             side_effect=lambda request, **_: _ok_response(request.url))
+    for _ in range(3):
+        r = await session.request('GET', 'https://pypi.org/simple/')
+        assert r.content == b'data'
+    await session.request('POST', 'https://pypi.org/simple/')
+    assert mock_send.await_count == 2
+    stats = cast('HttpCache', session.cache).stats()
+    assert stats['pypi.org'] == HostStats(1, stats['pypi.org'].size, 2, 1)
+    await session.close()
+
+
+@pytest.mark.asyncio
+async def test_session_close_writes_cache_usage(mocker: MockerFixture) -> None:
+    session = build_github_session(asyncio.Semaphore(1))
+    mocker.patch('niquests.AsyncSession.send',
+                 new_callable=AsyncMock,
+                 side_effect=lambda request, **_: _ok_response(request.url))
+    await session.request('GET', 'https://api.github.com/repos/foo/bar')
+    cache = cast('HttpCache', session.cache)
+    await session.close()
+    assert not cache._finalizer.alive
+    cache = open_http_cache()
+    assert cache._conn.execute('SELECT count(*) FROM livecheck_usage').fetchone() == (1,)
+    assert list(cache.stats()) == ['api.github.com']
+    assert cache.stats()['api.github.com'].misses == 1
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_session_send_gathers_lazy_response_in_slot(mocker: MockerFixture) -> None:
+    sem = asyncio.Semaphore(1)
+    session = build_session(sem, multiplexed=True)
+    response = mocker.MagicMock(status_code=HTTPStatus.OK, headers={}, lazy=True)
+    locked = []
+
+    def fake_gather(*args: Any, **kwargs: Any) -> None:
+        locked.append(sem.locked())
+
+    mocker.patch('niquests.AsyncSession.send', new_callable=AsyncMock, return_value=response)
+    mock_gather = mocker.patch.object(session,
+                                      'gather',
+                                      new_callable=AsyncMock,
+                                      side_effect=fake_gather)
+    assert await session.send(mocker.MagicMock(url='https://pypi.org/x')) is response
+    mock_gather.assert_awaited_once_with(response)
+    assert locked == [True]
+
+
 @pytest.mark.asyncio
 async def test_concurrency_limited_session_gates_on_semaphore(mocker: MockerFixture) -> None:
     sem = asyncio.Semaphore(1)
     session = build_session(sem)
-    mock_super_request = mocker.patch('niquests_cache.AsyncCachedSession.request',
-                                      new_callable=AsyncMock,
-                                      return_value=mocker.MagicMock(status_code=HTTPStatus.OK))
-    result = await session.request('GET', 'https://example.com')
+    locked = []
+
+    def fake_send(*args: Any, **kwargs: Any) -> Any:
+        locked.append(sem.locked())
+        return mocker.MagicMock(status_code=HTTPStatus.OK, headers={})
+
+    mocker.patch('niquests.AsyncSession.send', new_callable=AsyncMock, side_effect=fake_send)
+    result = await session.send(mocker.MagicMock(url='https://example.com'))
     assert result.status_code == HTTPStatus.OK
-    mock_super_request.assert_called_once()
+    assert locked == [True]
+    assert not sem.locked()
 
 
 @pytest.mark.asyncio
@@ -128,69 +206,283 @@ async def test_github_session_retries_on_rate_limit_403(mocker: MockerFixture) -
 
 
 @pytest.mark.asyncio
-async def test_github_session_parks_when_rate_limit_exhausted(mocker: MockerFixture) -> None:
-    """A 200 with remaining=0 + a future reset should drive the park-sleep branch."""
+async def test_session_send_waits_for_pacer_and_observes_headers(mocker: MockerFixture) -> None:
     sem = asyncio.Semaphore(1)
-    session = build_github_session(sem)
-    future_reset = str(time() + 5)
-    ok_exhausted = mocker.MagicMock()
-    ok_exhausted.status_code = HTTPStatus.OK
-    ok_exhausted.headers = {'x-ratelimit-remaining': '0', 'x-ratelimit-reset': future_reset}
-    mocker.patch('niquests_cache.AsyncCachedSession.request',
-                 new_callable=AsyncMock,
-                 return_value=ok_exhausted)
-    mock_sleep = mocker.patch('livecheck.utils.session.asyncio.sleep', new_callable=AsyncMock)
-    result = await session.request('GET', 'https://api.github.com/test')
-    assert result.status_code == HTTPStatus.OK
+    pacer = RateLimitPacer()
+    session = build_github_session(sem, pacer)
+    reset = str(time() + 60)
+    response = mocker.MagicMock(status_code=HTTPStatus.OK)
+    response.headers = {
+        'x-ratelimit-limit': '5000',
+        'x-ratelimit-remaining': '0',
+        'x-ratelimit-reset': reset
+    }
+    mocker.patch('niquests.AsyncSession.send', new_callable=AsyncMock, return_value=response)
+    mock_sleep = mocker.patch('livecheck.utils.ratelimit.asyncio.sleep', new_callable=AsyncMock)
+    request = mocker.MagicMock(url='https://api.github.com/test')
+    await session.send(request)
+    mock_sleep.assert_not_called()
+    await session.send(request)
     mock_sleep.assert_called_once()
     assert mock_sleep.call_args[0][0] > 0
 
 
 @pytest.mark.asyncio
-async def test_github_session_does_not_park_when_reset_in_past(mocker: MockerFixture) -> None:
-    """Past reset means delay <= 0, so no sleep happens."""
-    sem = asyncio.Semaphore(1)
-    session = build_github_session(sem)
-    past_reset = str(time() - 100)
-    ok_exhausted = mocker.MagicMock()
-    ok_exhausted.status_code = HTTPStatus.OK
-    ok_exhausted.headers = {'x-ratelimit-remaining': '0', 'x-ratelimit-reset': past_reset}
-    mocker.patch('niquests_cache.AsyncCachedSession.request',
-                 new_callable=AsyncMock,
-                 return_value=ok_exhausted)
-    mock_sleep = mocker.patch('livecheck.utils.session.asyncio.sleep', new_callable=AsyncMock)
-    await session.request('GET', 'https://api.github.com/test')
+async def test_session_send_paces_each_rate_limit_resource(mocker: MockerFixture) -> None:
+    pacer = RateLimitPacer()
+    session = build_github_session(asyncio.Semaphore(1), pacer)
+    response = mocker.MagicMock(status_code=HTTPStatus.OK)
+    response.headers = {
+        'x-ratelimit-remaining': '0',
+        'x-ratelimit-reset': str(time() + 60),
+        'x-ratelimit-resource': 'search'
+    }
+    mocker.patch('niquests.AsyncSession.send', new_callable=AsyncMock, return_value=response)
+    mock_sleep = mocker.patch('livecheck.utils.ratelimit.asyncio.sleep', new_callable=AsyncMock)
+    await session.send(mocker.MagicMock(url='https://api.github.com/search/repositories?q=a'))
+    await session.send(mocker.MagicMock(url='https://api.github.com/repos/a/b'))
     mock_sleep.assert_not_called()
+    await session.send(mocker.MagicMock(url='https://api.github.com/search/code?q=b'))
+    mock_sleep.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_session_send_takes_host_slot(mocker: MockerFixture) -> None:
+    sem = asyncio.Semaphore(2)
+    limiter = HostLimiter({'sourceforge.net': 1})
+    session = build_session(sem, limiter=limiter)
+    locked = []
+
+    def fake_send(*args: Any, **kwargs: Any) -> Any:
+        locked.append((limiter._semaphores['sourceforge.net'].locked(), sem._value))
+        return mocker.MagicMock(status_code=HTTPStatus.OK, headers={})
+
+    mocker.patch('niquests.AsyncSession.send', new_callable=AsyncMock, side_effect=fake_send)
+    await session.send(mocker.MagicMock(url='https://downloads.sourceforge.net/x'))
+    await session.send(mocker.MagicMock(url='https://pypi.org/x'))
+    assert locked == [(True, 1), (False, 1)]
 
 
 @pytest.mark.asyncio
-async def test_github_session_does_not_park_on_invalid_reset(mocker: MockerFixture) -> None:
+async def test_session_send_releases_slot_while_waiting_to_retry(mocker: MockerFixture) -> None:
     sem = asyncio.Semaphore(1)
-    session = build_github_session(sem)
-    ok_exhausted = mocker.MagicMock()
-    ok_exhausted.status_code = HTTPStatus.OK
-    ok_exhausted.headers = {'x-ratelimit-remaining': '0', 'x-ratelimit-reset': 'invalid'}
-    mocker.patch('niquests_cache.AsyncCachedSession.request',
+    session = build_session(sem)
+    unavailable = mocker.MagicMock(status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                                   headers={'retry-after': '7'})
+    error = mocker.MagicMock(status_code=HTTPStatus.BAD_GATEWAY, headers={})
+    ok = mocker.MagicMock(status_code=HTTPStatus.OK, headers={})
+    mock_send = mocker.patch('niquests.AsyncSession.send',
+                             new_callable=AsyncMock,
+                             side_effect=[unavailable, error, ok])
+    delays = []
+
+    def fake_sleep(delay: float) -> None:
+        assert not sem.locked()
+        delays.append(delay)
+
+    mocker.patch('livecheck.utils.session.asyncio.sleep',
                  new_callable=AsyncMock,
-                 return_value=ok_exhausted)
+                 side_effect=fake_sleep)
+    assert await session.send(mocker.MagicMock(url='https://example.com/', method='GET')) is ok
+    assert mock_send.call_count == 3
+    assert delays == [7.0, 5.0]
+
+
+@pytest.mark.asyncio
+async def test_session_send_gives_up_after_total_retries(mocker: MockerFixture) -> None:
+    session = build_session(asyncio.Semaphore(1))
+    error = mocker.MagicMock(status_code=HTTPStatus.INTERNAL_SERVER_ERROR, headers={})
+    mock_send = mocker.patch('niquests.AsyncSession.send',
+                             new_callable=AsyncMock,
+                             return_value=error)
     mock_sleep = mocker.patch('livecheck.utils.session.asyncio.sleep', new_callable=AsyncMock)
-    await session.request('GET', 'https://api.github.com/test')
-    mock_sleep.assert_not_called()
+    assert await session.send(mocker.MagicMock(url='https://example.com/', method='GET')) is error
+    assert mock_send.call_count == 4
+    assert [c.args[0] for c in mock_sleep.call_args_list] == [0.0, 5.0, 10.0]
 
 
 @pytest.mark.asyncio
-async def test_github_session_does_not_park_when_no_reset_header(mocker: MockerFixture) -> None:
+async def test_session_send_retries_connection_errors(mocker: MockerFixture) -> None:
     sem = asyncio.Semaphore(1)
-    session = build_github_session(sem)
-    ok_exhausted = mocker.MagicMock()
-    ok_exhausted.status_code = HTTPStatus.OK
-    ok_exhausted.headers = {'x-ratelimit-remaining': '0'}
-    mocker.patch('niquests_cache.AsyncCachedSession.request',
+    session = build_session(sem)
+    mock_send = mocker.patch('niquests.AsyncSession.send',
+                             new_callable=AsyncMock,
+                             side_effect=niquests.ConnectionError('down'))
+    mocker.patch('livecheck.utils.session.asyncio.sleep', new_callable=AsyncMock)
+    with pytest.raises(niquests.ConnectionError):
+        await session.send(mocker.MagicMock(url='https://example.com/', method='GET'))
+    assert mock_send.call_count == 4
+    assert not sem.locked()
+
+
+@pytest.mark.asyncio
+async def test_session_send_does_not_retry_post(mocker: MockerFixture) -> None:
+    session = build_session(asyncio.Semaphore(1))
+    error = mocker.MagicMock(status_code=HTTPStatus.SERVICE_UNAVAILABLE, headers={})
+    mock_send = mocker.patch('niquests.AsyncSession.send',
+                             new_callable=AsyncMock,
+                             return_value=error)
+    assert await session.send(mocker.MagicMock(url='https://example.com/', method='POST')) is error
+    mock_send.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_github_session_send_does_not_retry_429(mocker: MockerFixture) -> None:
+    session = build_github_session(asyncio.Semaphore(1))
+    limited = mocker.MagicMock(status_code=HTTPStatus.TOO_MANY_REQUESTS, headers={})
+    mock_send = mocker.patch('niquests.AsyncSession.send',
+                             new_callable=AsyncMock,
+                             return_value=limited)
+    assert await session.send(mocker.MagicMock(url='https://api.github.com/',
+                                               method='GET')) is limited
+    mock_send.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_session_send_fails_fast_once_circuit_opens(mocker: MockerFixture) -> None:
+    breaker = CircuitBreaker(threshold=2)
+    session = build_session(asyncio.Semaphore(1), breaker=breaker)
+    error = mocker.MagicMock(status_code=HTTPStatus.BAD_GATEWAY, headers={})
+    not_found = mocker.MagicMock(status_code=HTTPStatus.NOT_FOUND, headers={})
+    mock_send = mocker.patch('niquests.AsyncSession.send',
+                             new_callable=AsyncMock,
+                             side_effect=[error, not_found, error, error, not_found])
+    request = mocker.MagicMock(url='https://mirror.example.com/', method='POST')
+    for _ in range(4):
+        await session.send(request)
+    with pytest.raises(CircuitOpenError):
+        await session.send(request)
+    await session.send(mocker.MagicMock(url='https://other.example.com/', method='POST'))
+    assert mock_send.call_count == 5
+    assert breaker.tripped_hosts == ['mirror.example.com']
+
+
+@pytest.mark.asyncio
+async def test_session_send_connection_errors_open_circuit(mocker: MockerFixture) -> None:
+    breaker = CircuitBreaker(threshold=1)
+    session = build_session(asyncio.Semaphore(1), breaker=breaker)
+    mocker.patch('niquests.AsyncSession.send',
                  new_callable=AsyncMock,
-                 return_value=ok_exhausted)
-    mock_sleep = mocker.patch('livecheck.utils.session.asyncio.sleep', new_callable=AsyncMock)
-    await session.request('GET', 'https://api.github.com/test')
-    mock_sleep.assert_not_called()
+                 side_effect=niquests.ConnectionError('down'))
+    request = mocker.MagicMock(url='https://mirror.example.com/', method='POST')
+    with pytest.raises(niquests.ConnectionError):
+        await session.send(request)
+    with pytest.raises(CircuitOpenError):
+        await session.send(request)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(('status', 'throttled'), [(HTTPStatus.OK, False),
+                                                   (HTTPStatus.NOT_FOUND, False),
+                                                   (HTTPStatus.TOO_MANY_REQUESTS, True),
+                                                   (HTTPStatus.SERVICE_UNAVAILABLE, True)])
+async def test_session_send_adjusts_adaptive_limit(mocker: MockerFixture, status: HTTPStatus,
+                                                   throttled: bool) -> None:
+    adaptive = AdaptiveLimiter()
+    pacer = RateLimitPacer()
+    session = build_session(asyncio.Semaphore(1), pacer=pacer, adaptive=adaptive)
+    mock_observe = mocker.patch.object(adaptive, 'observe')
+    mocker.patch.object(pacer, 'is_low', return_value=True)
+    mocker.patch('niquests.AsyncSession.send',
+                 new_callable=AsyncMock,
+                 return_value=mocker.MagicMock(status_code=status, headers={}, lazy=False))
+    await session.send(mocker.MagicMock(url='https://pypi.org/x', method='POST'))
+    mock_observe.assert_called_once_with('pypi.org', mocker.ANY, throttled=throttled, hold=True)
+
+
+@pytest.mark.asyncio
+async def test_session_send_records_latency(mocker: MockerFixture) -> None:
+    latency = LatencyTracker(min_samples=1)
+    session = build_session(asyncio.Semaphore(1), latency=latency)
+    mocker.patch('niquests.AsyncSession.send',
+                 new_callable=AsyncMock,
+                 side_effect=[
+                     mocker.MagicMock(status_code=HTTPStatus.OK, headers={}, lazy=False),
+                     mocker.MagicMock(status_code=HTTPStatus.TOO_MANY_REQUESTS,
+                                      headers={},
+                                      lazy=False)
+                 ])
+    mocker.patch('livecheck.utils.session.monotonic', return_value=1e9)
+    request = mocker.MagicMock(url='https://sourceforge.net/x', method='POST')
+    await session.send(request)
+    await session.send(request)
+    assert len(latency._samples['sourceforge.net']) == 1
+
+
+@pytest.mark.asyncio
+async def test_session_send_latency_excludes_waiting_for_slots(mocker: MockerFixture) -> None:
+    latency = LatencyTracker(min_samples=1)
+    adaptive = AdaptiveLimiter()
+    semaphore = asyncio.Semaphore(1)
+    session = build_session(semaphore, latency=latency, adaptive=adaptive)
+    mock_observe = mocker.patch.object(adaptive, 'observe')
+    mocker.patch('niquests.AsyncSession.send',
+                 new_callable=AsyncMock,
+                 return_value=mocker.MagicMock(status_code=HTTPStatus.OK, headers={}, lazy=False))
+    mock_monotonic = mocker.patch('livecheck.utils.session.monotonic', return_value=100.0)
+    await semaphore.acquire()
+    task = asyncio.create_task(
+        session.send(mocker.MagicMock(url='https://sourceforge.net/x', method='POST')))
+    await asyncio.sleep(0)
+    mock_monotonic.return_value = 130.0
+    semaphore.release()
+    await task
+    assert list(latency._samples['sourceforge.net']) == [0.0]
+    assert mock_observe.call_args.args == ('sourceforge.net', 130.0)
+
+
+@pytest.mark.asyncio
+async def test_session_send_sets_sent_event_once_slots_are_taken(mocker: MockerFixture) -> None:
+    semaphore = asyncio.Semaphore(1)
+    session = build_session(semaphore)
+    mocker.patch('niquests.AsyncSession.send',
+                 new_callable=AsyncMock,
+                 return_value=mocker.MagicMock(status_code=HTTPStatus.OK, headers={}, lazy=False))
+    sent = asyncio.Event()
+    await semaphore.acquire()
+    token = sent_event.set(sent)
+    try:
+        task = asyncio.create_task(
+            session.send(mocker.MagicMock(url='https://sourceforge.net/x', method='POST')))
+    finally:
+        sent_event.reset(token)
+    await asyncio.sleep(0)
+    assert not sent.is_set()
+    semaphore.release()
+    await task
+    assert sent.is_set()
+
+
+@pytest.mark.asyncio
+async def test_session_send_connection_error_lowers_adaptive_limit(mocker: MockerFixture) -> None:
+    adaptive = AdaptiveLimiter({'mirror.example.com': 8})
+    session = build_session(asyncio.Semaphore(1), adaptive=adaptive)
+    mocker.patch('niquests.AsyncSession.send',
+                 new_callable=AsyncMock,
+                 side_effect=niquests.ConnectionError('down'))
+    with pytest.raises(niquests.ConnectionError):
+        await session.send(mocker.MagicMock(url='https://mirror.example.com/', method='POST'))
+    assert adaptive.limits == {'mirror.example.com': 4.0}
+
+
+@pytest.mark.asyncio
+async def test_session_send_nested_call_reuses_slot(mocker: MockerFixture) -> None:
+    sem = asyncio.Semaphore(1)
+    session = build_session(sem)
+    response = mocker.MagicMock(status_code=HTTPStatus.OK, headers={})
+    calls = 0
+
+    async def fake_send(self: Any, request: Any, **kwargs: Any) -> Any:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await session.send(request)
+        return response
+
+    mocker.patch('niquests.AsyncSession.send', fake_send)
+    assert await asyncio.wait_for(session.send(mocker.MagicMock(url='https://example.com/')),
+                                  1) is response
+    assert calls == 2
 
 
 @pytest.mark.asyncio
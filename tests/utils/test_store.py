@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+from time import time
+from typing import TYPE_CHECKING
+
+from livecheck.utils.store import ResultStore, StoredResult, close_store, get_store, open_store
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def _result(checked_at: float) -> StoredResult:
+    return StoredResult('github', 'https://example.com/pkg-2.0.tar.gz', '2.0', 'abc', '20240101',
+                        checked_at)
+
+
+def test_result_store_round_trip(tmp_path: Path) -> None:
+    store = ResultStore(tmp_path / 'results.sqlite')
+    result = _result(time())
+    store.put('cat/pkg', '1.0', result, 3600)
+    assert store.get('cat/pkg', '1.0', 3600) == result
+    store.close()
+
+
+def test_result_store_persists(tmp_path: Path) -> None:
+    store = ResultStore(tmp_path / 'results.sqlite')
+    store.put('cat/pkg', '1.0', _result(time()), 3600)
+    store.close()
+    store = ResultStore(tmp_path / 'results.sqlite')
+    assert store.get('cat/pkg', '1.0', 3600) is not None
+    store.close()
+
+
+def test_result_store_missing(tmp_path: Path) -> None:
+    store = ResultStore(tmp_path / 'results.sqlite')
+    assert store.get('cat/pkg', '1.0', 3600) is None
+    store.close()
+
+
+def test_result_store_expired_by_max_age(tmp_path: Path) -> None:
+    store = ResultStore(tmp_path / 'results.sqlite')
+    store.put('cat/pkg', '1.0', _result(time() - 120), 3600)
+    assert store.get('cat/pkg', '1.0', 60) is None
+    assert store.get('cat/pkg', '1.0', 600) is not None
+    store.close()
+
+
+def test_result_store_expired_by_ttl(tmp_path: Path) -> None:
+    store = ResultStore(tmp_path / 'results.sqlite')
+    store.put('cat/pkg', '1.0', _result(time() - 120), 60)
+    assert store.get('cat/pkg', '1.0', 3600) is None
+    store.close()
+
+
+def test_result_store_ebuild_version_changed(tmp_path: Path) -> None:
+    store = ResultStore(tmp_path / 'results.sqlite')
+    store.put('cat/pkg', '1.0', _result(time()), 3600)
+    assert store.get('cat/pkg', '1.1', 3600) is None
+    store.close()
+
+
+def test_result_store_restrict_version(tmp_path: Path) -> None:
+    store = ResultStore(tmp_path / 'results.sqlite')
+    store.put('cat/pkg', '1.0', _result(time()), 3600, '1')
+    assert store.get('cat/pkg', '1.0', 3600) is None
+    assert store.get('cat/pkg', '1.0', 3600, '1') is not None
+    store.close()
+
+
+def test_result_store_replaces(tmp_path: Path) -> None:
+    store = ResultStore(tmp_path / 'results.sqlite')
+    store.put('cat/pkg', '1.0', _result(time()), 3600)
+    newer = StoredResult('pypi', '', '3.0', '', '', time())
+    store.put('cat/pkg', '1.0', newer, 3600)
+    assert store.get('cat/pkg', '1.0', 3600) == newer
+    store.close()
+
+
+def test_open_store_is_module_level() -> None:
+    assert get_store() is None
+    store = open_store()
+    assert open_store() is store
+    assert get_store() is store
+    close_store()
+    assert get_store() is None
+    close_store()
+
+
+def test_result_store_strategy(tmp_path: Path) -> None:
+    store = ResultStore(tmp_path / 'results.sqlite')
+    assert store.get_strategy('cat/pkg') is None
+    store.put_strategy('cat/pkg', 'homepage', 'https://example.com')
+    assert store.get_strategy('cat/pkg') == ('homepage', 'https://example.com')
+    store.put_strategy('cat/pkg', 'repology', '')
+    assert store.get_strategy('cat/pkg') == ('repology', '')
+    store.close()
+
+
+def test_result_store_missing_urls(tmp_path: Path) -> None:
+    store = ResultStore(tmp_path / 'results.sqlite')
+    assert store.get_missing('https://example.com/a', 60) is None
+    store.put_missing('https://example.com/a', 404)
+    store.put_missing('https://example.com/b', 410)
+    assert store.get_missing('https://example.com/a', 60) == 404
+    assert store.get_missing('https://example.com/a', 0) is None
+    store.delete_missing('https://example.com/a')
+    assert store.get_missing('https://example.com/a', 60) is None
+    assert store.get_missing('https://example.com/b', 60) == 410
+    store.delete_missing()
+    assert store.get_missing('https://example.com/b', 60) is None
+    store.close()
+
+
+def test_result_store_concurrency_limits(tmp_path: Path) -> None:
+    store = ResultStore(tmp_path / 'results.sqlite')
+    assert store.get_concurrency_limits() == {}
+    store.put_concurrency_limits({'api.github.com': 12.5, 'pypi.org': 4.0})
+    store.put_concurrency_limits({'pypi.org': 2.0})
+    assert store.get_concurrency_limits() == {'api.github.com': 12.5, 'pypi.org': 2.0}
+    store.close()
+
+
+def test_result_store_preferred_mirrors(tmp_path: Path) -> None:
+    store = ResultStore(tmp_path / 'results.sqlite')
+    assert store.get_preferred_mirrors() == {}
+    store.put_preferred_mirrors({'gnu': 'https://ftp.gnu.org/gnu', 'pypi': 'https://a.example'})
+    store.put_preferred_mirrors({'gnu': 'https://mirrors.kernel.org/gnu'})
+    assert store.get_preferred_mirrors() == {
+        'gnu': 'https://mirrors.kernel.org/gnu',
+        'pypi': 'https://a.example'
+    }
+    store.close()